@@ -3,19 +3,26 @@ BTS 포토카드 시세 분석 및 웹페이지 생성 스크립트
 """
 import argparse
 import json
+import os
 import re
 from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
-    import requests
-    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from crawlers.http_client import HttpClient  # requests 필요
     HAS_REQUESTS = True
 except ImportError:
     HAS_REQUESTS = False
 
+from listing_dedup import WINDOW_DAYS as DEDUP_WINDOW_DAYS, dedup_listings
+from image_index import DEFAULT_CACHE_DIR as IMAGE_CACHE_DIR, HAS_PIL, ImageCache, assign_image_clusters
+from thumbnail_cache import DEFAULT_CACHE_DIR as THUMB_CACHE_DIR, DEFAULT_THUMB_DIR, THUMB_SIZES, ThumbnailCache
+
+MAX_DEAD_THUMBS = 5  # 그룹당 죽은 썸네일을 이 수만큼 만나면 이미지 없는 대표로 만족
+
 # 멤버 이름 매핑
 MEMBERS = {
     'RM': ['rm', '알엠', '남준', 'namjoon'],
@@ -163,25 +170,37 @@ _AVAILABILITY_BAD_KEYWORDS = (
 )
 
 
+_http_client = None
+
+
+def _get_http_client():
+    """링크 검증용 공용 HTTP 클라이언트 (검증 스레드 12개가 커넥션 풀 공유, lazy 생성)"""
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient(
+            headers={'User-Agent': 'Mozilla/5.0 (compatible; FandomDictBot/1.0)'},
+            timeout=8,
+            retries=2,
+            pool_size=12,
+        )
+    return _http_client
+
+
 def validate_product_url(url, timeout=8):
     """상품 페이지 존재 및 판매중 여부 확인 (실제 PDP로 이동 가능한 상품만 True)"""
     if not HAS_REQUESTS:
         return True  # 검증 불가 시 일단 표시
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0 (compatible; FandomDictBot/1.0)'}
-        r = requests.get(url, timeout=timeout, allow_redirects=True, headers=headers)
-        if r.status_code != 200:
-            return False
-        # redirect된 경우 (예: product-error/deleted)
-        if 'product-error' in r.url:
-            return False
-        text = (r.text or '').lower()
-        for kw in _AVAILABILITY_BAD_KEYWORDS:
-            if kw in text:
-                return False
-        return True
-    except Exception:
+    r = _get_http_client().get(url, timeout=timeout, allow_redirects=True)
+    if r is None or r.status_code != 200:
+        return False
+    # redirect된 경우 (예: product-error/deleted)
+    if 'product-error' in r.url:
         return False
+    text = (r.text or '').lower()
+    for kw in _AVAILABILITY_BAD_KEYWORDS:
+        if kw in text:
+            return False
+    return True
 
 
 def strip_parens(s):
@@ -253,8 +272,14 @@ def calculate_median_price(prices):
         return 0
     return statistics.median(prices)
 
-def analyze_photocards(data_file, validate_links=True):
-    """포토카드 데이터 분석"""
+def analyze_photocards(data_file, validate_links=True, image_clusters=False, image_cache_dir=IMAGE_CACHE_DIR,
+                       thumbs=None, dedup=True):
+    """
+    포토카드 데이터 분석
+    image_clusters: 썸네일 지각 해시로 같은 제목 그룹을 실제 카드(이미지 클러스터)별로 세분화
+    thumbs: ThumbnailCache (대표 상품 썸네일을 로컬 변형으로 준비, 죽은 이미지는 대표 선택에서 제외)
+    dedup: 같은 그룹 안의 재등록 상품(제목 거의 같음 + 같은 가격 + 시간 창 안)을 하나로 접음
+    """
     print("데이터 로딩 중...")
     with open(data_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
@@ -262,18 +287,45 @@ def analyze_photocards(data_file, validate_links=True):
     rows = data['query_result']['data']['rows']
     print(f"총 {len(rows)}개 상품 발견")
 
-    # 포토카드별로 그룹화
-    photocard_groups = defaultdict(list)
-    total_groups = 0
-
+    normalized_rows = []
     for row in rows:
         try:
-            normalized = normalize_photocard(row)
-            photocard_groups[normalized['id']].append(normalized)
+            normalized_rows.append(normalize_photocard(row))
         except Exception as e:
             print(f"처리 오류: {row.get('상품명', 'Unknown')}, {e}")
             continue
 
+    # 썸네일 이미지 클러스터 (같은 제목 그룹 안의 서로 다른 카드 분리)
+    if image_clusters:
+        if not HAS_PIL:
+            print("[주의] Pillow 미설치 → 캐시된 이미지 해시만 사용 (pip install Pillow)")
+        cache = ImageCache(image_cache_dir, client=_get_http_client() if HAS_REQUESTS else None)
+        print("썸네일 이미지 해시/클러스터 계산 중...")
+        img_stats = assign_image_clusters(normalized_rows, cache, group_key=lambda n: n['id'])
+        cache.save()
+        print(f"  → 해시 {img_stats['hashed']}개 (실패 {img_stats['missing']}개), 이미지 클러스터 {img_stats['clusters']}개")
+
+    # 그룹 키: 제목 그룹 (상품 2개 이상의 이미지 클러스터에 속하면 "제목 그룹__클러스터"로 세분화)
+    def group_key(normalized):
+        if normalized.get('image_cluster'):
+            return f"{normalized['id']}__{normalized['image_cluster']}"
+        return normalized['id']
+
+    # 재등록 중복 제거 (거래 수/중앙값이 재등록 횟수에 끌려가지 않도록)
+    removed_by_group = {}
+    if dedup:
+        normalized_rows, removed_by_group = dedup_listings(normalized_rows, group_key=group_key)
+        total_removed = sum(removed_by_group.values())
+        print(f"재등록 중복 제거: {total_removed}개 접음 ({DEDUP_WINDOW_DAYS}일 안 같은 제목·가격), "
+              f"{len(normalized_rows)}개 남음")
+        for key, count in removed_by_group.most_common(5):
+            print(f"  - {key}: -{count}개")
+
+    # 포토카드별로 그룹화
+    photocard_groups = defaultdict(list)
+    for normalized in normalized_rows:
+        photocard_groups[group_key(normalized)].append(normalized)
+
     # 각 포토카드별 통계 계산
     photocard_stats = []
     group_items = [(k, v) for k, v in photocard_groups.items() if len(v) >= 2]
@@ -293,20 +345,39 @@ def analyze_photocards(data_file, validate_links=True):
         if not filtered_prices:
             filtered_prices = prices
         median_val = calculate_median_price(filtered_prices)
-        # 1) 썸네일(이미지) 있는 상품 우선, 2) 중앙가 대비 가격 근접 순
+        # 1) 썸네일(이미지) 있는 상품 우선 (죽은 이미지로 기록된 상품은 이미지 없음 취급),
+        # 2) 중앙가 대비 가격 근접 순
         # → 검증 통과한 상품 중 썸네일+링크 동일한(판매중) 상품 우선 선택
+        def has_image(x):
+            return bool(x.get('image_url')) and not (thumbs and thumbs.is_dead(x['image_url']))
+
         candidates = sorted(
             [p for p in products if p['price'] > 0],
-            key=lambda x: (0 if x.get('image_url') else 1, abs(x['price'] - median_val))
+            key=lambda x: (0 if has_image(x) else 1, abs(x['price'] - median_val))
         )
         representative = candidates[0]
         has_valid_link = not do_validate  # 검증 생략 시 링크 표시
-        if do_validate:
+        thumb = None
+        if do_validate or thumbs:
+            fallback = None  # 링크는 살아 있지만 썸네일이 죽은 상품
+            dead_thumbs = 0
             for cand in candidates:
-                if validate_product_url(f"https://globalbunjang.com/product/{cand['product_id']}"):
-                    representative = cand
+                if do_validate and not validate_product_url(f"https://globalbunjang.com/product/{cand['product_id']}"):
+                    continue
+                if thumbs and has_image(cand) and dead_thumbs < MAX_DEAD_THUMBS:
+                    thumb = thumbs.ensure(cand['image_url'])
+                    if thumb is None:
+                        dead_thumbs += 1
+                        fallback = fallback or cand
+                        continue
+                # 썸네일 없는 상품에 닿았으면 가격이 더 가까운 (썸네일만 죽은) 상품을 대표로
+                representative = cand if (thumb or not fallback) else fallback
+                has_valid_link = True
+                break
+            else:
+                if fallback:
+                    representative = fallback
                     has_valid_link = True
-                    break
         time_series = [
             {'date': p['created_date'][:10], 'price': p['price'], 'product_id': p['product_id']}
             for p in sorted(products, key=lambda x: x['created_date'])
@@ -314,10 +385,10 @@ def analyze_photocards(data_file, validate_links=True):
         ]
         return (
             photocard_id, products, representative, has_valid_link,
-            filtered_prices, time_series
+            filtered_prices, time_series, thumb
         )
 
-    if do_validate:
+    if do_validate or thumbs:
         processed = []
         with ThreadPoolExecutor(max_workers=12) as ex:
             futures = {ex.submit(process_group, item): item for item in group_items}
@@ -330,9 +401,13 @@ def analyze_photocards(data_file, validate_links=True):
     else:
         processed = [r for r in (process_group(it) for it in group_items) if r is not None]
 
-    for photocard_id, products, representative, has_valid_link, filtered_prices, time_series in processed:
+    for photocard_id, products, representative, has_valid_link, filtered_prices, time_series, thumb in processed:
+        image_url = representative.get('image_url')
+        if thumbs and thumbs.is_dead(image_url):
+            image_url = None
         photocard_stats.append({
             'id': photocard_id,
+            'image_cluster': representative.get('image_cluster'),
             'official_name': representative['official_name'],
             'member': representative['member'],
             'album': representative['album'],
@@ -342,10 +417,12 @@ def analyze_photocards(data_file, validate_links=True):
             'max_price': int(max(filtered_prices)),
             'avg_price': int(statistics.mean(filtered_prices)),
             'transaction_count': len(filtered_prices),
+            'duplicates_removed': removed_by_group.get(photocard_id, 0),
             'time_series': time_series,
             'representative_product_id': representative['product_id'],
             'sample_title': representative['original_title'],
-            'image_url': representative.get('image_url'),
+            'image_url': image_url,
+            'thumbnail': thumb if image_url else None,
             'has_valid_link': has_valid_link
         })
 
@@ -357,7 +434,10 @@ def analyze_photocards(data_file, validate_links=True):
     if do_validate:
         valid_count = sum(1 for p in photocard_stats if p.get('has_valid_link'))
         print(f"  → 상품 링크 검증: {valid_count}/{len(photocard_stats)}개 (존재하는 상품만 표시)")
+        _get_http_client().print_metrics('validate')
     print(f"  → 이미지 URL: {with_img}개")
+    if thumbs:
+        thumbs.print_stats()
     return photocard_stats
 
 def _format_price(val, locale):
@@ -368,10 +448,13 @@ def _format_price(val, locale):
     return f"{int(val):,}원"
 
 
-def generate_html(photocard_stats, output_file, locale='ko'):
-    """HTML 웹페이지 생성 (locale: 'ko' | 'en')"""
+def generate_html(photocard_stats, output_file, locale='ko', thumbs=None):
+    """HTML 웹페이지 생성 (locale: 'ko' | 'en', thumbs: ThumbnailCache → 로컬 썸네일 변형 + srcset)"""
     s = STRINGS[locale]
     is_en = locale == 'en'
+    thumb_prefix = None
+    if thumbs:
+        thumb_prefix = Path(os.path.relpath(thumbs.thumb_dir, Path(output_file).resolve().parent)).as_posix()
 
     # 멤버별로 그룹화 (순서: MEMBER_ORDER)
     by_member = defaultdict(list)
@@ -395,6 +478,20 @@ def generate_html(photocard_stats, output_file, locale='ko'):
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{s['title']}</title>
     <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    <script>
+        // 로컬 썸네일 변형이 없으면(배포 누락 등) 원본 URL로, 원본도 실패하면 placeholder
+        function thumbFallback(img, src) {{
+            var pic = img.parentNode;
+            if (src && img.getAttribute('src') !== src) {{
+                pic.querySelectorAll('source').forEach(function (el) {{ el.remove(); }});
+                img.removeAttribute('srcset');
+                img.src = src;
+                return;
+            }}
+            img.style.display = 'none';
+            pic.nextElementSibling.style.display = 'flex';
+        }}
+    </script>
     <style>
         * {{
             margin: 0;
@@ -501,6 +598,10 @@ def generate_html(photocard_stats, output_file, locale='ko'):
             overflow: hidden;
         }}
 
+        .photocard-thumb-wrap picture {{
+            display: contents;
+        }}
+
         .photocard-thumb {{
             width: 100%;
             height: 100%;
@@ -893,7 +994,14 @@ def generate_html(photocard_stats, output_file, locale='ko'):
                 tags_display = ''.join(f'<span class="tag">{t}</span>' for t in types_list)
                 search_text = f"{pc['official_name']} {album} {types_str}".lower()
             img_url = pc.get('image_url') or ''
-            if img_url:
+            webp_srcset = thumbs.srcset(pc.get('thumbnail'), 'webp', thumb_prefix) if thumbs else ''
+            if img_url and webp_srcset:
+                # 로컬 변형: AVIF(지원 시) → WebP 순, src는 가장 작은 WebP
+                avif_srcset = thumbs.srcset(pc['thumbnail'], 'avif', thumb_prefix)
+                sources = f'<source type="image/avif" srcset="{avif_srcset}" sizes="{THUMB_SIZES}">' if avif_srcset else ''
+                fallback_src = webp_srcset.split(',')[0].rsplit(' ', 1)[0]
+                thumb_block = f'<div class="photocard-thumb-wrap"><picture>{sources}<img class="photocard-thumb" src="{fallback_src}" srcset="{webp_srcset}" sizes="{THUMB_SIZES}" alt="" loading="lazy" onerror="thumbFallback(this, \'{img_url}\')"></picture><div class="placeholder" style="display:none">{s["no_image"]}</div></div>'
+            elif img_url:
                 thumb_block = f'<div class="photocard-thumb-wrap"><img class="photocard-thumb" src="{img_url}" alt="" loading="lazy" onerror="this.style.display=\'none\';this.nextElementSibling.style.display=\'flex\'"><div class="placeholder" style="display:none">{s["no_image"]}</div></div>'
             else:
                 thumb_block = f'<div class="photocard-thumb-wrap"><div class="placeholder">{s["no_image"]}</div></div>'
@@ -1112,6 +1220,14 @@ if __name__ == '__main__':
                         help='출력 로케일: ko(한국어+원), en(영어+USD)')
     parser.add_argument('--all-locales', action='store_true',
                         help='ko, en 두 버전 모두 생성')
+    parser.add_argument('--image-clusters', action='store_true',
+                        help='썸네일 지각 해시로 같은 제목 그룹을 실제 카드별로 세분화 (Pillow 필요)')
+    parser.add_argument('--image-cache-dir', default=IMAGE_CACHE_DIR,
+                        help=f'썸네일/해시 캐시 디렉터리 (기본: {IMAGE_CACHE_DIR})')
+    parser.add_argument('--no-dedup', action='store_true',
+                        help='재등록 상품 중복 제거 생략 (재등록마다 거래 1건으로 집계)')
+    parser.add_argument('--thumbnails', action='store_true',
+                        help=f'대표 썸네일을 로컬 WebP/AVIF 변형({DEFAULT_THUMB_DIR}/)으로 제공, 죽은 이미지 제외')
     args = parser.parse_args()
 
     base_dir = Path(__file__).resolve().parent
@@ -1124,8 +1240,27 @@ if __name__ == '__main__':
     if args.skip_validate:
         print("[주의] --skip-validate: 링크 검증 생략 → 일부 '상품 보러가기'가 삭제된 상품일 수 있습니다.\n")
 
+    thumbs = None
+    if args.thumbnails:
+        thumbs = ThumbnailCache(
+            str(base_dir / DEFAULT_THUMB_DIR), str(base_dir / THUMB_CACHE_DIR),
+            client=_get_http_client() if HAS_REQUESTS else None,
+        )
+
     # 데이터 분석
-    photocard_stats = analyze_photocards(str(data_file), validate_links=not args.skip_validate)
+    photocard_stats = analyze_photocards(
+        str(data_file),
+        validate_links=not args.skip_validate,
+        image_clusters=args.image_clusters,
+        image_cache_dir=str(base_dir / args.image_cache_dir),
+        thumbs=thumbs,
+        dedup=not args.no_dedup,
+    )
+    if thumbs:
+        thumbs.save()
+        pruned = thumbs.prune(pc.get('thumbnail') for pc in photocard_stats)
+        if pruned:
+            print(f"  → 참조되지 않는 썸네일 변형 {pruned}개 삭제")
 
     # HTML 생성
     if args.all_locales:
@@ -1133,8 +1268,8 @@ if __name__ == '__main__':
         en_dir = base_dir / 'en'
         en_dir.mkdir(exist_ok=True)
         out_en = en_dir / 'bts_photocard_market.html'
-        generate_html(photocard_stats, str(out_ko), locale='ko')
-        generate_html(photocard_stats, str(out_en), locale='en')
+        generate_html(photocard_stats, str(out_ko), locale='ko', thumbs=thumbs)
+        generate_html(photocard_stats, str(out_en), locale='en', thumbs=thumbs)
         print(f"\n한국어: {out_ko}")
         print(f"영어:   {out_en}")
     else:
@@ -1144,7 +1279,7 @@ if __name__ == '__main__':
             output_file = en_dir / 'bts_photocard_market.html'
         else:
             output_file = base_dir / 'bts_photocard_market.html'
-        generate_html(photocard_stats, str(output_file), locale=args.locale)
+        generate_html(photocard_stats, str(output_file), locale=args.locale, thumbs=thumbs)
         print(f"\n웹페이지: {output_file}")
 
     print(f"\n분석 완료! (포토카드 {len(photocard_stats)}종)")
@@ -0,0 +1,71 @@
+"""
+토큰 기준 청크 분할/묶음 (classifier Reddit LLM 추출용)
+- split_text: 긴 텍스트만 max_tokens 이하로 분할 (줄 → 단어 경계 순으로 자름)
+- pack_segments: (구간 id, 텍스트) 목록을 요청 하나당 target_tokens까지 순서대로 묶음
+  → 짧은 게시물 여러 개가 한 요청에 들어가 호출 수가 크게 줄고, 구간 id로 결과를 다시 나눔
+- 토큰 수는 text_features.estimate_tokens (라틴/한글 문자 체계별 추정)
+
+    split_text(long_post, max_tokens=1500)   # ["...", "..."]
+    pack_segments([(0, "WTS ..."), (1, "LF ...")], target_tokens=6000)   # [[(0, ...), (1, ...)]]
+"""
+
+import re
+from typing import Hashable
+
+from text_features import estimate_tokens
+
+_LINE_RE = re.compile(r"[^\n]*\n|[^\n]+")
+_WORD_RE = re.compile(r"\S+\s*|\s+")
+
+
+def _pieces(text: str, max_tokens: int) -> list[tuple[str, int]]:
+    """줄 단위 조각 (한 줄이 max_tokens를 넘으면 단어 단위로) + 조각별 토큰 추정"""
+    pieces = []
+    for line in _LINE_RE.findall(text):
+        tokens = estimate_tokens(line)
+        if tokens <= max_tokens:
+            pieces.append((line, tokens))
+        else:
+            pieces.extend((word, estimate_tokens(word)) for word in _WORD_RE.findall(line))
+    return pieces
+
+
+def split_text(text: str, max_tokens: int) -> list[str]:
+    """max_tokens 이하 조각으로 분할 (짧으면 그대로 한 개, 경계: 줄 > 단어)"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    parts, current, size = [], [], 0
+    for piece, tokens in _pieces(text, max_tokens):
+        if current and size + tokens > max_tokens:
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        parts.append("".join(current))
+    return [p for p in parts if p.strip()]
+
+
+def pack_segments(
+    segments: list[tuple[Hashable, str]],
+    target_tokens: int,
+    max_segments: int = 0,
+    segment_overhead: int = 0,
+) -> list[list[tuple[Hashable, str]]]:
+    """
+    구간을 입력 순서대로 묶음 (묶음당 추정 토큰 ≤ target_tokens, max_segments > 0이면 구간 수 상한)
+    segment_overhead: 구간마다 붙는 구분 표시의 토큰 수
+    target_tokens보다 큰 구간은 혼자 한 묶음 (미리 split_text로 나눠 둘 것)
+    """
+    packs, current, size = [], [], 0
+    for seg_id, text in segments:
+        tokens = estimate_tokens(text) + segment_overhead
+        full = current and (size + tokens > target_tokens or (max_segments and len(current) >= max_segments))
+        if full:
+            packs.append(current)
+            current, size = [], 0
+        current.append((seg_id, text))
+        size += tokens
+    if current:
+        packs.append(current)
+    return packs
@@ -1,43 +1,60 @@
 """
 STEP 4: Claude API로 원문 텍스트에서 신조어/약어 추출 및 분류
 - Reddit, 위버스샵 원문 텍스트를 Claude API로 처리
-- STEP 1 결과(claude_seed.json)와 중복 항목은 confidence를 "verified"로 업데이트
+- STEP 1 결과(claude_seed.jsonl)와 중복 항목은 confidence를 "verified"로 업데이트
 - 신규 항목만 추가
-- 결과: data/raw/classified.json 저장
+- 결과: data/raw/classified.jsonl 저장 (dataset 모듈, 레거시 .json 배열도 읽음)
 """
 
 import json
 import os
 import re
-import time
 from datetime import datetime, timezone
 from typing import Optional
 
 from dotenv import load_dotenv
 
+from crawlers.http_client import HostRateLimiter, wrap_anthropic
+import dataset
+from merge_engine import merge_terms
+from llm_batch import UsageMeter, run_messages
+from near_dup import ChunkDeduper
+from chunk_packer import pack_segments, split_text
+from relevance import DEFAULT_TOKEN_BUDGET, EXPECTED_OUTPUT_TOKENS, LLMRouter, RelevanceScorer
+from streaming import consume_stream
+from text_features import detect_language, estimate_tokens
+
 load_dotenv()
 
 _client = None
+_usage = UsageMeter()  # Claude 응답 토큰 누적 (입력/캐시 쓰기/캐시 읽기/출력)
 
 def _get_client():
-    """Claude API 클라이언트 (Reddit 처리 시에만 사용, lazy 로드)"""
+    """Claude API 클라이언트 (Reddit 처리 시에만 사용, lazy 로드, 기록/재생 래퍼 적용)"""
     global _client
     if _client is None:
         try:
             from anthropic import Anthropic
             key = os.environ.get("ANTHROPIC_API_KEY")
-            _client = Anthropic(api_key=key) if key else None
+            _client = wrap_anthropic(Anthropic(api_key=key) if key else None)
         except Exception:
             _client = None
     return _client
 
-# 청킹 크기 (문자 수)
-CHUNK_SIZE = 500
-# 청크당 API 호출 간격 (초)
+# 청크 분할/묶음 기준 (추정 토큰 수, text_features.estimate_tokens)
+CHUNK_MAX_TOKENS = 1500          # 이보다 긴 게시물만 분할
+PACK_TARGET_TOKENS = 6000        # 요청 하나에 묶을 본문 토큰
+PACK_MAX_OUTPUT_TOKENS = 8192
+# 요청 하나에 묶을 최대 구간 수 (구간당 예상 응답 토큰 기준, 응답이 max_tokens를 넘지 않도록)
+PACK_MAX_SEGMENTS = PACK_MAX_OUTPUT_TOKENS // EXPECTED_OUTPUT_TOKENS
+# 동기 호출 시 요청 간 최소 간격 (초) — 실행 전체가 제한기 하나를 공유 (스트리밍은 게시물마다 호출)
 API_DELAY = 0.8
+_api_limiter = HostRateLimiter(min_interval=API_DELAY)
 WEVERSE_SOURCE = "weverse"
 REDDIT_SOURCE = "reddit"
 EBAY_SOURCE = "ebay"
+# Reddit 일반글(비거래글) 처리 상한 (배치: 전체 중 앞쪽, 스트리밍: 실행당)
+REDDIT_OTHER_POST_LIMIT = 100
 
 # eBay 규칙 기반 추출용: 2~6자 영문 대문자 약어 패턴
 ABBREV_PATTERN = re.compile(r"\b[A-Z]{2,6}\b")
@@ -48,10 +65,10 @@ CLASSIFY_SYSTEM_PROMPT = """당신은 K-pop 굿즈 거래 전문 언어 분석
 일반적인 영어 단어나 문법어는 추출하지 마세요.
 반드시 JSON 배열만 응답하고 다른 텍스트는 포함하지 마세요."""
 
-CLASSIFY_PROMPT_TEMPLATE = """아래 텍스트에서 K-pop 굿즈 거래 관련 신조어/약어/아이돌 약칭만 추출해줘.
-
-텍스트:
-{text}
+# 정적 지시문/스키마 (시스템 프롬프트와 함께 캐시 접두부)
+CLASSIFY_INSTRUCTIONS = """사용자가 보내는 텍스트에서 K-pop 굿즈 거래 관련 신조어/약어/아이돌 약칭만 추출해줘.
+텍스트는 <segment id="...">...</segment> 구간 여러 개로 나뉘어 있고, 구간마다 서로 다른 게시물이야.
+각 항목의 "segment"에는 그 용어가 나온 구간 id를 적어줘 (여러 구간에 나오면 구간마다 한 항목씩).
 
 각 항목을 아래 JSON 구조로 추출해줘. 해당 없으면 null로 표기.
 term_type은 "slang"(신조어), "abbreviation"(약어), "standard"(표준어), "typo"(오타추정) 중 하나.
@@ -60,6 +77,7 @@ confidence는 "high"(명확), "medium"(보통), "low"(불확실) 중 하나.
 
 [
   {{
+    "segment": "구간 id",
     "original_term": "추출된 용어",
     "language": "ko/en/mixed",
     "term_type": "slang/abbreviation/standard/typo",
@@ -76,26 +94,36 @@ confidence는 "high"(명확), "medium"(보통), "low"(불확실) 중 하나.
 K-pop과 무관한 일반 단어(the, is, a, and, 등)는 제외해줘.
 K-pop 굿즈 거래에 특화된 용어만 추출해줘."""
 
+KNOWN_TERMS_HEADER = """이미 사전에 있는 용어 (용어 → 표준 영어 / 표준 한국어).
+이 목록의 용어는 다시 추출하지 말고, 목록에 없거나 목록과 다른 뜻으로 쓰인 용어만 추출해줘.
+"""
 
-def chunk_text(text: str, chunk_size: int = CHUNK_SIZE) -> list[str]:
-    """텍스트를 chunk_size 단위로 분할 (단어 경계 존중)"""
-    if len(text) <= chunk_size:
-        return [text]
+# 요청마다 바뀌는 부분 (캐시 접두부 뒤): 구간을 이어 붙임
+SEGMENT_TEMPLATE = """<segment id="{id}">
+{text}
+</segment>
+"""
+SEGMENT_OVERHEAD_TOKENS = estimate_tokens(SEGMENT_TEMPLATE.format(id="s0000", text=""))
 
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        if end >= len(text):
-            chunks.append(text[start:])
-            break
-        # 공백에서 자르기
-        space_pos = text.rfind(" ", start, end)
-        if space_pos > start:
-            end = space_pos
-        chunks.append(text[start:end])
-        start = end
-    return chunks
+# 캐시 접두부에 넣을 기존 용어 최대 수 (접두부가 바뀌면 캐시를 새로 써야 하므로 정렬 순서 고정)
+KNOWN_TERMS_LIMIT = 2000
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_MAX_TOKENS) -> list[str]:
+    """텍스트를 max_tokens(추정) 이하로 분할 (짧으면 그대로, 줄/단어 경계 존중)"""
+    return split_text(text, max_tokens)
+
+
+def estimate_llm_tokens(text: str) -> int:
+    """
+    게시물 텍스트의 LLM 추출 예상 토큰 (본문 + 구간별 응답 + 묶음 단위 시스템/지시문의 본문 비례 몫)
+    기존 용어 목록은 프롬프트 캐시에서 읽히므로(입력 단가의 1/10) 제외
+    """
+    tokens = estimate_tokens(text)
+    segments = len(chunk_text(text))
+    overhead = estimate_tokens(CLASSIFY_SYSTEM_PROMPT + CLASSIFY_INSTRUCTIONS)
+    share = overhead * tokens // PACK_TARGET_TOKENS + 1
+    return tokens + segments * (SEGMENT_OVERHEAD_TOKENS + EXPECTED_OUTPUT_TOKENS) + share
 
 
 def parse_json_response(text: str) -> list[dict]:
@@ -119,23 +147,67 @@ def parse_json_response(text: str) -> list[dict]:
     return []
 
 
-def extract_terms_from_chunk(text: str, source: str) -> list[dict]:
-    """단일 청크에서 신조어/약어 추출 (Claude API 사용)"""
-    client = _get_client()
-    if not client:
-        return []
-    prompt = CLASSIFY_PROMPT_TEMPLATE.format(text=text, source=source)
-    try:
-        response = client.messages.create(
-            model="claude-opus-4-6",
-            max_tokens=2048,
-            system=CLASSIFY_SYSTEM_PROMPT,
-            messages=[{"role": "user", "content": prompt}],
-        )
-        return parse_json_response(response.content[0].text)
-    except Exception as e:
-        print(f"    [ERROR] API 호출 실패: {e}")
+def salvage_json_objects(text: str) -> list[dict]:
+    """잘린 JSON 배열 응답에서 끝까지 완성된 객체만 추출 (max_tokens로 끊긴 응답용)"""
+    start = text.find("[")
+    if start == -1:
         return []
+    decoder = json.JSONDecoder()
+    items, pos = [], start + 1
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        try:
+            item, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        if isinstance(item, dict):
+            items.append(item)
+    return items
+
+
+def known_terms_block(seed_lookup: Optional[dict], limit: int = KNOWN_TERMS_LIMIT) -> str:
+    """시드 사전 → 캐시 접두부용 압축 목록 ("pob → Pre-order Benefit / 선주문 특전", 용어순 정렬)"""
+    lines = []
+    for key in sorted(seed_lookup or {})[:limit]:
+        entry = seed_lookup[key]
+        lines.append(f"{entry['original_term']} → {entry.get('standard_en') or '-'} / {entry.get('standard_ko') or '-'}")
+    return "\n".join(lines)
+
+
+def system_blocks(source: str, known_terms: str = "") -> list[dict]:
+    """
+    시스템 프롬프트 블록: [시스템 + 지시문/스키마] (+ [기존 용어 목록])
+    마지막 블록에 cache_control → 청크가 달라도 이 접두부는 프롬프트 캐시에서 재사용
+    """
+    blocks = [{"type": "text", "text": CLASSIFY_SYSTEM_PROMPT + "\n\n" + CLASSIFY_INSTRUCTIONS.format(source=source)}]
+    if known_terms:
+        blocks.append({"type": "text", "text": KNOWN_TERMS_HEADER + known_terms})
+    blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+def pack_request(segments: list[tuple[int, str]], source: str, system: Optional[list[dict]] = None) -> dict:
+    """구간 묶음 추출 요청 인자 (messages.create / 배치 params 공용, system은 실행마다 한 번 만든 블록 재사용)"""
+    content = "".join(SEGMENT_TEMPLATE.format(id=f"s{seg_id}", text=text) for seg_id, text in segments)
+    return {
+        "model": "claude-opus-4-6",
+        "max_tokens": PACK_MAX_OUTPUT_TOKENS,
+        "system": system or system_blocks(source),
+        "messages": [{"role": "user", "content": content}],
+    }
+
+
+def split_by_segment(items: list, seg_ids: list[int]) -> dict[int, list[dict]]:
+    """묶음 응답 → 구간 id별 용어 ("segment"가 없거나 모르는 id면 첫 구간으로)"""
+    by_label = {f"s{seg_id}": seg_id for seg_id in seg_ids}
+    out: dict[int, list[dict]] = {seg_id: [] for seg_id in seg_ids}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        label = str(item.pop("segment", "") or "").strip()
+        out[by_label.get(label, seg_ids[0])].append(item)
+    return out
 
 
 def _extract_terms_rulebased(text: str, seed_lookup: dict) -> list[dict]:
@@ -181,44 +253,175 @@ def _extract_terms_rulebased(text: str, seed_lookup: dict) -> list[dict]:
     return terms
 
 
-def process_reddit_posts(posts: list[dict], seed_lookup: Optional[dict] = None) -> list[dict]:
-    """Reddit 게시물에서 신조어 추출 (Claude 있으면 LLM, 없으면 규칙 기반)"""
+def process_reddit_posts(
+    posts: list[dict],
+    seed_lookup: Optional[dict] = None,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    batch: bool = False,
+) -> list[dict]:
+    """
+    Reddit 게시물에서 신조어 추출 (Claude 있으면 LLM, 없으면 규칙 기반)
+    Claude 사용 시 관련도 점수 상위 게시물만 token_budget 안에서 LLM으로, 나머지는 규칙 기반
+    batch=True면 LLM 청크 전체를 Message Batches 작업 하나로 제출 (실패 시 동기 호출로 폴백)
+    """
     trade_posts = [p for p in posts if p.get("is_trade_post")]
     other_posts = [p for p in posts if not p.get("is_trade_post")]
-    target_posts = trade_posts + other_posts[:100]
-    print(f"  Reddit 처리: 거래글 {len(trade_posts)}개 + 일반글 {min(len(other_posts), 100)}개 = {len(target_posts)}개")
+    target_posts = trade_posts + other_posts[:REDDIT_OTHER_POST_LIMIT]
+    print(
+        f"  Reddit 처리: 거래글 {len(trade_posts)}개 + "
+        f"일반글 {min(len(other_posts), REDDIT_OTHER_POST_LIMIT)}개 = {len(target_posts)}개"
+    )
 
+    seed_lookup = seed_lookup or {}
     use_claude = _get_client() is not None
     if use_claude:
-        print(f"    → Claude API로 추출")
+        router = LLMRouter(RelevanceScorer(seed_lookup), token_budget, cost_fn=estimate_llm_tokens)
+        use_llm = router.plan([(post_text(p), bool(p.get("is_trade_post"))) for p in target_posts])
+        print(f"    → 관련도 상위 {sum(use_llm)}개 Claude API로 추출, 나머지 규칙 기반")
+        router.print_stats()
     else:
+        use_llm = [False] * len(target_posts)
         print(f"    → 규칙 기반 추출 (API 불필요)")
-        seed_lookup = seed_lookup or {}
 
-    all_terms = []
-    for i, post in enumerate(target_posts):
-        full_text = post.get("title", "") + "\n" + post.get("selftext", "")
-        comments = post.get("top_comments", [])
-        if comments:
-            full_text += "\n" + "\n".join(comments[:10])
+    dedup = ChunkDeduper() if use_claude else None
+    system = system_blocks(REDDIT_SOURCE, known_terms_block(seed_lookup)) if use_claude else None
+    usage_start = _usage.snapshot()
+    if use_claude:
+        all_terms = extract_posts_packed(target_posts, use_llm, seed_lookup, dedup, system, batch=batch)
+    else:
+        all_terms = []
+        for i, post in enumerate(target_posts):
+            all_terms.extend(extract_post_terms(post, False, seed_lookup))
+            if (i + 1) % 20 == 0:
+                print(f"    진행: {i+1}/{len(target_posts)} (추출 {len(all_terms)}개)")
+
+    if dedup:
+        dedup.print_stats()
+    _usage.print_since(usage_start, "reddit")
+    return all_terms
+
+
+def post_text(post: dict) -> str:
+    """게시물 추출 대상 텍스트 (제목 + 본문 + 상위 댓글 10개)"""
+    full_text = post.get("title", "") + "\n" + post.get("selftext", "")
+    comments = post.get("top_comments", [])
+    if comments:
+        full_text += "\n" + "\n".join(comments[:10])
+    return full_text
+
+
+def _seed_hits(text: str, seed_lookup: Optional[dict]) -> list[dict]:
+    """
+    텍스트에 그대로 나온 시드 용어 (verified 항목만)
+    LLM에는 기존 용어를 다시 추출하지 말라고 하므로, 병합 시 verified 갱신용으로 로컬에서 찾아 붙임
+    """
+    return [t for t in _extract_terms_rulebased(text, seed_lookup or {}) if t["confidence"] == "verified"]
+
+
+def post_chunks(full_text: str, dedup: Optional[ChunkDeduper] = None) -> list[str]:
+    """LLM에 보낼 청크 목록 (dedup 지정 시 상용구 줄 묶음은 별도 청크)"""
+    texts = dedup.split_boilerplate(full_text) if dedup else (full_text,)
+    return [c for text in texts if text.strip() for c in chunk_text(text)]
+
+
+def extract_posts_packed(
+    posts: list[dict],
+    use_llm: list[bool],
+    seed_lookup: dict,
+    dedup: ChunkDeduper,
+    system: Optional[list[dict]] = None,
+    batch: bool = False,
+    verbose: bool = True,
+) -> list[dict]:
+    """
+    LLM 대상 게시물의 대표 청크(유사 청크 제외)를 PACK_TARGET_TOKENS 단위 요청으로 묶어 추출
+    → 구간 id("s<대표 청크 번호>")로 결과를 나눠 게시물 순서대로 배분 (유사 청크는 대표 결과 복사)
+    batch=True면 묶음 요청 전체를 Message Batches 작업으로 제출 (custom_id = "pack-<회차>-<번호>")
+    응답이 max_tokens에서 잘린 묶음은 반으로 나눠 다시 요청, 구간 하나짜리가 잘리면 완성된 객체만 살림
+    """
+    rule_terms: dict[int, list[dict]] = {}
+    post_reps: dict[int, list[int]] = {}
+    pending: list[tuple[int, str]] = []
+    for i, post in enumerate(posts):
+        full_text = post_text(post)
         if len(full_text.strip()) < 10:
             continue
+        if not use_llm[i]:
+            rule_terms[i] = _extract_terms_rulebased(full_text, seed_lookup)
+            continue
+        rule_terms[i] = _seed_hits(full_text, seed_lookup)
+        post_reps[i] = []
+        for chunk in post_chunks(full_text, dedup):
+            rep_id, is_new = dedup.cluster(chunk)
+            if is_new:
+                pending.append((rep_id, chunk))
+            post_reps[i].append(rep_id)
+
+    packs = pack_segments(pending, PACK_TARGET_TOKENS, PACK_MAX_SEGMENTS, SEGMENT_OVERHEAD_TOKENS)
+    if verbose and packs:
+        print(
+            f"    → LLM 요청 {len(packs)}개{' (배치)' if batch else ''}: 구간 {len(pending)}개, "
+            f"요청당 평균 {len(pending) / len(packs):.1f}개"
+        )
+    round_no = 0
+    while packs:
+        requests = {
+            f"pack-{round_no}-{n}": pack_request(pack, REDDIT_SOURCE, system) for n, pack in enumerate(packs)
+        }
+        truncated: set = set()
+        texts = run_messages(
+            _get_client(), requests, batch=batch, usage=_usage, truncated=truncated, limiter=_api_limiter
+        )
+        retry = []
+        for cid, pack in zip(requests, packs):
+            text = texts.get(cid)
+            if cid in truncated and len(pack) > 1:
+                mid = len(pack) // 2
+                retry += [pack[:mid], pack[mid:]]
+                continue
+            if not text:
+                items = []
+            elif cid in truncated:
+                items = salvage_json_objects(text)
+                print(f"    [WARN] 응답 잘림 ({cid}, 구간 1개) → 완성된 {len(items)}개만 사용")
+            else:
+                items = parse_json_response(text)
+            for seg_id, terms in split_by_segment(items, [seg_id for seg_id, _ in pack]).items():
+                dedup.set_terms(seg_id, terms)
+        if retry and verbose:
+            print(f"    → 응답 잘림 {len(retry) // 2}건: 묶음을 나눠 {len(retry)}개 재요청")
+        packs = retry
+        round_no += 1
 
-        if use_claude:
-            chunks = chunk_text(full_text)
-            for chunk in chunks:
-                for t in extract_terms_from_chunk(chunk, REDDIT_SOURCE):
-                    t["source"] = REDDIT_SOURCE
-                    all_terms.append(t)
-                time.sleep(API_DELAY)
-        else:
-            for t in _extract_terms_rulebased(full_text, seed_lookup):
+    all_terms = []
+    for i in range(len(posts)):
+        if i in rule_terms:
+            all_terms.extend(rule_terms[i])
+        for rep_id in post_reps.get(i, ()):
+            for t in dedup.terms_for(rep_id):
+                t["source"] = REDDIT_SOURCE
                 all_terms.append(t)
+    return all_terms
 
-        if (i + 1) % 20 == 0:
-            print(f"    진행: {i+1}/{len(target_posts)} (추출 {len(all_terms)}개)")
 
-    return all_terms
+def extract_post_terms(
+    post: dict,
+    use_claude: bool,
+    seed_lookup: Optional[dict] = None,
+    dedup: Optional[ChunkDeduper] = None,
+    system: Optional[list[dict]] = None,
+) -> list[dict]:
+    """
+    게시물 하나(제목+본문+상위 댓글)에서 용어 추출 (스트리밍 모드: 게시물 하나의 구간들을 요청 하나로)
+    dedup 지정 시 반복 상용구 줄을 따로 청킹하고, 이미 추출한 청크와 유사한 청크는 API 호출 없이 결과 재사용
+    system: 실행마다 한 번 만든 시스템 블록 (기존 용어 목록 포함 → 프롬프트 캐시 접두부)
+    """
+    if not use_claude:
+        full_text = post_text(post)
+        if len(full_text.strip()) < 10:
+            return []
+        return _extract_terms_rulebased(full_text, seed_lookup or {})
+    return extract_posts_packed([post], [True], seed_lookup or {}, dedup or ChunkDeduper(), system, verbose=False)
 
 
 def process_ebay_titles(ebay_items: list[dict], seed_lookup: dict) -> list[dict]:
@@ -293,16 +496,8 @@ def process_weverse_products(products: list[dict]) -> list[dict]:
         if not name:
             continue
 
-        lang = p.get("language", "ko")
-        # 한글 포함 여부로 언어 판별
-        has_korean = any("\uAC00" <= c <= "\uD7A3" for c in name)
-        has_english = any("a" <= c.lower() <= "z" for c in name)
-        if has_korean and has_english:
-            lang = "mixed"
-        elif has_korean:
-            lang = "ko"
-        else:
-            lang = "en"
+        # 한글/영문 포함 여부로 언어 판별 (ko / en / mixed)
+        lang = detect_language(name)
 
         # 영어 이름이 있으면 활용
         en_name = p.get("product_name_en", name if lang == "en" else "")
@@ -326,46 +521,33 @@ def process_weverse_products(products: list[dict]) -> list[dict]:
 def merge_with_existing(
     new_terms: list[dict],
     existing_terms: list[dict],
+    fuzzy: bool = False,
+    decisions_path: Optional[str] = None,
 ) -> tuple[list[dict], int]:
     """
-    기존 항목(claude_seed)과 신규 항목 병합
-    - 중복 항목: confidence를 "verified"로 업데이트
+    기존 항목(claude_seed)과 신규 항목 병합 (merge_engine 정규화 키 인덱스 사용)
+    - 중복 항목(정규화 키 기준, fuzzy=True면 편집거리 1 이내 포함): confidence를 "verified"로 업데이트
     - 신규 항목만 추가
+    - decisions_path 지정 시 정규화/퍼지 병합 결정을 JSON으로 저장
     Returns: (병합된 전체 목록, verified 업데이트 수)
     """
-    # 기존 항목 인덱스 (original_term + language 기준)
-    existing_map: dict[str, int] = {}
-    merged = list(existing_terms)  # 복사본
-
-    for i, entry in enumerate(merged):
-        key = f"{entry['original_term'].lower()}_{entry['language']}"
-        existing_map[key] = i
-
-    verified_count = 0
-    added_count = 0
-
-    for term in new_terms:
-        if not term.get("original_term"):
-            continue
-
-        key = f"{term['original_term'].lower()}_{term.get('language', 'ko')}"
-
-        if key in existing_map:
-            # 기존 항목 있으면 confidence만 verified로 업데이트
-            idx = existing_map[key]
-            merged[idx]["confidence"] = "verified"
-            # 표준어 정보가 비어있으면 보완
-            if not merged[idx].get("standard_en") and term.get("standard_en"):
-                merged[idx]["standard_en"] = term["standard_en"]
-            verified_count += 1
-        else:
-            # 신규 항목 추가
-            term.setdefault("confidence", "medium")
-            merged.append(term)
-            existing_map[key] = len(merged) - 1
-            added_count += 1
+    merged, report = merge_terms(new_terms, existing_terms, fuzzy=fuzzy)
+    verified_count = report["exact"] + report["normalized"] + report["fuzzy"]
+
+    print(
+        f"  병합 결과: {verified_count}개 verified 업데이트 "
+        f"(정확 {report['exact']} / 정규화 {report['normalized']} / 퍼지 {report['fuzzy']}), "
+        f"{report['added']}개 신규 추가"
+    )
+    if report["existing_collapsed"]:
+        print(f"  기존 사전 내 중복 {report['existing_collapsed']}개 통합")
+
+    if decisions_path and report["decisions"]:
+        os.makedirs(os.path.dirname(decisions_path) or ".", exist_ok=True)
+        with open(decisions_path, "w", encoding="utf-8") as f:
+            json.dump(report["decisions"], f, ensure_ascii=False, indent=2)
+        print(f"  병합 결정 {len(report['decisions'])}건 → {decisions_path}")
 
-    print(f"  병합 결과: {verified_count}개 verified 업데이트, {added_count}개 신규 추가")
     return merged, verified_count
 
 
@@ -384,76 +566,152 @@ def validate_entry(entry: dict) -> bool:
     return True
 
 
-def classify(
-    seed_path: str = "data/raw/claude_seed.json",
-    reddit_path: str = "data/raw/reddit_raw.json",
-    weverse_path: str = "data/raw/weverse_raw.json",
-    output_path: str = "data/raw/classified.json",
-) -> list[dict]:
-    """
-    전체 분류 파이프라인 실행
-    Returns: 최종 병합된 항목 리스트
-    """
-    print("[classifier] 분류 파이프라인 시작")
-
-    # ── STEP 4-1: 기존 씨드 로드 ──────────────────────────
-    existing_terms: list[dict] = []
-    if os.path.exists(seed_path):
-        with open(seed_path, encoding="utf-8") as f:
-            existing_terms = json.load(f)
-        print(f"  씨드 사전 로드: {len(existing_terms)}개 항목")
-    else:
+def load_seed_terms(seed_path: str) -> list[dict]:
+    """STEP 4-1: 기존 씨드 사전 로드 (없으면 빈 목록)"""
+    if not dataset.exists(seed_path):
         print(f"  [WARN] 씨드 사전 없음: {seed_path}")
+        return []
+    existing_terms = dataset.read_records(seed_path)
+    print(f"  씨드 사전 로드: {len(existing_terms)}개 항목")
+    return existing_terms
 
-    all_new_terms: list[dict] = []
 
-    # ── STEP 4-2: 위버스샵 표준어 처리 ────────────────────
-    if os.path.exists(weverse_path):
-        with open(weverse_path, encoding="utf-8") as f:
-            weverse_data = json.load(f)
-        print(f"\n  위버스샵 데이터 처리: {len(weverse_data)}개 상품")
-        weverse_terms = process_weverse_products(weverse_data)
-        print(f"  → {len(weverse_terms)}개 표준어 변환")
-        all_new_terms.extend(weverse_terms)
-    else:
-        print(f"  [WARN] 위버스샵 데이터 없음: {weverse_path}")
+def build_seed_lookup(existing_terms: list[dict]) -> dict:
+    """시드 용어 룩업 (Reddit/eBay 규칙 기반 추출용)"""
+    return {e.get("original_term", "").lower(): e for e in existing_terms if e.get("original_term")}
 
-    # 시드 용어 룩업 (Reddit/eBay 규칙 기반 추출용)
-    seed_lookup = {e.get("original_term", "").lower(): e for e in existing_terms if e.get("original_term")}
-
-    # ── STEP 4-3: Reddit 원문 처리 ─────────────────────────
-    if os.path.exists(reddit_path):
-        with open(reddit_path, encoding="utf-8") as f:
-            reddit_data = json.load(f)
-        print(f"\n  Reddit 데이터 처리: {len(reddit_data)}개 게시물")
-        reddit_terms = process_reddit_posts(reddit_data, seed_lookup=seed_lookup)
-        reddit_terms = [t for t in reddit_terms if validate_entry(t)]
-        print(f"  → {len(reddit_terms)}개 용어 추출")
-        all_new_terms.extend(reddit_terms)
-    else:
+
+def extract_weverse_terms(weverse_path: str) -> list[dict]:
+    """STEP 4-2: 위버스샵 표준어 처리 (API 불필요 → 크롤링 직후 바로 실행 가능)"""
+    if not dataset.exists(weverse_path):
+        print(f"  [WARN] 위버스샵 데이터 없음: {weverse_path}")
+        return []
+    weverse_data = dataset.read_records(weverse_path)
+    print(f"\n  위버스샵 데이터 처리: {len(weverse_data)}개 상품")
+    weverse_terms = process_weverse_products(weverse_data)
+    print(f"  → {len(weverse_terms)}개 표준어 변환")
+    return weverse_terms
+
+
+def extract_reddit_terms(
+    reddit_path: str,
+    seed_lookup: dict,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    batch: bool = False,
+) -> list[dict]:
+    """STEP 4-3: Reddit 원문 처리"""
+    if not dataset.exists(reddit_path):
         print(f"  [INFO] Reddit 데이터 없음 (API 없이 실행 시 정상)")
+        return []
+    reddit_data = dataset.read_records(reddit_path)
+    print(f"\n  Reddit 데이터 처리: {len(reddit_data)}개 게시물")
+    reddit_terms = process_reddit_posts(reddit_data, seed_lookup=seed_lookup, token_budget=token_budget, batch=batch)
+    reddit_terms = [t for t in reddit_terms if validate_entry(t)]
+    print(f"  → {len(reddit_terms)}개 용어 추출")
+    return reddit_terms
 
-    # ── STEP 4-3b: eBay 제목 처리 (Claude 없이 규칙 기반) ─
-    ebay_path = os.path.join(os.path.dirname(seed_path), "ebay_raw.json")
-    if os.path.exists(ebay_path):
-        with open(ebay_path, encoding="utf-8") as f:
-            ebay_data = json.load(f)
-        print(f"\n  eBay 데이터 처리: {len(ebay_data)}개 제목 (규칙 기반, API 불필요)")
-        ebay_terms = process_ebay_titles(ebay_data, seed_lookup)
-        ebay_terms = [t for t in ebay_terms if validate_entry(t)]
-        print(f"  → {len(ebay_terms)}개 용어 추출")
-        all_new_terms.extend(ebay_terms)
-    else:
+
+def extract_ebay_terms(ebay_path: str, seed_lookup: dict) -> list[dict]:
+    """STEP 4-3b: eBay 제목 처리 (Claude 없이 규칙 기반)"""
+    if not dataset.exists(ebay_path):
         print(f"  [INFO] eBay 데이터 없음: {ebay_path}")
+        return []
+    ebay_data = dataset.read_records(ebay_path)
+    print(f"\n  eBay 데이터 처리: {len(ebay_data)}개 제목 (규칙 기반, API 불필요)")
+    ebay_terms = process_ebay_titles(ebay_data, seed_lookup)
+    ebay_terms = [t for t in ebay_terms if validate_entry(t)]
+    print(f"  → {len(ebay_terms)}개 용어 추출")
+    return ebay_terms
+
+
+def stream_terms_path(stream_path: str) -> str:
+    """스트림 파일별 추출 결과 누적 파일 (reddit.jsonl → reddit.terms.jsonl)"""
+    root, _ = os.path.splitext(stream_path)
+    return f"{root}.terms.jsonl"
+
+
+def stream_extract_terms(
+    source: str,
+    stream_path: str,
+    seed_lookup: Optional[dict] = None,
+    follow: bool = True,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> list[dict]:
+    """
+    스트리밍 모드 소스별 추출 (main.py --stream): 크롤러가 내보낸 항목을 도착 즉시 처리
+    - 추출 용어는 "<소스>.terms.jsonl"에 누적하고, 그 다음에 소비 오프셋 저장
+      → 중단 후 재실행하면 마지막 오프셋 이후 항목만 처리 (중복 추출분은 병합에서 정리)
+    - follow=True면 크롤러가 끝날(.done) 때까지 대기하며 계속 처리
+    - 용어/언어/표준어가 모두 같은 항목은 한 번만 기록 (배치 모드의 항목 간 중복 제거와 동일)
+    - Reddit + Claude: 관련도 점수가 기준 이상인 게시물만 token_budget이 남는 동안 LLM, 나머지 규칙 기반
+    Returns: 지금까지 누적된 이 소스의 전체 용어
+    """
+    terms_path = stream_terms_path(stream_path)
+    use_claude = source == REDDIT_SOURCE and _get_client() is not None
+    dedup = ChunkDeduper() if use_claude else None
+    router = (
+        LLMRouter(RelevanceScorer(seed_lookup), token_budget, cost_fn=estimate_llm_tokens) if use_claude else None
+    )
+    system = system_blocks(REDDIT_SOURCE, known_terms_block(seed_lookup)) if use_claude else None
+    usage_start = _usage.snapshot()
+    other_left = REDDIT_OTHER_POST_LIMIT
+
+    def row_key(t: dict) -> tuple:
+        return (t.get("original_term", "").lower(), t.get("language"), t.get("standard_en"), t.get("standard_ko"))
+
+    written = {row_key(t) for t in dataset.read_records(terms_path)}
+
+    os.makedirs(os.path.dirname(terms_path) or ".", exist_ok=True)
+    out = open(terms_path, "a", encoding="utf-8")
+
+    def handle(item: dict) -> None:
+        nonlocal other_left
+        if source == WEVERSE_SOURCE:
+            terms = process_weverse_products([item])
+        elif source == REDDIT_SOURCE:
+            if not item.get("is_trade_post"):
+                if other_left <= 0:
+                    return
+                other_left -= 1
+            use_llm = router is not None and router.admit(post_text(item), bool(item.get("is_trade_post")))
+            terms = [t for t in extract_post_terms(item, use_llm, seed_lookup, dedup, system) if validate_entry(t)]
+        else:
+            terms = [t for t in process_ebay_titles([item], seed_lookup or {}) if validate_entry(t)]
+        for t in terms:
+            key = row_key(t)
+            if key not in written:
+                written.add(key)
+                out.write(json.dumps(t, ensure_ascii=False) + "\n")
 
-    # ── STEP 4-4: 기존 씨드와 병합 ────────────────────────
+    try:
+        consumed = consume_stream(stream_path, handle, follow=follow, checkpoint=out.flush)
+    finally:
+        out.close()
+
+    terms = dataset.read_records(terms_path)
+    print(f"  [{source}] 스트림 {consumed}개 항목 처리 → 누적 용어 {len(terms)}개")
+    if router:
+        router.print_stats()
+    if dedup:
+        dedup.print_stats()
+    _usage.print_since(usage_start, source)
+    return terms
+
+
+def finalize_terms(
+    existing_terms: list[dict],
+    all_new_terms: list[dict],
+    output_path: str,
+    fuzzy_merge: bool = False,
+) -> list[dict]:
+    """STEP 4-4/4-5: 기존 씨드와 병합 후 저장 + 통계 출력"""
     print(f"\n  병합 시작: 기존 {len(existing_terms)}개 + 신규 {len(all_new_terms)}개")
-    merged, verified_count = merge_with_existing(all_new_terms, existing_terms)
+    decisions_path = os.path.join(os.path.dirname(output_path), "merge_decisions.json")
+    merged, verified_count = merge_with_existing(
+        all_new_terms, existing_terms, fuzzy=fuzzy_merge, decisions_path=decisions_path
+    )
 
-    # ── STEP 4-5: 결과 저장 ────────────────────────────────
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(merged, f, ensure_ascii=False, indent=2)
+    dataset.write_records(output_path, merged, id_field="original_term")
 
     # 통계
     ko_count = sum(1 for t in merged if t.get("language") in ("ko", "mixed"))
@@ -472,6 +730,32 @@ def classify(
     return merged
 
 
+def classify(
+    seed_path: str = "data/raw/claude_seed.jsonl",
+    reddit_path: str = "data/raw/reddit_raw.jsonl",
+    weverse_path: str = "data/raw/weverse_raw.jsonl",
+    output_path: str = "data/raw/classified.jsonl",
+    fuzzy_merge: bool = False,
+) -> list[dict]:
+    """
+    전체 분류 파이프라인 순차 실행 (main.py는 소스별 단계를 DAG로 나눠 병렬 실행)
+    fuzzy_merge: True면 병합 시 편집거리 기반 퍼지 매칭까지 적용
+    Returns: 최종 병합된 항목 리스트
+    """
+    print("[classifier] 분류 파이프라인 시작")
+
+    existing_terms = load_seed_terms(seed_path)
+    seed_lookup = build_seed_lookup(existing_terms)
+
+    all_new_terms: list[dict] = []
+    all_new_terms.extend(extract_weverse_terms(weverse_path))
+    all_new_terms.extend(extract_reddit_terms(reddit_path, seed_lookup))
+    ebay_path = os.path.join(os.path.dirname(seed_path), "ebay_raw.jsonl")
+    all_new_terms.extend(extract_ebay_terms(ebay_path, seed_lookup))
+
+    return finalize_terms(existing_terms, all_new_terms, output_path, fuzzy_merge=fuzzy_merge)
+
+
 if __name__ == "__main__":
     result = classify()
     print(f"\n분류 완료: {len(result)}개 항목")
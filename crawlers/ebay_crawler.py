@@ -1,20 +1,26 @@
 """
 eBay K-pop 굿즈 검색 결과 수집 (API 불필요, 스크래핑만 사용)
 - 검색어별 상품 제목 수집 → 원본 용어 추출에 활용
-- 수집 결과: data/raw/ebay_raw.json
+- 수집 결과: data/raw/ebay_raw.jsonl (제목 기준 중복 제거 후 누적 저장)
+- 검색어는 스레드 풀로 동시에 요청 (전역 요청 간격 유지), HTML 파싱은 프로세스 풀에서 처리
+- 최신 등록순으로 페이지를 넘기다 이미 본 제목만 나오는 페이지에서 해당 검색어 중단
 
 주의: eBay robots.txt 및 이용약관 확인 후 사용. 적절한 딜레이 유지.
 """
 
-import json
 import os
-import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Optional
 from datetime import datetime, timezone
 
 import requests
 from bs4 import BeautifulSoup
 
+from crawlers.http_client import HttpClient
+import dataset
+from streaming import ItemStream
+
 HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -34,19 +40,18 @@ SEARCH_QUERIES = [
     "kpop lightstick",
 ]
 
-MAX_PAGES_PER_QUERY = 2  # 검색어당 최대 페이지 수
+MAX_PAGES_PER_QUERY = 10  # 검색어당 최대 페이지 수 (이미 본 제목만 나오면 조기 중단)
 PAGE_SIZE = 48
-DELAY_SEC = 2.0  # 요청 간격 (과도한 요청 방지)
+DELAY_SEC = 2.0  # 전역 요청 간격 (모든 검색어 합산, 과도한 요청 방지)
+FETCH_WORKERS = 4  # 동시에 진행하는 검색어 수
+PARSE_WORKERS = min(4, os.cpu_count() or 1)  # HTML 파싱 프로세스 수 (0이면 요청 스레드에서 파싱)
 
 
-def fetch_page(url: str, session: requests.Session) -> Optional[str]:
+def fetch_page(url: str, client: HttpClient) -> Optional[str]:
     """페이지 HTML 가져오기"""
-    try:
-        resp = session.get(url, headers=HEADERS, timeout=15)
-        if resp.status_code == 200:
-            return resp.text
-    except Exception as e:
-        print(f"    [WARN] 요청 실패: {e}")
+    resp = client.get(url)
+    if resp is not None and resp.status_code == 200:
+        return resp.text
     return None
 
 
@@ -68,46 +73,105 @@ def extract_titles_from_html(html: str, query: str) -> list[dict]:
     return items
 
 
-def crawl_ebay(output_path: str = "data/raw/ebay_raw.json") -> list[dict]:
+def search_url(query: str, page: int) -> str:
+    """eBay 검색 URL (국가별 도메인은 .com 사용, 최신 등록순)"""
+    return (
+        f"https://www.ebay.com/sch/i.html?_nkw={requests.utils.quote(query)}"
+        f"&_pgn={page}&_sop=10"
+    )
+
+
+def load_title_store(path: str) -> list[dict]:
+    """누적 제목 저장소 로드 (없으면 빈 목록, 레거시 JSON 배열도 읽음)"""
+    return dataset.read_records(path)
+
+
+def crawl_query(
+    query: str,
+    client: HttpClient,
+    seen: set[str],
+    seen_lock: threading.Lock,
+    parse_pool: Optional[ProcessPoolExecutor] = None,
+    max_pages: int = MAX_PAGES_PER_QUERY,
+    stream: Optional[ItemStream] = None,
+) -> list[dict]:
+    """
+    검색어 하나를 페이지 순서대로 수집
+    - 새 제목만 반환 (seen은 모든 검색어/이전 실행이 공유)
+    - 페이지의 제목이 전부 이미 본 것이면 이후 페이지 생략
+    - stream 지정 시 페이지마다 새 제목을 즉시 내보냄
+    """
+    new_items = []
+    for page in range(1, max_pages + 1):
+        html = fetch_page(search_url(query, page), client)
+        if not html:
+            break
+        if parse_pool is not None:
+            items = parse_pool.submit(extract_titles_from_html, html, query).result()
+        else:
+            items = extract_titles_from_html(html, query)
+        if not items:
+            break
+
+        fresh = []
+        with seen_lock:
+            for item in items:
+                if item["title"] not in seen:
+                    seen.add(item["title"])
+                    fresh.append(item)
+        new_items.extend(fresh)
+        if stream is not None:
+            stream.put_many(fresh)
+        print(f"    '{query}' 페이지 {page}: {len(items)}개 중 신규 {len(fresh)}개")
+        if not fresh:
+            break
+    return new_items
+
+
+def crawl_ebay(
+    output_path: str = "data/raw/ebay_raw.jsonl",
+    queries: Optional[list[str]] = None,
+    parse_workers: int = PARSE_WORKERS,
+    stream: Optional[ItemStream] = None,
+) -> list[dict]:
     """
     eBay K-pop 굿즈 검색 결과 수집
-    Returns: 수집된 상품 제목 리스트
+    - 기존 ebay_raw.jsonl에 없는 제목만 끝에 추가 (query는 처음 수집된 것 유지)
+    - stream 지정 시 새 제목을 페이지 단위로 즉시 내보냄 (main.py --stream)
+    Returns: 누적 저장된 상품 제목 리스트
     """
-    print("[ebay_crawler] eBay 수집 시작 (API 불필요)...")
-
-    session = requests.Session()
-    all_items = []
-
-    for query in SEARCH_QUERIES:
-        print(f"  검색: '{query}'")
-        for page in range(1, MAX_PAGES_PER_QUERY + 1):
-            # eBay 검색 URL (국가별 도메인은 .com 사용)
-            url = (
-                f"https://www.ebay.com/sch/i.html?_nkw={requests.utils.quote(query)}"
-                f"&_pgn={page}"
-            )
-            html = fetch_page(url, session)
-            if html:
-                items = extract_titles_from_html(html, query)
-                all_items.extend(items)
-                print(f"    페이지 {page}: {len(items)}개 수집")
-            time.sleep(DELAY_SEC)
-
-    # 중복 제목 제거 (query는 유지)
-    seen = set()
-    unique = []
-    for item in all_items:
-        t = item["title"]
-        if t not in seen:
-            seen.add(t)
-            unique.append(item)
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(unique, f, ensure_ascii=False, indent=2)
-
-    print(f"[ebay_crawler] 완료: {len(unique)}개 상품 제목 → {output_path}")
-    return unique
+    queries = queries or SEARCH_QUERIES
+    print(f"[ebay_crawler] eBay 수집 시작 (API 불필요, 검색어 {len(queries)}개)...")
+
+    store = load_title_store(output_path)
+    seen = {item["title"] for item in store}
+    seen_lock = threading.Lock()
+
+    # 요청 간격은 호스트(www.ebay.com) 단위 → 모든 검색어 합산 DELAY_SEC 유지
+    client = HttpClient(headers=HEADERS, pool_size=FETCH_WORKERS, min_interval=DELAY_SEC)
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    if stream is not None:
+        stream.open(backfill=store)
+    try:
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as ex:
+            results = list(ex.map(
+                lambda q: crawl_query(q, client, seen, seen_lock, parse_pool, stream=stream),
+                queries,
+            ))
+    finally:
+        if stream is not None:
+            stream.close()
+        if parse_pool is not None:
+            parse_pool.shutdown()
+        client.print_metrics("ebay")
+        client.close()
+
+    new_items = [item for items in results for item in items]
+    new_count = dataset.append_records(output_path, new_items, id_field="title")
+    store.extend(new_items)
+
+    print(f"[ebay_crawler] 완료: 신규 {new_count}개 / 누적 {len(store)}개 상품 제목 → {output_path}")
+    return store
 
 
 if __name__ == "__main__":
@@ -0,0 +1,486 @@
+"""
+크롤러 공용 HTTP 클라이언트
+- 호스트별 requests.Session (커넥션 풀) 재사용
+- 호스트별 최소 요청 간격 + 429/5xx 공통 백오프 (Retry-After 준수, 같은 호스트 요청 전체 보류)
+- 선택: 디스크 응답 캐시 (개발 중 반복 실행/재현 테스트용)
+    HttpClient(cache_dir="data/http_cache") 또는 환경변수 HTTP_CACHE_DIR
+- 호스트별 요청 수/지연/재시도/캐시 적중 통계
+- 기록/재생(record/replay): 모든 HttpClient 요청과 Claude API 호출을 gzip JSON Lines
+  아카이브에 기록하고, 재생 모드에서는 네트워크/대기 없이 아카이브에서 응답
+    set_fixture_mode("record", "fixtures/run.jsonl.gz")  # main.py --record
+    set_fixture_mode("replay", "fixtures/run.jsonl.gz")  # main.py --replay
+  크롤러 상태 파일(Reddit 커서, Weverse ETag 캐시)도 기록 시작 시점 내용을 아카이브에 넣고,
+  재생 때는 데이터 디렉터리 사본에 복원 → 요청 키(If-None-Match 등)가 기록과 같아지고 실제 파일은 그대로
+
+사용 예:
+    client = HttpClient(headers=HEADERS, min_interval=1.0)
+    resp = client.get(url)          # 네트워크 실패 시 None, 그 외에는 최종 응답
+    client.print_metrics("reddit")
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_TIMEOUT = 15
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 2.0          # 재시도 기본 대기 (초), 시도마다 2배
+MAX_BACKOFF = 120.0            # Retry-After 상한 (초)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    """호스트별 최소 요청 간격 보장 + 일시 보류 (스레드 안전)"""
+
+    def __init__(self, min_interval: float = 0.0):
+        self.min_interval = min_interval
+        self._next_slot: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> float:
+        """요청 가능 시각까지 대기. Returns: 대기한 시간 (초)"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+            return slot - now
+        return 0.0
+
+    def pause(self, host: str, seconds: float) -> None:
+        """해당 호스트 요청을 seconds 동안 보류 (429 응답 시)"""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._next_slot[host] = max(self._next_slot.get(host, 0.0), until)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 헤더 (초 또는 HTTP-date) → 대기 초"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ResponseCache:
+    """URL별 200 응답을 디스크에 JSON으로 보관 (ttl 초 경과 시 무효, None이면 무기한)"""
+
+    def __init__(self, cache_dir: str, ttl: Optional[float] = None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.json")
+
+    def load(self, url: str) -> Optional[requests.Response]:
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return build_response(data)
+
+    def save(self, url: str, resp: requests.Response) -> None:
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(serialize_response(url, resp), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def serialize_response(url: str, resp: requests.Response) -> dict:
+    """응답 → JSON 직렬화 가능한 dict (본문은 latin-1로 바이트 보존)"""
+    return {
+        "request_url": url,
+        "url": resp.url,
+        "status": resp.status_code,
+        "headers": dict(resp.headers),
+        "encoding": resp.encoding,
+        "body": resp.content.decode("latin-1"),
+    }
+
+
+def build_response(data: dict) -> requests.Response:
+    """serialize_response() 결과 → requests.Response"""
+    resp = requests.Response()
+    resp.status_code = data["status"]
+    resp.url = data.get("url") or data.get("request_url", "")
+    resp.headers = CaseInsensitiveDict(data.get("headers") or {})
+    resp.encoding = data.get("encoding")
+    resp._content = data.get("body", "").encode("latin-1")
+    return resp
+
+
+class FixtureArchive:
+    """
+    요청 키 → 응답 payload 아카이브 (gzip JSON Lines, 한 줄 = {"key", "payload"})
+    - record: 요청마다 한 줄씩 추가 (payload가 None이면 네트워크 실패로 기록)
+    - replay: 같은 키가 여러 번 기록됐으면 기록 순서대로 돌려주고, 마지막 응답은 반복
+    - 상태 파일 줄 {"state": 파일 이름, "content": 내용 또는 None(기록 시점에 없던 파일)}
+    """
+
+    def __init__(self, path: str, mode: str):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"알 수 없는 fixture 모드: {mode}")
+        self.path = path
+        self.mode = mode
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: dict[str, list] = defaultdict(list)
+        self._served: dict[str, int] = defaultdict(int)
+        self.state: dict[str, Optional[str]] = {}
+        self._fh = None
+        if mode == "replay":
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        if "state" in row:
+                            self.state[row["state"]] = row["content"]
+                        else:
+                            self._entries[row["key"]].append(row["payload"])
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._fh = gzip.open(path, "wt", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    def lookup(self, key: str) -> tuple[bool, Optional[dict]]:
+        """Returns: (기록 존재 여부, payload)"""
+        with self._lock:
+            payloads = self._entries.get(key)
+            if not payloads:
+                self.misses += 1
+                return False, None
+            i = min(self._served[key], len(payloads) - 1)
+            self._served[key] += 1
+            return True, payloads[i]
+
+    def record(self, key: str, payload: Optional[dict]) -> None:
+        line = json.dumps({"key": key, "payload": payload}, ensure_ascii=False)
+        with self._lock:
+            self._entries[key].append(payload)
+            if self._fh is not None:
+                self._fh.write(line + "\n")
+
+    def save_state(self, data_dir: str, names) -> None:
+        """record: 데이터 디렉터리의 상태 파일 내용을 아카이브에 기록 (크롤러 실행 전에 호출)"""
+        for name in names:
+            path = os.path.join(data_dir, name)
+            content = None
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    content = f.read()
+            line = json.dumps({"state": name, "content": content}, ensure_ascii=False)
+            with self._lock:
+                self.state[name] = content
+                if self._fh is not None:
+                    self._fh.write(line + "\n")
+
+    def restore_state(self, data_dir: str) -> int:
+        """replay: 기록 시점의 상태 파일을 data_dir에 복원 (기록 때 없던 파일은 삭제)
+        Returns: 복원한 파일 수"""
+        restored = 0
+        for name, content in self.state.items():
+            path = os.path.join(data_dir, name)
+            if content is None:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            restored += 1
+        return restored
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+_fixture: Optional[FixtureArchive] = None
+
+
+def set_fixture_mode(mode: Optional[str], path: Optional[str] = None) -> Optional[FixtureArchive]:
+    """프로세스 전역 기록/재생 모드 설정 (mode=None이면 해제)"""
+    global _fixture
+    if _fixture is not None:
+        _fixture.close()
+        _fixture = None
+    if mode:
+        _fixture = FixtureArchive(path, mode)
+        atexit.register(_fixture.close)
+    return _fixture
+
+
+def fixture_mode() -> Optional[str]:
+    """현재 모드: "record" | "replay" | None"""
+    return _fixture.mode if _fixture else None
+
+
+def is_replaying() -> bool:
+    return _fixture is not None and _fixture.mode == "replay"
+
+
+def request_key(method: str, url: str, headers: Optional[dict] = None, body: Optional[str] = None) -> str:
+    """아카이브 키: 메서드 + URL + 응답에 영향을 주는 조건부 헤더 + 본문 해시"""
+    key = f"{method} {url}"
+    for name in ("If-None-Match", "If-Modified-Since"):
+        if headers and headers.get(name):
+            key += f" {name}={headers[name]}"
+    if body:
+        key += " #" + hashlib.sha256(body.encode("utf-8")).hexdigest()[:16]
+    return key
+
+
+class _FixtureMessages:
+    def __init__(self, owner: "FixtureAnthropic"):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        inner = self._owner._inner
+        if _fixture is None:
+            return inner.messages.create(**kwargs)
+        body = json.dumps(kwargs, ensure_ascii=False, sort_keys=True, default=str)
+        key = request_key("POST", "anthropic:/v1/messages", body=body)
+        if _fixture.mode == "replay":
+            from anthropic.types import Message
+            found, payload = _fixture.lookup(key)
+            if not found or payload is None:
+                raise RuntimeError(f"재생 아카이브에 없는 Claude 요청: {key}")
+            return Message.model_validate(payload)
+        response = inner.messages.create(**kwargs)
+        _fixture.record(key, response.model_dump(mode="json"))
+        return response
+
+    def __getattr__(self, name):
+        # batches 등 기록/재생 대상이 아닌 엔드포인트는 원래 클라이언트로 위임
+        inner = self._owner._inner
+        if inner is None:
+            raise AttributeError(name)
+        return getattr(inner.messages, name)
+
+
+class FixtureAnthropic:
+    """
+    Anthropic 클라이언트 래퍼: messages.create 호출을 기록/재생 (모드는 호출 시점에 확인)
+    - 재생 모드에서는 inner 없이(API 키 없이)도 동작
+    - messages.batches는 기록하지 않고 그대로 위임 (배치 모드는 기록/재생 중 동기 호출로 대체, llm_batch)
+    """
+
+    def __init__(self, inner=None):
+        self._inner = inner
+        self.messages = _FixtureMessages(self)
+
+    def __getattr__(self, name):
+        if self._inner is None:
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+
+def wrap_anthropic(client):
+    """Claude 클라이언트를 기록/재생 래퍼로 감쌈 (None이면 재생 모드에서만 래퍼 반환)"""
+    if client is None:
+        return FixtureAnthropic(None) if is_replaying() else None
+    return FixtureAnthropic(client)
+
+
+class HttpClient:
+    """호스트별 세션 풀 + 공통 재시도/백오프 + 선택적 디스크 캐시 + 통계"""
+
+    def __init__(
+        self,
+        headers: Optional[dict] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        pool_size: int = 8,
+        min_interval: float = 0.0,
+        cache_dir: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+    ):
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.limiter = HostRateLimiter(min_interval)
+        cache_dir = cache_dir or os.environ.get("HTTP_CACHE_DIR")
+        self.cache = ResponseCache(cache_dir, cache_ttl) if cache_dir else None
+        self._sessions: dict[str, requests.Session] = {}
+        self._metrics: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    # ── 세션/통계 ─────────────────────────────────────────
+    def session_for(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _record(self, host: str, **deltas) -> None:
+        with self._lock:
+            m = self._metrics.setdefault(host, {
+                "requests": 0, "errors": 0, "retries": 0, "throttled": 0,
+                "cache_hits": 0, "latency_total": 0.0, "latency_max": 0.0, "wait_total": 0.0,
+                "replayed": 0, "replay_misses": 0,
+            })
+            for k, v in deltas.items():
+                if k == "latency":
+                    m["latency_total"] += v
+                    m["latency_max"] = max(m["latency_max"], v)
+                else:
+                    m[k] += v
+
+    def metrics(self) -> dict[str, dict]:
+        """호스트별 통계 사본 (latency_avg 포함)"""
+        with self._lock:
+            result = {}
+            for host, m in self._metrics.items():
+                row = dict(m)
+                row["latency_avg"] = m["latency_total"] / m["requests"] if m["requests"] else 0.0
+                result[host] = row
+            return result
+
+    def print_metrics(self, label: str = "http") -> None:
+        for host, m in sorted(self.metrics().items()):
+            if m["replayed"]:
+                print(f"  [{label}] {host}: 재생 {m['replayed']}회 (아카이브에 없음 {m['replay_misses']}회)")
+                continue
+            print(
+                f"  [{label}] {host}: 요청 {m['requests']}회 (평균 {m['latency_avg']:.2f}초, 최대 {m['latency_max']:.2f}초), "
+                f"재시도 {m['retries']}회, 429 {m['throttled']}회, 오류 {m['errors']}회, "
+                f"캐시 적중 {m['cache_hits']}회, 대기 {m['wait_total']:.1f}초"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── 요청 ─────────────────────────────────────────────
+    def get(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        timeout: Optional[float] = None,
+        allow_redirects: bool = True,
+        use_cache: bool = True,
+    ) -> Optional[requests.Response]:
+        """
+        GET 요청
+        - 429/5xx는 Retry-After(없으면 지수 백오프)만큼 같은 호스트 전체를 보류한 뒤 재시도
+        - 재시도 소진 시 마지막 응답 반환, 네트워크 오류만 계속되면 None
+        - 캐시 사용 시 200 응답을 저장하고 다음 요청부터 디스크에서 반환
+        - 기록 모드면 결과를 아카이브에 남기고, 재생 모드면 대기 없이 아카이브에서 반환
+        """
+        host = urlparse(url).netloc
+        key = request_key("GET", url, headers)
+        if is_replaying():
+            found, payload = _fixture.lookup(key)
+            self._record(host, replayed=1, replay_misses=0 if found else 1)
+            return build_response(payload) if payload else None
+
+        resp = self._get(url, host, headers, timeout, allow_redirects, use_cache)
+        if _fixture is not None:
+            _fixture.record(key, serialize_response(url, resp) if resp is not None else None)
+        return resp
+
+    def _get(
+        self,
+        url: str,
+        host: str,
+        headers: Optional[dict],
+        timeout: Optional[float],
+        allow_redirects: bool,
+        use_cache: bool,
+    ) -> Optional[requests.Response]:
+        if self.cache and use_cache:
+            cached = self.cache.load(url)
+            if cached is not None:
+                self._record(host, cache_hits=1)
+                return cached
+
+        merged_headers = {**self.headers, **(headers or {})}
+        session = self.session_for(host)
+        resp = None
+        for attempt in range(self.retries):
+            waited = self.limiter.wait(host)
+            if waited:
+                self._record(host, wait_total=waited)
+            started = time.monotonic()
+            try:
+                resp = session.get(
+                    url,
+                    headers=merged_headers,
+                    timeout=timeout or self.timeout,
+                    allow_redirects=allow_redirects,
+                )
+            except requests.RequestException as e:
+                self._record(host, requests=1, errors=1, latency=time.monotonic() - started)
+                print(f"    [WARN] 요청 실패 (시도 {attempt+1}/{self.retries}): {e}")
+                if attempt + 1 < self.retries:
+                    self._record(host, retries=1)
+                    self.limiter.pause(host, self.backoff * (2 ** attempt))
+                continue
+            self._record(host, requests=1, latency=time.monotonic() - started)
+
+            if resp.status_code not in RETRY_STATUSES:
+                break
+            if resp.status_code == 429:
+                self._record(host, throttled=1)
+            if attempt + 1 >= self.retries:
+                break
+            wait = parse_retry_after(resp.headers.get("Retry-After"))
+            if wait is None:
+                wait = self.backoff * (2 ** attempt)
+            wait = min(wait, MAX_BACKOFF)
+            print(f"    [RATE LIMIT] {host} {resp.status_code} → {wait:.0f}초 대기 후 재시도...")
+            self._record(host, retries=1)
+            self.limiter.pause(host, wait)
+
+        if resp is not None and resp.status_code == 200 and self.cache and use_cache:
+            self.cache.save(url, resp)
+        return resp
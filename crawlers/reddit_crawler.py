@@ -2,11 +2,17 @@
 Reddit 크롤링 (API 키 불필요)
 - Reddit JSON 피드 사용: URL 뒤에 .json 붙이면 공개 JSON 반환
 - requests만 사용 (PRAW 불필요)
-- 수집 결과: data/raw/reddit_raw.json
+- asyncio로 서브레딧/검색어를 동시에 요청, 전역 토큰 버킷 하나로 Reddit 허용량 준수
+- 증분 수집: 서브레딧별 커서(최신 created_utc 워터마크 + 미완료 구간의 after 토큰 대기열)를
+  data/raw/reddit_cursors.json에 저장, 워터마크에 닿을 때까지만 페이지를 넘김
+- 신규 거래글만 댓글 추가 요청 (top_comments)
+- 수집 결과: data/raw/reddit_raw.jsonl (id 기준 중복 제거 후 누적 저장)
 
 URL 예: https://www.reddit.com/r/KpopMerch/new.json
+로컬 가짜 서버로 테스트 시: crawl_reddit(base_url="http://127.0.0.1:8000")
 """
 
+import asyncio
 import json
 import os
 import time
@@ -15,6 +21,10 @@ from typing import Optional
 
 import requests
 
+from crawlers.http_client import HttpClient, is_replaying
+import dataset
+from streaming import ItemStream
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; FandomDictCrawler/1.0; +https://github.com)",
     "Accept": "application/json",
@@ -30,22 +40,106 @@ SUBREDDITS = [
 ]
 
 TRADE_KEYWORDS = ["WTS", "WTB", "WTT", "LF", "LFB", "SELLING", "BUYING", "TRADING", "ISO"]
-DAYS_BACK = 90
-MAX_POSTS_PER_SUB = 50
-DELAY_SEC = 2.0  # Reddit rate limit 고려
+DAYS_BACK = 90  # 커서가 없는 첫 실행 시 수집 범위
+SEARCH_KEYWORDS = ["WTS", "WTB", "WTT"]
+MAX_NEW_PAGES = 10      # 실행당 new 피드 최대 페이지 수 (100개/페이지)
+MAX_SEARCH_PAGES = 3    # 실행당 검색어별 최대 페이지 수 (25개/페이지)
+MAX_BACKFILL_JOBS = 2   # 실행당 이어받을 backfill 구간 수 (구간마다 new 피드 최대 MAX_NEW_PAGES 페이지)
+MAX_COMMENTS = 10       # 게시물당 저장할 상위 댓글 수
+CURSORS_FILENAME = "reddit_cursors.json"
+
+REDDIT_BASE = "https://www.reddit.com"
+# 비로그인 JSON 피드 허용량 (분당 요청 수). 응답의 X-Ratelimit-* 헤더가 오면 그에 맞춰 조정
+RATE_LIMIT_PER_MIN = 30
+REPLAY_RATE_PER_MIN = 1e9  # --replay 시 (사실상 무제한)
+RATE_BURST = 5
+MAX_CONCURRENCY = 8  # 동시 요청 수 = 커넥션 풀 크기
+
+
+class TokenBucket:
+    """
+    asyncio 토큰 버킷 (전역 rate limiter)
+    - rate_per_min 속도로 토큰 충전, 최대 burst개까지 적립
+    - pause_until(): 서버가 알려준 리셋 시각까지 모든 요청 보류
+    """
+
+    def __init__(self, rate_per_min: float = RATE_LIMIT_PER_MIN, burst: int = RATE_BURST):
+        self.rate = rate_per_min / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waited = 0.0  # 누적 대기 시간 (통계용)
+        self._lock = asyncio.Lock()
+
+    def pause_until(self, monotonic_ts: float) -> None:
+        self.paused_until = max(self.paused_until, monotonic_ts)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                self.waited += wait
+                await asyncio.sleep(wait)
+
 
+def make_client(pool_size: int = MAX_CONCURRENCY) -> HttpClient:
+    """Reddit용 공용 HTTP 클라이언트 (429 백오프/캐시/통계는 http_client가 담당)"""
+    return HttpClient(headers=HEADERS, pool_size=pool_size)
 
-def fetch_json(url: str, session: requests.Session) -> Optional[dict]:
+
+def fetch_json(url: str, client: HttpClient) -> Optional[dict]:
     """JSON 피드 가져오기"""
-    try:
-        resp = session.get(url, headers=HEADERS, timeout=15)
-        if resp.status_code == 200:
+    resp = client.get(url)
+    if resp is not None and resp.status_code == 200:
+        try:
             return resp.json()
-    except Exception as e:
-        print(f"    [WARN] 요청 실패: {e}")
+        except ValueError:
+            return None
     return None
 
 
+def _apply_rate_headers(resp: requests.Response, limiter: TokenBucket) -> None:
+    """Reddit X-Ratelimit-Remaining/Reset 헤더 기반으로 버킷 조정"""
+    try:
+        remaining = float(resp.headers.get("x-ratelimit-remaining", ""))
+        reset = float(resp.headers.get("x-ratelimit-reset", ""))
+    except ValueError:
+        return
+    if remaining < 1:
+        limiter.pause_until(time.monotonic() + reset)
+
+
+async def fetch_json_async(
+    url: str,
+    client: HttpClient,
+    limiter: TokenBucket,
+    semaphore: asyncio.Semaphore,
+) -> Optional[dict]:
+    """토큰 버킷 통과 후 스레드에서 GET (429 재시도는 HttpClient가 Retry-After 기준으로 처리)"""
+    await limiter.acquire()
+    async with semaphore:
+        resp = await asyncio.to_thread(client.get, url)
+    if resp is None:
+        return None
+    _apply_rate_headers(resp, limiter)
+    if resp.status_code != 200:
+        return None
+    try:
+        return resp.json()
+    except ValueError:
+        return None
+
+
 def is_trade_post(title: str) -> bool:
     """거래 게시물 여부"""
     return any(kw in title.upper() for kw in TRADE_KEYWORDS)
@@ -74,7 +168,7 @@ def parse_listing(data: dict, subreddit: str) -> list[dict]:
                 "created_date": datetime.fromtimestamp(d.get("created_utc", 0), tz=timezone.utc).strftime("%Y-%m-%d"),
                 "is_trade_post": is_trade_post(title),
                 "url": f"https://reddit.com{d.get('permalink', '')}",
-                "top_comments": [],  # JSON 피드에는 댓글 없음 (별도 요청 필요)
+                "top_comments": [],  # 리스팅에는 댓글 없음 → 신규 거래글만 fetch_top_comments로 채움
                 "collected_at": datetime.now(tz=timezone.utc).isoformat(),
             })
     except Exception as e:
@@ -82,67 +176,280 @@ def parse_listing(data: dict, subreddit: str) -> list[dict]:
     return posts
 
 
-def crawl_subreddit(
-    session: requests.Session,
+def listing_after(data: dict) -> Optional[str]:
+    """Reddit 리스팅 응답의 다음 페이지 토큰"""
+    return (data.get("data") or {}).get("after")
+
+
+def parse_comments(data, limit: int = MAX_COMMENTS) -> list[str]:
+    """comments.json 응답([게시물, 댓글 트리])에서 상위 댓글 본문만 추출"""
+    if not isinstance(data, list) or len(data) < 2:
+        return []
+    comments = []
+    for child in (data[1].get("data") or {}).get("children", []):
+        if child.get("kind") != "t1":
+            continue
+        body = (child.get("data") or {}).get("body", "")
+        if body and body not in ("[deleted]", "[removed]"):
+            comments.append(body)
+        if len(comments) >= limit:
+            break
+    return comments
+
+
+def load_cursors(path: str) -> dict:
+    """서브레딧별 커서 로드: {sub: {"newest_utc", "backfill": [{"after", "until"}, ...]}}"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_cursors(path: str, cursors: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cursors, f, ensure_ascii=False, indent=2)
+
+
+async def _page_listing(
+    url: str,
+    subreddit: str,
+    stop_utc: float,
+    max_pages: int,
+    fetch,
+    after: Optional[str] = None,
+) -> tuple[list[dict], Optional[str], bool]:
+    """
+    after 토큰으로 페이지를 넘기며 stop_utc 이하 게시물이 나올 때까지 수집
+    Returns: (stop_utc보다 새 게시물,
+              끝까지 못 받았을 때 이어받을 after 토큰 (첫 페이지 실패면 시작 토큰 그대로, 없으면 None),
+              페이지 요청 실패 여부)
+    """
+    posts = []
+    sep = "&" if "?" in url else "?"
+    for _ in range(max_pages):
+        data = await fetch(f"{url}{sep}after={after}" if after else url)
+        if not data:
+            return posts, after, True
+        page = parse_listing(data, subreddit)
+        reached = False
+        for p in page:
+            if p.get("created_utc", 0) <= stop_utc:
+                reached = True
+                continue
+            posts.append(p)
+        after = listing_after(data)
+        if reached or not after or not page:
+            return posts, None, False
+    return posts, after, False
+
+
+def _backfill_queue(cursor: dict) -> list[dict]:
+    """커서의 backfill 대기열 [{"after", "until"}, ...] (예전 형식 after/backfill_until은 한 항목으로 변환)"""
+    queue = [dict(job) for job in cursor.get("backfill") or []]
+    if cursor.get("after"):
+        queue.append({"after": cursor["after"], "until": cursor.get("backfill_until") or 0})
+    return queue
+
+
+async def crawl_subreddit(
+    client: HttpClient,
     subreddit: str,
-    max_posts: int = MAX_POSTS_PER_SUB,
+    limiter: TokenBucket,
+    semaphore: asyncio.Semaphore,
+    cursor: Optional[dict] = None,
     days_back: int = DAYS_BACK,
-) -> list[dict]:
-    """서브레딧 크롤링 (new + search for WTS/WTB/WTT)"""
+    base_url: str = REDDIT_BASE,
+) -> tuple[list[dict], dict]:
+    """
+    서브레딧 증분 크롤링 (new 피드 + WTS/WTB/WTT 검색, 동시 실행)
+    - cursor["newest_utc"]보다 새 게시물만 수집 (없으면 days_back 이내)
+    - new 피드가 페이지 한도/요청 실패로 끊긴 구간은 cursor["backfill"] 대기열에 (after 토큰, 당시 워터마크)로
+      쌓고, 다음 실행부터 앞에서 MAX_BACKFILL_JOBS개씩 이어서 수집
+    - 이어받을 토큰 없이 실패한 요청(new 피드 첫 페이지, 검색)이 있으면 newest_utc를 올리지 않음
+      → 다음 실행이 같은 워터마크부터 다시 수집 (중복은 id로 제거)
+    Returns: (신규 게시물, 갱신된 커서)
+    """
+    cursor = dict(cursor or {})
     cutoff_ts = (datetime.now(tz=timezone.utc) - timedelta(days=days_back)).timestamp()
+    watermark = max(cursor.get("newest_utc") or 0, cutoff_ts)
+
+    async def fetch(url):
+        return await fetch_json_async(url, client, limiter, semaphore)
+
+    new_url = f"{base_url}/r/{subreddit}/new.json?limit=100"
+    jobs = [_page_listing(new_url, subreddit, watermark, MAX_NEW_PAGES, fetch)]
+    jobs += [
+        _page_listing(
+            f"{base_url}/r/{subreddit}/search.json?q={kw}&sort=new&restrict_sr=on&limit=25",
+            subreddit, watermark, MAX_SEARCH_PAGES, fetch,
+        )
+        for kw in SEARCH_KEYWORDS
+    ]
+    # 지난 실행들에서 못 채운 구간 (new 피드 after 토큰부터 당시 워터마크까지), 오래된 것부터
+    queue = _backfill_queue(cursor)
+    active, waiting = queue[:MAX_BACKFILL_JOBS], queue[MAX_BACKFILL_JOBS:]
+    for job in active:
+        until = max(job.get("until") or 0, cutoff_ts)
+        jobs.append(_page_listing(new_url, subreddit, until, MAX_NEW_PAGES, fetch, after=job["after"]))
+    results = await asyncio.gather(*jobs)
+
     all_posts = []
     seen_ids = set()
-
-    # 1) new 피드
-    url_new = f"https://www.reddit.com/r/{subreddit}/new.json?limit=100"
-    data = fetch_json(url_new, session)
-    if data:
-        for p in parse_listing(data, subreddit):
-            if p["id"] not in seen_ids and p.get("created_utc", 0) >= cutoff_ts:
+    for posts, _, _ in results:
+        for p in posts:
+            if p["id"] not in seen_ids:
                 seen_ids.add(p["id"])
                 all_posts.append(p)
 
-    time.sleep(DELAY_SEC)
+    # 커서 갱신: 끝까지 못 받은 backfill은 이어받을 토큰으로 남기고, 이번 new 피드가 끊긴 구간은 뒤에 추가
+    backfill = []
+    for job, (_, after, _) in zip(active, results[1 + len(SEARCH_KEYWORDS):]):
+        if after:
+            backfill.append({"after": after, "until": job.get("until") or 0})
+    backfill += waiting
+    _, new_after, new_failed = results[0]
+    if new_after:
+        backfill.append({"after": new_after, "until": watermark})
+    cursor["backfill"] = backfill
+    cursor.pop("after", None)
+    cursor.pop("backfill_until", None)
 
-    # 2) 거래 키워드 검색 (WTS, WTB, WTT)
-    for kw in ["WTS", "WTB", "WTT"]:
-        url_search = f"https://www.reddit.com/r/{subreddit}/search.json?q={kw}&sort=new&restrict_sr=on&limit=25"
-        data = fetch_json(url_search, session)
-        if data:
-            for p in parse_listing(data, subreddit):
-                if p["id"] not in seen_ids and p.get("created_utc", 0) >= cutoff_ts:
-                    seen_ids.add(p["id"])
-                    all_posts.append(p)
-        time.sleep(DELAY_SEC)
+    # 이어받을 토큰 없이 실패한 요청이 있으면 워터마크 유지 (올리면 그 사이 게시물이 영영 빠짐)
+    lost = (new_failed and not new_after) or any(failed for _, _, failed in results[1:1 + len(SEARCH_KEYWORDS)])
+    if lost:
+        print(f"    [WARN] {subreddit}: 페이지 요청 실패 → 워터마크 유지 (다음 실행에서 다시 수집)")
+    else:
+        newest = max((p.get("created_utc", 0) for p in all_posts), default=0)
+        cursor["newest_utc"] = max(cursor.get("newest_utc") or 0, newest)
 
     trade_count = sum(1 for p in all_posts if p["is_trade_post"])
-    print(f"    [{subreddit}] {len(all_posts)}개 (거래글: {trade_count}개)")
-    return all_posts[:max_posts]
+    print(f"    [{subreddit}] 신규 {len(all_posts)}개 (거래글: {trade_count}개)")
+    return all_posts, cursor
 
 
-def crawl_reddit(output_path: str = "data/raw/reddit_raw.json") -> list[dict]:
-    """전체 Reddit 크롤링 (API 키 불필요)"""
-    print(f"[reddit_crawler] Reddit JSON 피드 크롤링 ({len(SUBREDDITS)}개 서브레딧, API 불필요)")
+async def fetch_top_comments(
+    posts: list[dict],
+    client: HttpClient,
+    limiter: TokenBucket,
+    semaphore: asyncio.Semaphore,
+    base_url: str = REDDIT_BASE,
+) -> int:
+    """거래글의 상위 댓글을 동시에 가져와 top_comments에 채움. Returns: 댓글이 채워진 게시물 수"""
+    async def fill(post):
+        url = f"{base_url}/r/{post['subreddit']}/comments/{post['id']}.json?limit={MAX_COMMENTS}&depth=1&sort=top"
+        post["top_comments"] = parse_comments(await fetch_json_async(url, client, limiter, semaphore))
+        return bool(post["top_comments"])
 
-    session = requests.Session()
-    all_posts = []
+    filled = await asyncio.gather(*(fill(p) for p in posts))
+    return sum(filled)
 
-    for sub in SUBREDDITS:
-        try:
-            posts = crawl_subreddit(session, sub)
+
+async def crawl_reddit_async(
+    subreddits: list[str],
+    cursors: dict,
+    base_url: str = REDDIT_BASE,
+    rate_per_min: float = RATE_LIMIT_PER_MIN,
+    stream: Optional[ItemStream] = None,
+    known_ids: Optional[set] = None,
+) -> list[dict]:
+    """
+    모든 서브레딧을 동시에 증분 크롤링 (전역 토큰 버킷 + 공용 커넥션 풀). cursors는 제자리 갱신
+    - 서브레딧별로 끝나는 즉시 거래글 댓글 수집 → stream이 있으면 known_ids에 없는 게시물을 바로 내보냄
+    """
+    # 재생 모드: 네트워크가 없으므로 속도 제한 없이 진행 (inf는 계산 중 NaN이 나므로 큰 값 사용)
+    limiter = TokenBucket(REPLAY_RATE_PER_MIN if is_replaying() else rate_per_min)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    started = time.monotonic()
+    known_ids = known_ids if known_ids is not None else set()
+
+    with make_client() as client:
+        async def crawl_one(sub: str):
+            posts, cursor = await crawl_subreddit(
+                client, sub, limiter, semaphore, cursor=cursors.get(sub), base_url=base_url
+            )
+            # 신규 거래글만 댓글 요청 (워터마크 유지로 다시 받은 저장된 게시물은 crawl_reddit에서 버려지므로 제외)
+            trade_posts = [p for p in posts if p["is_trade_post"] and p["id"] not in known_ids]
+            filled = await fetch_top_comments(trade_posts, client, limiter, semaphore, base_url=base_url)
+            if stream is not None:
+                stream.put_many(p for p in posts if p["id"] not in known_ids)
+            return posts, cursor, len(trade_posts), filled
+
+        results = await asyncio.gather(*(crawl_one(sub) for sub in subreddits), return_exceptions=True)
+
+        all_posts = []
+        trade_total = filled_total = 0
+        for sub, result in zip(subreddits, results):
+            if isinstance(result, BaseException):
+                print(f"  [ERROR] {sub} 실패: {result}")
+                continue
+            posts, cursor, trade_count, filled = result
+            cursors[sub] = cursor
             all_posts.extend(posts)
-        except Exception as e:
-            print(f"  [ERROR] {sub} 실패: {e}")
-        time.sleep(DELAY_SEC)
+            trade_total += trade_count
+            filled_total += filled
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(all_posts, f, ensure_ascii=False, indent=2)
+        if trade_total:
+            print(f"  댓글 수집: 거래글 {trade_total}개 중 {filled_total}개")
+        client.print_metrics("reddit")
 
-    trade_total = sum(1 for p in all_posts if p["is_trade_post"])
-    print(f"[reddit_crawler] 완료: {len(all_posts)}개 (거래글: {trade_total}개) → {output_path}")
+    elapsed = time.monotonic() - started
+    print(f"  소요: {elapsed:.1f}초 (rate limit 대기 누적 {limiter.waited:.1f}초)")
     return all_posts
 
 
+def crawl_reddit(
+    output_path: str = "data/raw/reddit_raw.jsonl",
+    base_url: str = REDDIT_BASE,
+    rate_per_min: float = RATE_LIMIT_PER_MIN,
+    stream: Optional[ItemStream] = None,
+) -> list[dict]:
+    """
+    전체 Reddit 증분 크롤링 (API 키 불필요)
+    - 기존 reddit_raw.jsonl 끝에 신규 게시물만 id 기준으로 추가
+    - stream 지정 시 신규 게시물을 서브레딧 단위로 즉시 내보냄 (main.py --stream)
+    Returns: 누적 저장된 전체 게시물
+    """
+    print(f"[reddit_crawler] Reddit JSON 피드 크롤링 ({len(SUBREDDITS)}개 서브레딧, API 불필요)")
+
+    cursors_path = os.path.join(os.path.dirname(output_path), CURSORS_FILENAME)
+    cursors = load_cursors(cursors_path)
+    if cursors:
+        print(f"  커서 로드: {len(cursors)}개 서브레딧 (워터마크 이후 신규 게시물만 수집)")
+
+    stored = dataset.read_records(output_path)
+    known_ids = {p.get("id") for p in stored}
+
+    if stream is not None:
+        stream.open(backfill=stored)
+    try:
+        new_posts = asyncio.run(
+            crawl_reddit_async(
+                SUBREDDITS, cursors, base_url=base_url, rate_per_min=rate_per_min,
+                stream=stream, known_ids=set(known_ids),
+            )
+        )
+    finally:
+        if stream is not None:
+            stream.close()
+
+    fresh = []
+    for p in new_posts:
+        if p["id"] not in known_ids:
+            known_ids.add(p["id"])
+            fresh.append(p)
+    added = dataset.append_records(output_path, fresh, id_field="id")
+    stored.extend(fresh)
+    # 게시물 저장이 끝난 뒤에 커서 저장 (중간 실패 시 다음 실행에서 재수집)
+    save_cursors(cursors_path, cursors)
+
+    trade_total = sum(1 for p in stored if p.get("is_trade_post"))
+    print(f"[reddit_crawler] 완료: 신규 {added}개 / 누적 {len(stored)}개 (거래글: {trade_total}개) → {output_path}")
+    return stored
+
+
 if __name__ == "__main__":
     crawl_reddit()
@@ -2,7 +2,7 @@
 STEP 3: 위버스샵 상품명 수집
 - shop.weverse.io에서 공식 MD 명칭 수집
 - 공식 표준어 기준점 확보용
-- 수집 원문: data/raw/weverse_raw.json 저장
+- 수집 원문: data/raw/weverse_raw.jsonl 저장
 
 참고:
   위버스샵은 SPA(Single Page App)로 직접 HTML 파싱이 어렵습니다.
@@ -10,18 +10,42 @@ STEP 3: 위버스샵 상품명 수집
   1. 공개 API 엔드포인트 탐색
   2. requests + BeautifulSoup으로 정적 HTML 파싱 (일부 페이지)
   JavaScript 렌더링이 필요한 경우 Playwright 방식도 주석으로 제공합니다.
+
+  상품/아티스트 페이지는 스레드 풀 + 공용 HttpClient(호스트별 커넥션 풀)로 동시에 가져오며,
+  호스트별 최소 요청 간격을 지킵니다. ETag/Last-Modified는 추출 결과와 함께
+  data/raw/weverse_http_cache.json에 저장해 다음 실행에서 조건부 요청(304)으로 재사용합니다.
+  같은 캐시에 사이트맵 <loc>/<lastmod>와 URL별 추출 상품명을 보관해, 새 URL이거나
+  lastmod가 바뀐 상품만 다시 요청/파싱합니다. HTML 파서는 selectolax > lxml > html.parser
+  순으로 설치된 것 중 가장 빠른 것을 사용합니다.
 """
 
+import importlib.util
 import json
 import os
-import time
-from typing import Optional
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 from datetime import datetime, timezone
 
 import requests
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from crawlers.http_client import HttpClient
+import dataset
+from streaming import ItemStream
+from text_features import has_korean
+
+try:
+    from selectolax.parser import HTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+# BeautifulSoup 백엔드: lxml이 설치돼 있으면 사용 (모듈은 bs4가 직접 불러오므로 설치 여부만 확인)
+BS4_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
 load_dotenv()
 
 HEADERS = {
@@ -59,87 +83,206 @@ BASE_URL = "https://shop.weverse.io"
 # 위버스샵 내부 API (비공식, 변경될 수 있음)
 API_BASE = "https://weverse-shop-api.weverse.io"
 
+MAX_SITEMAP_PRODUCTS = 5000  # 사이트맵에서 가져올 최대 상품 수
+FETCH_WORKERS = 8            # 동시 요청 수 (= 커넥션 풀 크기)
+HOST_MIN_INTERVAL = 0.3      # 호스트별 최소 요청 간격 (초)
+HTTP_CACHE_FILENAME = "weverse_http_cache.json"
 
-def fetch_with_retry(url: str, session: requests.Session, retries: int = 3, delay: float = 2.0) -> Optional[requests.Response]:
-    """재시도 포함 HTTP GET"""
-    for attempt in range(retries):
-        try:
-            resp = session.get(url, headers=HEADERS, timeout=15)
-            if resp.status_code == 200:
-                return resp
-            elif resp.status_code == 429:
-                wait = delay * (attempt + 1) * 2
-                print(f"    [RATE LIMIT] {wait}초 대기 후 재시도...")
-                time.sleep(wait)
-            elif resp.status_code in (403, 404):
-                return None
-            else:
-                time.sleep(delay)
-        except requests.RequestException as e:
-            print(f"    [WARN] 요청 실패 (시도 {attempt+1}/{retries}): {e}")
-            time.sleep(delay)
+
+def load_http_cache(path: str) -> dict:
+    """URL → {"etag", "last_modified", "names"} 조건부 요청 캐시 로드"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_http_cache(path: str, cache: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+
+
+def make_client() -> HttpClient:
+    """위버스샵용 공용 HTTP 클라이언트 (호스트별 요청 간격 + 429/5xx 백오프)"""
+    return HttpClient(headers=HEADERS, pool_size=FETCH_WORKERS, min_interval=HOST_MIN_INTERVAL)
+
+
+def fetch_with_retry(
+    url: str,
+    client: HttpClient,
+    validators: Optional[dict] = None,
+) -> Optional[requests.Response]:
+    """
+    재시도 포함 HTTP GET (재시도/백오프는 HttpClient 공통 규칙)
+    - validators({"etag", "last_modified"}) 지정 시 조건부 요청, 304도 성공으로 반환
+    - 그 외 200이 아닌 응답(403/404 등)은 None
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    resp = client.get(url, headers=headers)
+    if resp is None:
+        return None
+    if resp.status_code == 200 or (resp.status_code == 304 and validators):
+        return resp
     return None
 
 
-def parse_product_from_html(html: str, artist_slug: str) -> list[dict]:
-    """HTML에서 상품 정보 추출 (정적 렌더링된 경우)"""
-    soup = BeautifulSoup(html, "html.parser")
-    products = []
+def fetch_names_cached(
+    url: str,
+    client: HttpClient,
+    cache: dict,
+    parse,
+    lastmod: Optional[str] = None,
+) -> Optional[list[str]]:
+    """
+    조건부 요청으로 페이지를 가져와 parse(html) → 이름 목록 반환
+    - 304면 캐시된 이름 목록 재사용, 200이면 파싱 후 검증자(ETag/Last-Modified)와 함께 캐시
+    - lastmod(사이트맵 값)도 함께 저장해 다음 실행의 변경 여부 판단에 사용
+    - 요청 실패 시 None
+    """
+    entry = cache.get(url)
+    resp = fetch_with_retry(url, client, validators=entry)
+    if resp is None:
+        return None
+    if resp.status_code == 304:
+        if lastmod:
+            entry["lastmod"] = lastmod
+        return list(entry.get("names", []))
+    names = parse(resp.text)
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if etag or last_modified or lastmod:
+        cache[url] = {"etag": etag, "last_modified": last_modified, "lastmod": lastmod, "names": names}
+    return names
+
+
+# 상품명이 포함될 수 있는 일반적인 선택자들
+PRODUCT_NAME_SELECTORS = [
+    "span.ProductName",
+    "p.product-name",
+    "div.product-title",
+    "[class*='productName']",
+    "[class*='product_name']",
+    "[class*='item-name']",
+    "h2.title",
+    "h3.title",
+]
 
-    # 상품명이 포함될 수 있는 일반적인 선택자들 시도
-    selectors = [
-        "span.ProductName",
-        "p.product-name",
-        "div.product-title",
-        "[class*='productName']",
-        "[class*='product_name']",
-        "[class*='item-name']",
-        "h2.title",
-        "h3.title",
-    ]
 
+def extract_product_names(html: str) -> list[str]:
+    """HTML에서 상품명 후보 추출 (정적 렌더링된 경우)"""
+    if HAS_SELECTOLAX:
+        tree = HTMLParser(html)
+        texts = (node.text(strip=True) for sel in PRODUCT_NAME_SELECTORS for node in tree.css(sel))
+    else:
+        soup = BeautifulSoup(html, BS4_PARSER)
+        texts = (el.get_text(strip=True) for sel in PRODUCT_NAME_SELECTORS for el in soup.select(sel))
+
+    names: list[str] = []
     found_names = set()
-    for selector in selectors:
-        for el in soup.select(selector):
-            name = el.get_text(strip=True)
-            if name and len(name) > 2 and name not in found_names:
-                found_names.add(name)
-                products.append({
-                    "product_name": name,
-                    "artist_slug": artist_slug,
-                    "category": None,
-                    "source_url": f"{BASE_URL}/en/artist/{artist_slug}",
-                    "language": "ko" if any("\uAC00" <= c <= "\uD7A3" for c in name) else "en",
-                    "collected_at": datetime.now(tz=timezone.utc).isoformat(),
-                })
+    for name in texts:
+        if name and len(name) > 2 and name not in found_names:
+            found_names.add(name)
+            names.append(name)
+    return names
+
+
+def extract_og_title(html: str) -> list[str]:
+    """상품 페이지 og:title 메타태그에서 상품명 추출 (없으면 빈 목록)"""
+    if HAS_SELECTOLAX:
+        node = HTMLParser(html).css_first('meta[property="og:title"]')
+        content = node.attributes.get("content") if node is not None else None
+    else:
+        og_title = BeautifulSoup(html, BS4_PARSER).find("meta", property="og:title")
+        content = og_title.get("content") if og_title else None
+    name = (content or "").strip()
+    return [name] if name else []
+
+
+def parse_sitemap(xml_bytes: bytes) -> list[tuple[str, Optional[str]]]:
+    """사이트맵 XML → [(loc, lastmod)] (C 가속 ElementTree, 실패 시 BeautifulSoup)"""
+    try:
+        root = ET.fromstring(xml_bytes)
+        entries = []
+        for node in root:
+            loc = (node.findtext("{*}loc") or "").strip()
+            if loc:
+                lastmod = (node.findtext("{*}lastmod") or "").strip() or None
+                entries.append((loc, lastmod))
+        return entries
+    except ET.ParseError:
+        soup = BeautifulSoup(xml_bytes, "xml")
+        entries = []
+        for loc in soup.find_all("loc"):
+            lastmod = loc.find_next_sibling("lastmod")
+            entries.append((loc.get_text().strip(), lastmod.get_text().strip() if lastmod else None))
+        return entries
+
+
+def _product_record(name: str, artist_slug: str, source_url: str) -> dict:
+    return {
+        "product_name": name,
+        "artist_slug": artist_slug,
+        "category": None,
+        "source_url": source_url,
+        "language": "ko" if has_korean(name) else "en",
+        "collected_at": datetime.now(tz=timezone.utc).isoformat(),
+    }
 
-    return products
+
+def parse_product_from_html(html: str, artist_slug: str) -> list[dict]:
+    """HTML에서 상품 정보 추출 (정적 렌더링된 경우)"""
+    source_url = f"{BASE_URL}/en/artist/{artist_slug}"
+    return [_product_record(name, artist_slug, source_url) for name in extract_product_names(html)]
 
 
-def scrape_artist_page(session: requests.Session, artist_slug: str) -> list[dict]:
-    """아티스트 상품 페이지 스크래핑"""
+def scrape_artist_page(
+    client: HttpClient,
+    artist_slug: str,
+    cache: Optional[dict] = None,
+) -> list[dict]:
+    """아티스트 상품 페이지 스크래핑 (한국어/영어 페이지, 조건부 요청)"""
+    cache = cache if cache is not None else {}
     products = []
+    source_url = f"{BASE_URL}/en/artist/{artist_slug}"
 
     # 한국어/영어 페이지 모두 시도
     for lang_path in [f"/ko/artist/{artist_slug}", f"/en/artist/{artist_slug}"]:
         url = f"{BASE_URL}{lang_path}"
-        resp = fetch_with_retry(url, session)
-        if not resp:
-            continue
-
-        parsed = parse_product_from_html(resp.text, artist_slug)
-        products.extend(parsed)
-        time.sleep(1.5)
+        names = fetch_names_cached(url, client, cache, extract_product_names)
+        for name in names or []:
+            products.append(_product_record(name, artist_slug, source_url))
 
     return products
 
 
-def scrape_sitemap_products(session: requests.Session) -> list[dict]:
+def scrape_sitemap_products(
+    client: HttpClient,
+    cache: Optional[dict] = None,
+    max_products: int = MAX_SITEMAP_PRODUCTS,
+    workers: int = FETCH_WORKERS,
+    on_products: Optional[Callable[[list[dict]], None]] = None,
+) -> list[dict]:
     """
-    사이트맵에서 상품 URL 수집 후 상품명 추출
+    사이트맵에서 상품 URL 수집 후 상품명 추출 (스레드 풀로 동시 요청)
     위버스샵이 sitemap.xml을 제공하는 경우 활용
+    on_products: 상품 URL 하나의 결과가 나올 때마다 호출 (스트리밍용)
     """
+    cache = cache if cache is not None else {}
     products = []
+
+    def emit(records: list[dict]) -> None:
+        products.extend(records)
+        if on_products and records:
+            on_products(records)
     sitemap_urls = [
         f"{BASE_URL}/sitemap.xml",
         f"{BASE_URL}/sitemap-ko.xml",
@@ -147,43 +290,52 @@ def scrape_sitemap_products(session: requests.Session) -> list[dict]:
     ]
 
     for sitemap_url in sitemap_urls:
-        resp = fetch_with_retry(sitemap_url, session)
+        cached_sitemap = cache.get(sitemap_url)
+        resp = fetch_with_retry(sitemap_url, client, validators=cached_sitemap)
         if not resp:
             continue
 
-        soup = BeautifulSoup(resp.text, "xml")
-        locs = [loc.get_text() for loc in soup.find_all("loc")]
-        print(f"    사이트맵 {sitemap_url}: {len(locs)}개 URL 발견")
+        if resp.status_code == 304:
+            entries = [tuple(e) for e in cached_sitemap.get("entries", [])]
+            print(f"    사이트맵 {sitemap_url}: 변경 없음 (304) → 캐시 {len(entries)}개 URL")
+        else:
+            entries = parse_sitemap(resp.content)
+            print(f"    사이트맵 {sitemap_url}: {len(entries)}개 URL 발견")
+            cache[sitemap_url] = {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "entries": [list(e) for e in entries],
+            }
 
         # 상품 URL 필터링 (product 포함)
-        product_urls = [u for u in locs if "/product/" in u or "/item/" in u]
-        print(f"    → 상품 URL: {len(product_urls)}개")
-
-        for i, url in enumerate(product_urls[:200]):  # 최대 200개
-            resp = fetch_with_retry(url, session)
-            if not resp:
-                continue
-
-            soup_page = BeautifulSoup(resp.text, "html.parser")
-
-            # og:title 메타태그에서 상품명 추출
-            og_title = soup_page.find("meta", property="og:title")
-            if og_title and og_title.get("content"):
-                name = og_title["content"].strip()
-                if name:
-                    products.append({
-                        "product_name": name,
-                        "artist_slug": "unknown",
-                        "category": None,
-                        "source_url": url,
-                        "language": "ko" if any("\uAC00" <= c <= "\uD7A3" for c in name) else "en",
-                        "collected_at": datetime.now(tz=timezone.utc).isoformat(),
-                    })
-
-            if i % 20 == 0:
-                print(f"    진행: {i+1}/{min(len(product_urls), 200)}")
-            time.sleep(0.8)
-
+        product_entries = [(u, m) for u, m in entries if "/product/" in u or "/item/" in u][:max_products]
+
+        # 이전 실행과 lastmod가 같은 URL은 요청 없이 캐시된 상품명 사용
+        to_fetch = []
+        for url, lastmod in product_entries:
+            entry = cache.get(url)
+            if lastmod and entry and entry.get("lastmod") == lastmod and "names" in entry:
+                emit([_product_record(name, "unknown", url) for name in entry["names"]])
+            else:
+                to_fetch.append((url, lastmod))
+        print(
+            f"    → 상품 URL: {len(product_entries)}개 "
+            f"(변경 없음 {len(product_entries) - len(to_fetch)}개, 요청 {len(to_fetch)}개, 동시 {workers}개)"
+        )
+
+        def fetch_one(item):
+            url, lastmod = item
+            return url, fetch_names_cached(
+                url, client, cache, extract_og_title, lastmod=lastmod
+            )
+
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            for i, (url, names) in enumerate(ex.map(fetch_one, to_fetch)):
+                emit([_product_record(name, "unknown", url) for name in names or []])
+                if (i + 1) % 100 == 0:
+                    print(f"    진행: {i+1}/{len(to_fetch)}")
+
+        print(f"    → 상품명 {len(products)}개")
         break  # 첫 번째 성공한 sitemap만 처리
 
     return products
@@ -245,7 +397,7 @@ def build_manual_standard_terms() -> list[dict]:
 
     result = []
     for ko_name, en_name, category in terms:
-        lang = "ko" if any("\uAC00" <= c <= "\uD7A3" for c in ko_name) else "en"
+        lang = "ko" if has_korean(ko_name) else "en"
         result.append({
             "product_name": ko_name,
             "product_name_en": en_name,
@@ -260,58 +412,104 @@ def build_manual_standard_terms() -> list[dict]:
     return result
 
 
-def crawl_weverse(output_path: str = "data/raw/weverse_raw.json") -> list[dict]:
+def crawl_weverse(
+    output_path: str = "data/raw/weverse_raw.jsonl",
+    max_products: int = MAX_SITEMAP_PRODUCTS,
+    stream: Optional[ItemStream] = None,
+) -> list[dict]:
     """
     위버스샵 상품명 수집 실행
+    - stream 지정 시 이전 weverse_raw.jsonl에 없던 상품명만 수집 즉시 내보냄 (main.py --stream)
     Returns: 수집된 상품 정보 리스트
     """
     print("[weverse_crawler] 위버스샵 크롤링 시작...")
 
-    session = requests.Session()
+    cache_path = os.path.join(os.path.dirname(output_path), HTTP_CACHE_FILENAME)
+    cache = load_http_cache(cache_path)
+    client = make_client()
+    all_products: list[dict] = []
+
+    emit_products = None
+    if stream is not None:
+        stored = dataset.read_records(output_path)
+        emitted = {p.get("product_name", "") for p in stored}
+        emit_lock = threading.Lock()
+
+        def emit_new_products(records: list[dict]) -> None:
+            with emit_lock:
+                fresh = [r for r in records if r.get("product_name") and r["product_name"] not in emitted]
+                emitted.update(r["product_name"] for r in fresh)
+            stream.put_many(fresh)
+
+        emit_products = emit_new_products
+        stream.open(backfill=stored)
+
+    try:
+        all_products = _collect_products(client, cache, max_products, emit_products)
+    finally:
+        client.print_metrics("weverse")
+        client.close()
+        save_http_cache(cache_path, cache)
+        if stream is not None:
+            stream.close()
+
+    # 중복 제거 (상품명 기준)
+    seen_names: set[str] = set()
+    unique_products = []
+    for p in all_products:
+        name = p.get("product_name", "")
+        if name and name not in seen_names:
+            seen_names.add(name)
+            unique_products.append(p)
+
+    # 저장
+    dataset.write_records(output_path, unique_products, id_field="product_name")
+
+    print(f"[weverse_crawler] 완료: 총 {len(unique_products)}개 상품 → {output_path}")
+    return unique_products
+
+
+def _collect_products(
+    client: HttpClient,
+    cache: dict,
+    max_products: int,
+    on_products: Optional[Callable[[list[dict]], None]] = None,
+) -> list[dict]:
+    """사이트맵 → 아티스트 페이지 → 수동 표준어 순서로 상품 수집"""
     all_products: list[dict] = []
 
     # 1) 사이트맵 기반 수집 시도
     print("  [1/3] 사이트맵 기반 수집 시도...")
-    sitemap_products = scrape_sitemap_products(session)
+    sitemap_products = scrape_sitemap_products(
+        client, cache=cache, max_products=max_products, on_products=on_products
+    )
     if sitemap_products:
         print(f"    → {len(sitemap_products)}개 상품 수집")
         all_products.extend(sitemap_products)
     else:
         print("    → 사이트맵 접근 불가 (SPA 제한)")
 
-    # 2) 아티스트별 페이지 스크래핑 시도
+    # 2) 아티스트별 페이지 스크래핑 시도 (아티스트 단위 동시 실행)
     print(f"  [2/3] 아티스트별 페이지 스크래핑 ({len(ARTIST_SLUGS)}개 아티스트)...")
-    for artist_slug in ARTIST_SLUGS:
-        products = scrape_artist_page(session, artist_slug)
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as ex:
+        artist_results = list(ex.map(lambda slug: scrape_artist_page(client, slug, cache), ARTIST_SLUGS))
+    for artist_slug, products in zip(ARTIST_SLUGS, artist_results):
         if products:
             print(f"    [{artist_slug}] {len(products)}개 상품 수집")
             all_products.extend(products)
+            if on_products:
+                on_products(products)
         else:
             print(f"    [{artist_slug}] 정적 HTML 파싱 불가 (JS 렌더링 필요)")
-        time.sleep(1)
 
     # 3) 수동 표준어 목록 추가 (항상 포함)
     print("  [3/3] 공식 표준어 기본 목록 추가...")
     manual_terms = build_manual_standard_terms()
     all_products.extend(manual_terms)
+    if on_products:
+        on_products(manual_terms)
     print(f"    → {len(manual_terms)}개 기본 표준어 추가")
-
-    # 중복 제거 (상품명 기준)
-    seen_names: set[str] = set()
-    unique_products = []
-    for p in all_products:
-        name = p.get("product_name", "")
-        if name and name not in seen_names:
-            seen_names.add(name)
-            unique_products.append(p)
-
-    # 저장
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(unique_products, f, ensure_ascii=False, indent=2)
-
-    print(f"[weverse_crawler] 완료: 총 {len(unique_products)}개 상품 → {output_path}")
-    return unique_products
+    return all_products
 
 
 # ── Playwright 방식 (JS 렌더링 필요 시 대안) ────────────────
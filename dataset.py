@@ -0,0 +1,272 @@
+"""
+파이프라인 데이터셋 입출력 (raw 수집 결과, 시드, 분류 결과 공통)
+- 저장 형식: JSON Lines (한 줄 = 레코드 하나), 선택적으로 zstd 압축 (*.jsonl.zst)
+- 읽기: 한 줄씩 스트리밍 (iter_records) 또는 전체 (read_records)
+  기존 JSON 배열 파일(*.json, indent=2)도 그대로 읽음
+  → "reddit_raw.jsonl"을 요청했는데 없으면 "reddit_raw.json"을 찾아 읽음
+- 레거시 정리: 쓰기/추가로 JSONL이 생기면 레거시 .json은 삭제 (갱신되지 않는 옛 사본이 남지 않도록)
+  migrate_legacy()는 실행 시작 시 레거시 파일을 JSONL로 변환 (main.py)
+- 쓰기: 임시 파일에 쓴 뒤 os.replace로 원자적 교체 (중간 실패 시 기존 파일 보존)
+- 추가: 기존 파일 끝에 새 레코드만 덧붙임 (레거시 배열 파일은 처음 추가할 때 JSONL로 변환)
+- 인덱스: id_field 지정 시 "<파일>.idx" 사이드카에 id → 바이트 오프셋 저장
+  → get_record()로 파일 전체를 읽지 않고 레코드 하나 조회 (압축 파일은 인덱스 없음)
+
+    write_records("data/raw/weverse_raw.jsonl", products, id_field="product_name")
+    append_records("data/raw/reddit_raw.jsonl", new_posts, id_field="id")
+    for post in iter_records("data/raw/reddit_raw.jsonl"): ...
+"""
+
+import io
+import json
+import os
+from typing import Iterable, Iterator, Optional
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+ZSTD_SUFFIX = ".zst"
+INDEX_SUFFIX = ".idx"
+ZSTD_LEVEL = 3
+# 환경변수 DATASET_COMPRESS=zstd 이면 새로 쓰는 데이터셋을 zstd로 압축
+COMPRESS_DEFAULT = os.environ.get("DATASET_COMPRESS", "").lower() == "zstd"
+
+
+def _legacy_path(path: str) -> Optional[str]:
+    """foo.jsonl → foo.json (레거시 배열 파일 경로)"""
+    base = path[: -len(ZSTD_SUFFIX)] if path.endswith(ZSTD_SUFFIX) else path
+    if base.endswith(".jsonl"):
+        return base[: -len(".jsonl")] + ".json"
+    return None
+
+
+def resolve_path(path: str) -> Optional[str]:
+    """실제로 읽을 파일: path → path.zst → 레거시 .json 순서 (없으면 None)"""
+    candidates = [path]
+    if not path.endswith(ZSTD_SUFFIX):
+        candidates.append(path + ZSTD_SUFFIX)
+    legacy = _legacy_path(path)
+    if legacy:
+        candidates.append(legacy)
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def exists(path: str) -> bool:
+    return resolve_path(path) is not None
+
+
+def _open_text(path: str):
+    """텍스트 읽기 스트림 (zstd는 여러 프레임 연속 = 추가 기록분까지 읽음)"""
+    if path.endswith(ZSTD_SUFFIX):
+        if not HAS_ZSTD:
+            raise RuntimeError(f"zstd 압축 데이터셋 읽기에 zstandard 필요: pip install zstandard ({path})")
+        raw = open(path, "rb")
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def _is_json_array(path: str) -> bool:
+    """레거시 형식(전체가 JSON 배열) 여부: 첫 번째 공백 아닌 문자가 '['"""
+    if path.endswith(ZSTD_SUFFIX):
+        return False
+    with open(path, encoding="utf-8") as f:
+        while True:
+            ch = f.read(1)
+            if not ch:
+                return False
+            if not ch.isspace():
+                return ch == "["
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    """레코드 스트리밍 읽기 (파일 없으면 아무것도 내지 않음, 레거시 배열은 한 번에 로드)"""
+    real = resolve_path(path)
+    if real is None:
+        return
+    if _is_json_array(real):
+        with open(real, encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    with _open_text(real) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_records(path: str) -> list[dict]:
+    """전체 레코드 읽기 (파일 없으면 빈 목록)"""
+    return list(iter_records(path))
+
+
+def _encode(record: dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _write_index(path: str, index: dict) -> None:
+    tmp = f"{path}{INDEX_SUFFIX}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, path + INDEX_SUFFIX)
+
+
+def load_index(path: str) -> dict:
+    """사이드카 인덱스 {id: 바이트 오프셋} (없거나 손상 시 빈 dict)"""
+    try:
+        with open(path + INDEX_SUFFIX, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def build_index(path: str, id_field: str) -> dict:
+    """비압축 JSONL을 한 번 훑어 인덱스 재생성 + 저장"""
+    real = resolve_path(path)
+    index: dict = {}
+    if real is None or real.endswith(ZSTD_SUFFIX) or _is_json_array(real):
+        return index
+    with open(real, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                record_id = json.loads(line).get(id_field)
+                if record_id is not None:
+                    index.setdefault(str(record_id), offset)
+            offset += len(line)
+    _write_index(real, index)
+    return index
+
+
+def _target_path(path: str, compress: Optional[bool]) -> str:
+    compress = COMPRESS_DEFAULT if compress is None else compress
+    if compress and not HAS_ZSTD:
+        print("  [dataset] zstandard 미설치 → 압축 없이 저장 (pip install zstandard)")
+        compress = False
+    if compress and not path.endswith(ZSTD_SUFFIX):
+        return path + ZSTD_SUFFIX
+    if not compress and path.endswith(ZSTD_SUFFIX):
+        return path[: -len(ZSTD_SUFFIX)]
+    return path
+
+
+def _remove_stale(path: str, keep: str) -> None:
+    """
+    같은 데이터셋의 다른 형식 파일 제거 (압축/비압축 전환 시 이전 파일이 먼저 읽히지 않도록)
+    레거시 .json도 제거 (JSONL을 쓴 뒤에는 갱신되지 않는 옛 사본)
+    """
+    other = path[: -len(ZSTD_SUFFIX)] if path.endswith(ZSTD_SUFFIX) else path + ZSTD_SUFFIX
+    for stale in (other, other + INDEX_SUFFIX, _legacy_path(path)):
+        if stale and stale != keep and os.path.exists(stale):
+            os.remove(stale)
+
+
+def write_records(
+    path: str,
+    records: Iterable[dict],
+    id_field: Optional[str] = None,
+    compress: Optional[bool] = None,
+) -> int:
+    """
+    데이터셋 전체 쓰기 (임시 파일 → 원자적 교체)
+    - id_field: 사이드카 인덱스 생성 (같은 id는 첫 레코드 위치)
+    - compress: True면 zstd (None이면 DATASET_COMPRESS 환경변수)
+    Returns: 기록한 레코드 수
+    """
+    target = _target_path(path, compress)
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp = f"{target}.tmp"
+    index: dict = {}
+    count = 0
+    with open(tmp, "wb") as raw:
+        out = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw) if target.endswith(ZSTD_SUFFIX) else raw
+        offset = 0
+        for record in records:
+            line = _encode(record)
+            if id_field and record.get(id_field) is not None:
+                index.setdefault(str(record[id_field]), offset)
+            out.write(line)
+            offset += len(line)
+            count += 1
+        if out is not raw:
+            out.flush(zstandard.FLUSH_FRAME)
+    os.replace(tmp, target)
+    _remove_stale(path, keep=target)
+    if id_field and not target.endswith(ZSTD_SUFFIX):
+        _write_index(target, index)
+    return count
+
+
+def append_records(
+    path: str,
+    records: Iterable[dict],
+    id_field: Optional[str] = None,
+) -> int:
+    """
+    기존 데이터셋 끝에 레코드 추가 (기존 형식/압축 유지)
+    - 파일이 없으면 새로 쓰고, 레거시 JSON 배열만 있으면 JSONL로 변환한 뒤 추가
+    Returns: 추가한 레코드 수
+    """
+    records = list(records)
+    real = resolve_path(path)
+    if real is None or _is_json_array(real):
+        existing = read_records(path) if real else []
+        write_records(path, existing + records, id_field=id_field)
+        return len(records)
+    if not records:
+        return 0
+
+    if real.endswith(ZSTD_SUFFIX):
+        # zstd는 새 프레임을 이어 붙여도 하나의 스트림으로 읽힘
+        with open(real, "ab") as raw:
+            raw.write(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(b"".join(map(_encode, records))))
+        return len(records)
+
+    index = {}
+    if id_field:
+        # 인덱스 없이 쓰인 파일이면 기존 레코드부터 색인
+        index = load_index(real) if os.path.exists(real + INDEX_SUFFIX) else build_index(real, id_field)
+    with open(real, "ab") as f:
+        offset = f.tell()
+        for record in records:
+            line = _encode(record)
+            if id_field and record.get(id_field) is not None:
+                index.setdefault(str(record[id_field]), offset)
+            f.write(line)
+            offset += len(line)
+    if id_field:
+        _write_index(real, index)
+    return len(records)
+
+
+def migrate_legacy(path: str) -> Optional[str]:
+    """
+    레거시 JSON 배열 파일(foo.json) 정리: JSONL(foo.jsonl / .zst)이 없으면 변환 후 삭제,
+    이미 있으면 더 이상 갱신되지 않는 옛 사본이므로 삭제
+    Returns: 정리한 레거시 파일 경로 (없으면 None)
+    """
+    legacy = _legacy_path(path)
+    if not legacy or not os.path.exists(legacy):
+        return None
+    if resolve_path(path) == legacy:
+        write_records(path, read_records(legacy))   # 쓰기 끝에 레거시 파일 삭제
+    else:
+        os.remove(legacy)
+    return legacy
+
+
+def get_record(path: str, record_id) -> Optional[dict]:
+    """인덱스로 레코드 하나 조회 (인덱스 없으면 순차 검색 없이 None)"""
+    real = resolve_path(path)
+    if real is None:
+        return None
+    offset = load_index(real).get(str(record_id))
+    if offset is None:
+        return None
+    with open(real, "rb") as f:
+        f.seek(offset)
+        return json.loads(f.readline())
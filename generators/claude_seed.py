@@ -1,18 +1,41 @@
 """
 STEP 1: Claude API로 K-pop 팬덤 사전 초기 생성
 - 굿즈 거래 신조어/약어 300~500개 베이스라인 확보
+- 카테고리 프롬프트를 스레드 풀에서 동시 요청 (요청 시작 간격 SEED_REQUEST_INTERVAL초 유지)
+- 카테고리별 파싱 결과 캐시: data/raw/seed_cache/<프롬프트 해시>.json
+  해시 = 모델 + max_tokens + 프롬프트 → 프롬프트를 고친 카테고리만 다시 생성
+  카테고리가 끝나는 즉시 캐시 파일 기록 (중간에 실패/중단돼도 완료분은 다음 실행에서 재사용)
+- 최종 사전은 SEED_PROMPTS 순서로 중복 제거 후 저장 (완료 순서와 무관하게 같은 결과)
+- 배치 모드(--batch, main.py --llm-batch): 캐시에 없는 카테고리를 Message Batches 작업 하나로 제출
+  (llm_batch, 실패 시 동기 호출로 폴백)
+- 캐시 무시하고 전체 재생성: python -m generators.claude_seed --refresh
 """
 
+import hashlib
 import json
 import os
-import time
-from datetime import date
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timezone
+from typing import Optional
+
 from anthropic import Anthropic
 from dotenv import load_dotenv
 
+import dataset
+from crawlers.http_client import HostRateLimiter, fixture_mode, is_replaying, wrap_anthropic
+from llm_batch import run_messages
+
 load_dotenv()
 
-client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+# 기록/재생 래퍼 (main.py --record/--replay, 모드는 호출 시점에 확인)
+client = wrap_anthropic(Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY")))
+
+SEED_MODEL = "claude-opus-4-6"
+SEED_MAX_TOKENS = 4096
+SEED_MAX_WORKERS = 4             # 동시 요청 수
+SEED_REQUEST_INTERVAL = 1.0      # 요청 시작 최소 간격 (초, API rate limit 방지)
+SEED_CACHE_DIRNAME = "seed_cache"
 
 SEED_PROMPTS = [
     {
@@ -189,59 +212,168 @@ def normalize_entry(entry: dict) -> dict:
     return entry
 
 
-def generate_seed_dictionary(output_path: str = "data/raw/claude_seed.json") -> list[dict]:
+def prompt_hash(item: dict, model: str = SEED_MODEL, max_tokens: int = SEED_MAX_TOKENS) -> str:
+    """카테고리 캐시 키: 모델 + max_tokens + 프롬프트"""
+    raw = json.dumps([model, max_tokens, item["prompt"]], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def load_cached_category(cache_dir: str, key: str) -> Optional[list[dict]]:
+    """캐시된 카테고리 항목 (없거나 손상 시 None)"""
+    try:
+        with open(_cache_path(cache_dir, key), encoding="utf-8") as f:
+            return json.load(f)["entries"]
+    except (OSError, KeyError, json.JSONDecodeError):
+        return None
+
+
+def save_cached_category(cache_dir: str, key: str, category: str, entries: list[dict]) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, key)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "category": category,
+                "model": SEED_MODEL,
+                "prompt_hash": key,
+                "created_at": datetime.now(tz=timezone.utc).isoformat(),
+                "entries": entries,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    os.replace(tmp, path)
+
+
+def prune_cache(cache_dir: str, keep: set[str]) -> int:
+    """현재 프롬프트에 해당하지 않는(수정/삭제된) 캐시 파일 제거"""
+    if not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith(".json") and name[: -len(".json")] not in keep:
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
+
+
+def category_request(item: dict) -> dict:
+    """카테고리 요청 인자 (messages.create / 배치 params 공용)"""
+    return {
+        "model": SEED_MODEL,
+        "max_tokens": SEED_MAX_TOKENS,
+        "messages": [{"role": "user", "content": item["prompt"]}],
+    }
+
+
+def parse_category(raw_text: str) -> list[dict]:
+    """카테고리 응답 → 검증된 항목 (카테고리 내부 중복은 그대로, 전체 중복 제거는 호출 측)"""
+    entries = [normalize_entry(entry) for entry in parse_json_response(raw_text)]
+    return [entry for entry in entries if validate_entry(entry)]
+
+
+def request_category(item: dict, limiter: HostRateLimiter) -> list[dict]:
+    """카테고리 프롬프트 1개 요청 → 검증된 항목"""
+    if not is_replaying():
+        limiter.wait("anthropic")
+    response = client.messages.create(**category_request(item))
+    return parse_category(response.content[0].text)
+
+
+def request_categories_batched(todo: list[int], keys: list[str]) -> dict[int, Optional[list[dict]]]:
+    """카테고리 여러 개를 배치 하나로 요청 (custom_id = "seed-<프롬프트 해시>") → 번호별 항목 (실패 시 None)"""
+    requests = {f"seed-{keys[i]}": category_request(SEED_PROMPTS[i]) for i in todo}
+    texts = run_messages(client, requests, batch=True, sync_interval=SEED_REQUEST_INTERVAL)
+    return {i: parse_category(texts[f"seed-{keys[i]}"]) if texts.get(f"seed-{keys[i]}") else None for i in todo}
+
+
+def generate_seed_dictionary(
+    output_path: str = "data/raw/claude_seed.jsonl",
+    max_workers: int = SEED_MAX_WORKERS,
+    refresh: bool = False,
+    batch: bool = False,
+) -> list[dict]:
     """
     Claude API를 호출해 초기 팬덤 사전 생성
+    - refresh=True: 캐시 무시하고 모든 카테고리 재생성
+    - batch=True: 캐시에 없는 카테고리를 Message Batches로 한 번에 제출 (스레드 풀 대신)
+    - 기록/재생 모드(main.py --record/--replay)에서는 캐시를 쓰지 않음 (모든 호출이 아카이브를 거치도록)
     Returns: 생성된 항목 리스트
     """
-    all_entries: list[dict] = []
-    seen_terms: set[str] = set()
+    cache_dir = os.path.join(os.path.dirname(output_path) or ".", SEED_CACHE_DIRNAME)
+    use_cache = fixture_mode() is None
+    keys = [prompt_hash(item) for item in SEED_PROMPTS]
+    results: dict[int, list[dict]] = {}
 
     print(f"[claude_seed] 초기 사전 생성 시작 ({len(SEED_PROMPTS)}개 카테고리)")
 
-    for i, item in enumerate(SEED_PROMPTS, 1):
-        category = item["category"]
-        print(f"  [{i}/{len(SEED_PROMPTS)}] {category} 생성 중...")
-
-        try:
-            response = client.messages.create(
-                model="claude-opus-4-6",
-                max_tokens=4096,
-                messages=[{"role": "user", "content": item["prompt"]}],
-            )
-            raw_text = response.content[0].text
-            entries = parse_json_response(raw_text)
-
-            valid_count = 0
-            for entry in entries:
-                entry = normalize_entry(entry)
-                if not validate_entry(entry):
-                    continue
-                term_key = f"{entry['original_term']}_{entry['language']}"
-                if term_key in seen_terms:
-                    continue
-                seen_terms.add(term_key)
-                all_entries.append(entry)
-                valid_count += 1
+    todo = []
+    for i, (item, key) in enumerate(zip(SEED_PROMPTS, keys)):
+        cached = load_cached_category(cache_dir, key) if use_cache and not refresh else None
+        if cached is not None:
+            results[i] = cached
+            print(f"  [{i+1}/{len(SEED_PROMPTS)}] {item['category']} → 캐시 사용 ({len(cached)}개)")
+        else:
+            todo.append(i)
 
-            print(f"    → {valid_count}개 항목 추가 (누적: {len(all_entries)}개)")
+    def store(i: int, entries: list[dict]) -> None:
+        category = SEED_PROMPTS[i]["category"]
+        results[i] = entries
+        # 파싱 실패(빈 결과)는 캐시하지 않음 → 다음 실행에서 다시 요청
+        if use_cache and entries:
+            save_cached_category(cache_dir, keys[i], category, entries)
+        print(f"  [{i+1}/{len(SEED_PROMPTS)}] {category} → {len(entries)}개 항목")
 
-        except Exception as e:
-            print(f"    [ERROR] {category} 생성 실패: {e}")
+    if todo and batch:
+        print(f"  {len(todo)}개 카테고리 배치 요청")
+        for i, entries in request_categories_batched(todo, keys).items():
+            if entries is None:
+                print(f"    [ERROR] {SEED_PROMPTS[i]['category']} 생성 실패")
+            else:
+                store(i, entries)
+    elif todo:
+        print(f"  {len(todo)}개 카테고리 요청 (동시 {min(max_workers, len(todo))}개)")
+        limiter = HostRateLimiter(min_interval=SEED_REQUEST_INTERVAL)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="seed") as pool:
+            futures = {pool.submit(request_category, SEED_PROMPTS[i], limiter): i for i in todo}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    entries = fut.result()
+                except Exception as e:
+                    print(f"    [ERROR] {SEED_PROMPTS[i]['category']} 생성 실패: {e}")
+                    continue
+                store(i, entries)
+
+    # 카테고리 순서대로 중복 제거 (같은 용어는 앞 카테고리 우선)
+    all_entries: list[dict] = []
+    seen_terms: set[str] = set()
+    for i in range(len(SEED_PROMPTS)):
+        for entry in results.get(i, []):
+            term_key = f"{entry['original_term']}_{entry['language']}"
+            if term_key in seen_terms:
+                continue
+            seen_terms.add(term_key)
+            all_entries.append(entry)
 
-        # API rate limit 방지
-        if i < len(SEED_PROMPTS):
-            time.sleep(1)
+    if use_cache:
+        pruned = prune_cache(cache_dir, set(keys))
+        if pruned:
+            print(f"  수정/삭제된 프롬프트 캐시 {pruned}개 정리")
 
     # 저장
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(all_entries, f, ensure_ascii=False, indent=2)
+    dataset.write_records(output_path, all_entries, id_field="original_term")
 
     print(f"[claude_seed] 완료: 총 {len(all_entries)}개 항목 → {output_path}")
     return all_entries
 
 
 if __name__ == "__main__":
-    entries = generate_seed_dictionary()
+    entries = generate_seed_dictionary(refresh="--refresh" in sys.argv, batch="--batch" in sys.argv)
     print(f"\n생성 완료: {len(entries)}개 항목")
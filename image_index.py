@@ -0,0 +1,315 @@
+"""
+포토카드 썸네일 지각 해시(pHash/dHash) 인덱스 (bts_photocard_analyzer 내부 사용)
+- 제목 기준 그룹("BTS 정국 Butter 포카")에는 서로 다른 카드 수십 종이 섞여 가격이 뒤섞임
+  → 상품 썸네일(build_bunjang_image_url)을 로컬 캐시에 받아 두고 이미지 자체로 같은 카드를 묶음
+- pHash: 32×32 흑백 → 2D DCT 저주파 8×8 → 중앙값 기준 64비트 (압축/리사이즈/밝기 변화에 강함)
+  dHash: 9×8 흑백의 가로 인접 밝기 차 64비트 (pHash 후보를 한 번 더 검증)
+- 다중 인덱스 해싱(pHash를 MAX_PHASH_DISTANCE+1개 구간으로 나눈 버킷)으로 반경 안의 이웃만 찾아 합침
+  (전체 쌍 비교 없음, 후보는 구간 하나가 완전히 같은 해시뿐), 분석기는 제목 그룹마다 따로 클러스터링
+  → 클러스터 id("img" + 대표 pHash 16자리)를 분석기의 세부 그룹 키로 사용
+    (상품 2개 이상인 클러스터만, 짝이 없는 이미지는 제목 그룹에 그대로 남김)
+- 해시는 URL별로 hashes.json에 저장 → 재실행 시 다운로드/디코딩 없이 재사용
+  (Pillow 미설치 시 HAS_PIL=False, 새 이미지는 해시하지 못하고 캐시된 해시만 사용)
+
+    cache = ImageCache("data/image_cache", client=HttpClient())
+    stats = assign_image_clusters(products, cache, group_key=lambda p: p['id'])
+    # product['image_cluster'] = "img3fa2c1d0e5b7a9f1" / None
+    cache.save()
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import statistics
+from collections import Counter
+from typing import Callable, Hashable, Optional
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+DEFAULT_CACHE_DIR = "data/image_cache"
+HASH_INDEX_FILE = "hashes.json"
+HASH_SIZE = 8                    # 8×8 → 64비트
+PHASH_SAMPLE = 32                # pHash DCT 입력 크기
+MAX_PHASH_DISTANCE = 8           # 같은 카드로 볼 pHash 해밍거리 (64비트 중)
+MAX_DHASH_DISTANCE = 12          # pHash 후보 검증용 dHash 해밍거리
+FETCH_WORKERS = 8
+
+# DCT-II 기저 (저주파 HASH_SIZE행만)
+_DCT = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * PHASH_SAMPLE)) for x in range(PHASH_SAMPLE)]
+    for u in range(HASH_SIZE)
+]
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bits(values: list[bool]) -> int:
+    return sum(1 << i for i, v in enumerate(values) if v)
+
+
+def dhash_pixels(pixels: list[list[float]]) -> int:
+    """HASH_SIZE행 × (HASH_SIZE+1)열 흑백 값 → 64비트 dHash (왼쪽 < 오른쪽이면 1)"""
+    return _bits([row[x] < row[x + 1] for row in pixels for x in range(HASH_SIZE)])
+
+
+def phash_pixels(pixels: list[list[float]]) -> int:
+    """PHASH_SAMPLE×PHASH_SAMPLE 흑백 값 → 64비트 pHash (DC 제외 저주파 계수의 중앙값 기준)"""
+    # 행 방향 → 열 방향 순으로 저주파 계수만 계산 (8×32×32 + 8×8×32 곱셈)
+    rows = [[sum(c * p for c, p in zip(basis, col)) for col in zip(*pixels)] for basis in _DCT]
+    coeffs = [sum(c * r for c, r in zip(basis, row)) for row in rows for basis in _DCT]
+    median = statistics.median(coeffs[1:])
+    return _bits([c > median for c in coeffs])
+
+
+def image_hashes(path: str) -> Optional[tuple[int, int]]:
+    """이미지 파일 → (pHash, dHash) (Pillow 미설치/디코딩 실패 시 None)"""
+    if not HAS_PIL:
+        return None
+    try:
+        with Image.open(path) as img:
+            gray = img.convert("L")
+            small = gray.resize((PHASH_SAMPLE, PHASH_SAMPLE), Image.LANCZOS)
+            tiny = gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    except OSError:
+        return None
+
+    def matrix(im) -> list[list[int]]:
+        data = list(im.getdata())
+        return [data[y * im.width:(y + 1) * im.width] for y in range(im.height)]
+
+    return phash_pixels(matrix(small)), dhash_pixels(matrix(tiny))
+
+
+def _chunk_masks(bits: int, chunks: int) -> list[tuple[int, int]]:
+    """bits비트를 chunks개의 서로 겹치지 않는 구간으로 나눔 → [(시프트, 마스크), ...]"""
+    width, extra = divmod(bits, chunks)
+    masks, shift = [], 0
+    for c in range(chunks):
+        w = width + (1 if c < extra else 0)
+        masks.append((shift, (1 << w) - 1))
+        shift += w
+    return masks
+
+
+class MultiIndexHash:
+    """
+    해밍거리 다중 인덱스 해싱: 해시를 radius+1개 구간으로 나눠 (구간 번호, 구간 값)으로 버킷
+    거리 radius 이하인 두 해시는 비둘기집 원리로 적어도 한 구간이 완전히 같음
+    → 같은 버킷의 후보만 hamming으로 검증 (BK-트리는 64비트/반경 8에서 거의 가지치기가 안 됨)
+    """
+
+    def __init__(self, radius: int, bits: int = HASH_SIZE * HASH_SIZE):
+        self.radius = radius
+        self._masks = _chunk_masks(bits, radius + 1)
+        self._buckets: dict[tuple[int, int], list[tuple[int, Hashable]]] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _keys(self, key: int):
+        return ((c, (key >> shift) & mask) for c, (shift, mask) in enumerate(self._masks))
+
+    def add(self, key: int, value: Hashable) -> None:
+        self._size += 1
+        for bucket_key in self._keys(key):
+            self._buckets.setdefault(bucket_key, []).append((key, value))
+
+    def search(self, key: int) -> list[tuple[int, Hashable]]:
+        """키에서 해밍거리 radius 이하인 (거리, 값) 목록 (여러 구간에서 겹친 후보는 한 번만)"""
+        found, seen = [], set()
+        for bucket_key in self._keys(key):
+            for other, value in self._buckets.get(bucket_key, ()):
+                if value in seen:
+                    continue
+                seen.add(value)
+                dist = hamming(key, other)
+                if dist <= self.radius:
+                    found.append((dist, value))
+        return found
+
+
+def cluster_hashes(
+    items: list[tuple[Hashable, int, int]],
+    max_phash: int = MAX_PHASH_DISTANCE,
+    max_dhash: int = MAX_DHASH_DISTANCE,
+) -> dict[Hashable, str]:
+    """
+    (키, pHash, dHash) 목록 → {키: 클러스터 id}
+    pHash 이웃(다중 인덱스 해싱) 중 dHash도 가까운 쌍을 합침 (union-find, 입력 순서 기준 첫 항목이 대표)
+    """
+    parent = list(range(len(items)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index = MultiIndexHash(max_phash)
+    for i, (_, phash, dhash) in enumerate(items):
+        for _, j in index.search(phash):
+            if hamming(dhash, items[j][2]) <= max_dhash:
+                a, b = root(i), root(j)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+        index.add(phash, i)
+    # 대표 pHash 전체(64비트)로 id, pHash가 같아도 dHash 검증에서 갈라진 클러스터는 대표 번호를 붙여 구분
+    ids: dict[int, str] = {}
+    used = set()
+    for i in range(len(items)):
+        rep = root(i)
+        if rep not in ids:
+            cluster_id = f"img{items[rep][1]:016x}"
+            if cluster_id in used:
+                cluster_id = f"{cluster_id}-{rep}"
+            ids[rep] = cluster_id
+            used.add(cluster_id)
+    return {key: ids[root(i)] for i, (key, _, _) in enumerate(items)}
+
+
+class ImageCache:
+    """
+    썸네일 로컬 캐시 (cache_dir/<sha1 앞 2자>/<sha1>.jpg) + URL별 해시 기록 (cache_dir/hashes.json)
+    client: crawlers.http_client.HttpClient (None이면 다운로드 없이 캐시된 파일/해시만 사용)
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, client=None):
+        self.cache_dir = cache_dir
+        self.client = client
+        self._index_path = os.path.join(cache_dir, HASH_INDEX_FILE)
+        self._hashes: dict[str, Optional[list[str]]] = {}
+        self._dirty = False
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, encoding="utf-8") as f:
+                    self._hashes = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._hashes = {}
+
+    def path_for(self, url: str) -> str:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.jpg")
+
+    def fetch(self, url: str) -> Optional[str]:
+        """URL → 로컬 파일 경로 (없으면 다운로드, 실패 시 None)"""
+        path = self.path_for(url)
+        if os.path.exists(path):
+            return path
+        if self.client is None:
+            return None
+        resp = self.client.get(url, use_cache=False)
+        if resp is None or resp.status_code != 200 or not resp.content:
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(resp.content)
+        os.replace(tmp, path)
+        return path
+
+    def hashes(self, url: str) -> Optional[tuple[int, int]]:
+        """URL → (pHash, dHash) (기록된 해시 우선, 다운로드/디코딩 실패는 기록해 재시도하지 않음)"""
+        if url in self._hashes:
+            cached = self._hashes[url]
+            return (int(cached[0], 16), int(cached[1], 16)) if cached else None
+        if not HAS_PIL:
+            return None
+        path = self.fetch(url)
+        result = image_hashes(path) if path else None
+        if path or result:
+            # 다운로드 실패(네트워크)는 다음 실행에 다시 시도, 받았는데 깨진 이미지는 None으로 기록
+            self._hashes[url] = [f"{result[0]:016x}", f"{result[1]:016x}"] if result else None
+            self._dirty = True
+        return result
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{self._index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._hashes, f)
+        os.replace(tmp, self._index_path)
+        self._dirty = False
+
+
+def assign_image_clusters(
+    products: list[dict],
+    cache: ImageCache,
+    workers: int = FETCH_WORKERS,
+    max_phash: int = MAX_PHASH_DISTANCE,
+    max_dhash: int = MAX_DHASH_DISTANCE,
+    group_key: Optional[Callable[[dict], Hashable]] = None,
+) -> dict:
+    """
+    상품 목록의 image_url을 해시해 product['image_cluster']를 채움
+    상품 2개 이상이 속한 클러스터만 id를 주고, 해시 불가/짝 없는 상품은 None (제목 그룹에 남음)
+    group_key: 지정하면 그룹(분석기의 제목 그룹)마다 따로 클러스터링
+      (클러스터 id는 그룹 안의 세부 키로만 쓰이므로 그룹을 넘는 비교는 필요 없음)
+    Returns: {"hashed", "missing", "clusters"(2개 이상 클러스터 수)}
+    """
+    urls = sorted({p["image_url"] for p in products if p.get("image_url")})
+    if workers > 1 and len(urls) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            hashes = dict(zip(urls, ex.map(cache.hashes, urls)))
+    else:
+        hashes = {url: cache.hashes(url) for url in urls}
+
+    groups: dict[Hashable, list[dict]] = {}
+    for p in products:
+        groups.setdefault(group_key(p) if group_key else None, []).append(p)
+    clusters_total = 0
+    for members in groups.values():
+        group_urls = dict.fromkeys(p["image_url"] for p in members if hashes.get(p.get("image_url")))
+        items = [(url, *hashes[url]) for url in group_urls]
+        clusters = cluster_hashes(items, max_phash, max_dhash)
+        sizes = Counter(clusters[p["image_url"]] for p in members if p.get("image_url") in clusters)
+        for p in members:
+            cluster_id = clusters.get(p.get("image_url"))
+            p["image_cluster"] = cluster_id if sizes[cluster_id] >= 2 else None
+        clusters_total += sum(1 for n in sizes.values() if n >= 2)
+    hashed = sum(1 for h in hashes.values() if h)
+    return {
+        "hashed": hashed,
+        "missing": len(urls) - hashed,
+        "clusters": clusters_total,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="포토카드 썸네일 지각 해시/클러스터")
+    parser.add_argument("images", nargs="+", help="로컬 이미지 파일")
+    parser.add_argument("--max-phash", type=int, default=MAX_PHASH_DISTANCE)
+    parser.add_argument("--max-dhash", type=int, default=MAX_DHASH_DISTANCE)
+    args = parser.parse_args(argv)
+    if not HAS_PIL:
+        raise SystemExit("[image_index] Pillow 미설치: pip install Pillow")
+
+    items = []
+    for path in args.images:
+        result = image_hashes(path)
+        if result is None:
+            print(f"[image_index] 읽기 실패: {path}")
+            continue
+        items.append((path, *result))
+        print(f"{result[0]:016x} {result[1]:016x}  {path}")
+    clusters = cluster_hashes(items, args.max_phash, args.max_dhash)
+    print(f"\n[image_index] 이미지 {len(items)}개 → 클러스터 {len(set(clusters.values()))}개")
+    for cluster_id in sorted(set(clusters.values())):
+        members = [path for path, c in clusters.items() if c == cluster_id]
+        if len(members) > 1:
+            print(f"  {cluster_id}: {', '.join(members)}")
+
+
+if __name__ == "__main__":
+    main()
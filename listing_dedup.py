@@ -0,0 +1,173 @@
+"""
+재등록 상품 중복 제거 (bts_photocard_analyzer 그룹화 직전 단계)
+- 판매자가 같은 카드를 같은 제목·같은 가격으로 상품id만 바꿔 여러 번 올리면 재등록마다
+  거래 1건으로 잡혀 transaction_count가 부풀고 중앙값이 그 가격 쪽으로 끌려감
+  → 같은 그룹 키 + 같은 가격 + 제목이 거의 같고(3글자 shingle 자카드 ≥ MIN_JACCARD)
+    등록 간격이 WINDOW_DAYS 이내인 상품을 하나로 접음 (가장 최근 등록만 남김)
+- 제목 MinHash(NUM_PERM개) → BANDS개 밴드 LSH 버킷 (버킷 키에 그룹 키/가격 포함)
+  → 후보는 같은 버킷 안에서만 비교, 등록일 순으로 처리하며 시간 창을 벗어난 대표는 버킷에서 제거
+  → 버킷 크기가 시간 창 안의 대표 수로 제한돼 수백만 행에서도 거의 선형
+- 같은 정규화 제목의 MinHash는 한 번만 계산 (재등록은 제목이 같은 경우가 대부분)
+
+    kept, removed = dedup_listings(products, group_key=lambda p: p['id'])
+    # removed: {그룹 키: 접힌 상품 수}
+"""
+
+import hashlib
+import re
+from collections import Counter, deque
+from datetime import datetime
+from typing import Callable, Optional
+
+SHINGLE_SIZE = 3
+NUM_PERM = 32
+BANDS = 8                        # 밴드당 4행 → 자카드 약 0.6부터 후보, MIN_JACCARD로 검증
+MIN_JACCARD = 0.8
+WINDOW_DAYS = 14                 # 이 기간 안에 다시 올라온 상품만 재등록으로 봄
+SHINGLE_CACHE_SIZE = 200_000     # shingle별 순열 해시 캐시 상한 (제목이 달라도 shingle은 대부분 겹침)
+
+_MERSENNE = (1 << 61) - 1
+_ROWS = NUM_PERM // BANDS
+_NOISE_RE = re.compile(r"[\s\W_]+")
+
+
+def _perm_params(count: int) -> list[tuple[int, int]]:
+    """MinHash 순열 (a, b) — 실행마다 같은 값 (결정적)"""
+    params = []
+    for i in range(count):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        params.append((int.from_bytes(digest[:8], "big") % (_MERSENNE - 1) + 1,
+                       int.from_bytes(digest[8:], "big") % _MERSENNE))
+    return params
+
+
+_PERMS = _perm_params(NUM_PERM)
+
+
+def normalize_title(title: str) -> str:
+    """소문자 + 공백/구두점 제거 ("BTS 정국 Butter 포카!!" → "bts정국butter포카")"""
+    return _NOISE_RE.sub("", title.lower())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> frozenset:
+    if len(text) <= size:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+
+
+_shingle_cache: dict[str, tuple[int, ...]] = {}
+
+
+def _shingle_hashes(feature: str) -> tuple[int, ...]:
+    """shingle 하나의 NUM_PERM개 순열 해시 (캐시)"""
+    cached = _shingle_cache.get(feature)
+    if cached is None:
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        cached = tuple((a * h + b) % _MERSENNE for a, b in _PERMS)
+        if len(_shingle_cache) < SHINGLE_CACHE_SIZE:
+            _shingle_cache[feature] = cached
+    return cached
+
+
+def minhash(features: frozenset) -> tuple[int, ...]:
+    """shingle 집합 → NUM_PERM개 최솟값 서명"""
+    if not features:
+        return (0,) * NUM_PERM
+    return tuple(map(min, zip(*map(_shingle_hashes, features))))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """등록일 문자열(ISO 또는 "YYYY-MM-DD HH:MM:SS") → epoch 초 (해석 불가 시 None)"""
+    if not value:
+        return None
+    s = value.replace("Z", "+00:00")
+    try:
+        dt = datetime.fromisoformat(s) if "T" in s else datetime.strptime(s[:19], "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        try:
+            dt = datetime.strptime(s[:10], "%Y-%m-%d")
+        except ValueError:
+            return None
+    return dt.timestamp()
+
+
+def dedup_listings(
+    products: list[dict],
+    group_key: Callable[[dict], str] = lambda p: p["id"],
+    window_days: float = WINDOW_DAYS,
+    min_jaccard: float = MIN_JACCARD,
+    title_field: str = "original_title",
+    price_field: str = "price",
+    date_field: str = "created_date",
+) -> tuple[list[dict], Counter]:
+    """
+    재등록 상품을 접은 목록 반환 (입력 순서 유지, 접힌 묶음은 가장 최근 등록 상품 하나만)
+    등록일을 해석할 수 없는 상품은 비교하지 않고 그대로 둠
+    Returns: (남은 상품 목록, {그룹 키: 접힌 상품 수})
+    """
+    window = window_days * 86400
+    signatures: dict[str, tuple[frozenset, tuple[int, ...]]] = {}
+    order = []
+    for i, p in enumerate(products):
+        ts = parse_timestamp(p.get(date_field))
+        if ts is not None:
+            order.append((ts, i))
+    order.sort()
+
+    buckets: dict[tuple, deque] = {}
+    reps: dict[int, list] = {}       # 대표 번호 → [마지막 등록 시각, shingle 집합, 남길 상품 번호, 버킷 키 집합]
+    drop = set()
+    removed = Counter()
+    for ts, i in order:
+        p = products[i]
+        title = normalize_title(p.get(title_field) or "")
+        if title not in signatures:
+            features = shingles(title)
+            signatures[title] = (features, minhash(features))
+        features, sig = signatures[title]
+        key = group_key(p)
+        band_keys = [
+            (band, key, p.get(price_field), sig[band * _ROWS:(band + 1) * _ROWS])
+            for band in range(BANDS)
+        ]
+
+        match = None
+        for band_key in band_keys:
+            bucket = buckets.get(band_key)
+            if not bucket:
+                continue
+            while bucket and ts - reps[bucket[0]][0] > window:
+                bucket.popleft()   # 시간 창을 벗어난 대표 (등록일 순 처리라 앞쪽부터 만료)
+            for rep_id in bucket:
+                if ts - reps[rep_id][0] <= window and jaccard(features, reps[rep_id][1]) >= min_jaccard:
+                    match = rep_id
+                    break
+            if match is not None:
+                break
+
+        if match is None:
+            reps[i] = [ts, features, i, set(band_keys)]
+            for band_key in band_keys:
+                buckets.setdefault(band_key, deque()).append(i)
+            continue
+        # 재등록: 이전 상품을 버리고 최근 상품을 남김, 시간 창은 최근 등록 기준으로 연장
+        rep = reps[match]
+        drop.add(rep[2])
+        rep[0], rep[2] = ts, i
+        rep[3].update(band_keys)
+        removed[key] += 1
+        for band_key in rep[3]:
+            # 버킷을 마지막 등록 시각 순으로 유지 (만료 처리가 앞에서부터 가능하도록)
+            bucket = buckets.setdefault(band_key, deque())
+            if match in bucket:
+                bucket.remove(match)
+            bucket.append(match)
+
+    kept = [p for i, p in enumerate(products) if i not in drop]
+    return kept, removed
@@ -0,0 +1,344 @@
+"""
+Claude Message Batches 제출 모드 (classifier Reddit 추출 / claude_seed 시드 생성 공용)
+- 대기 중인 요청 전체를 배치 작업으로 제출 → 완료까지 폴링 → custom_id로 결과 매핑
+  (야간 실행처럼 호출당 지연보다 처리량/비용이 중요한 경우, main.py --llm-batch)
+- 동기 경로 폴백:
+  · 배치 제출/폴링 자체가 실패하거나 BATCH_TIMEOUT을 넘기면 → 전체를 messages.create로 순차 처리
+  · 배치 안에서 개별 요청이 errored/expired/canceled → 그 요청만 동기로 다시 처리
+  · 기록/재생 모드(--record/--replay)는 항상 동기 (아카이브는 messages.create 단위로 기록됨)
+- 배치 엔드포인트를 흉내 내는 로컬 대역(LocalBatchStub)으로 네트워크 없이 확인
+    python llm_batch.py
+
+    texts = run_messages(client, {"chunk-0": {"model": ..., "messages": [...]}}, batch=True)
+    texts["chunk-0"]  # 응답 텍스트 (실패 시 None)
+- UsageMeter: 응답의 입력/출력/프롬프트 캐시 읽기·쓰기 토큰 누적 (실행별 리포트용)
+- truncated 집합을 넘기면 max_tokens에서 잘린 응답의 custom_id를 모음 (호출자가 나눠 재요청)
+"""
+
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from crawlers.http_client import HostRateLimiter, fixture_mode
+
+BATCH_POLL_INTERVAL = 30.0       # 첫 폴링 간격 (초), 이후 1.5배씩 증가
+BATCH_POLL_MAX_INTERVAL = 300.0
+BATCH_TIMEOUT = 24 * 3600.0      # 배치 최대 처리 시간 (API 만료 기준과 동일)
+MAX_BATCH_REQUESTS = 10_000      # 배치 하나에 넣을 최대 요청 수 (넘으면 여러 배치로 나눠 제출)
+
+
+USAGE_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens", "output_tokens")
+
+
+class UsageMeter:
+    """응답 usage 누적 (스레드 안전, 동기/배치 응답 공용)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = dict.fromkeys(USAGE_FIELDS, 0)
+        self.responses = 0
+
+    def add(self, message) -> None:
+        usage = getattr(message, "usage", None)
+        with self._lock:
+            self.responses += 1
+            for field in USAGE_FIELDS:
+                self.totals[field] += getattr(usage, field, None) or 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"responses": self.responses, **self.totals}
+
+    def print_since(self, start: dict, label: str, prefix: str = "    ") -> None:
+        """start(snapshot) 이후 증가분 출력"""
+        now = self.snapshot()
+        delta = {k: now[k] - start.get(k, 0) for k in now}
+        if not delta["responses"]:
+            return
+        prompt = delta["input_tokens"] + delta["cache_creation_input_tokens"] + delta["cache_read_input_tokens"]
+        hit = delta["cache_read_input_tokens"] / prompt if prompt else 0.0
+        print(
+            f"{prefix}[{label}] 응답 {delta['responses']}건 토큰: 입력 {delta['input_tokens']:,} / "
+            f"캐시 쓰기 {delta['cache_creation_input_tokens']:,} / 캐시 읽기 {delta['cache_read_input_tokens']:,} "
+            f"({hit:.0%}) / 출력 {delta['output_tokens']:,}"
+        )
+
+
+def response_text(message) -> str:
+    """Message → 첫 텍스트 블록"""
+    return message.content[0].text
+
+
+def is_truncated(message) -> bool:
+    """응답이 max_tokens에서 잘렸는지"""
+    return getattr(message, "stop_reason", None) == "max_tokens"
+
+
+def supports_batches(client) -> bool:
+    """배치 모드 사용 가능 여부 (기록/재생 모드가 아니고 클라이언트에 batches 엔드포인트가 있음)"""
+    if client is None or fixture_mode() is not None:
+        return False
+    return hasattr(client.messages, "batches")
+
+
+def submit_batch(
+    client,
+    requests: dict[str, dict],
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    timeout: float = BATCH_TIMEOUT,
+    sleep: Callable[[float], None] = time.sleep,
+    usage: Optional[UsageMeter] = None,
+    truncated: Optional[set] = None,
+) -> tuple[dict[str, str], dict[str, str]]:
+    """
+    요청 전체를 배치로 제출하고 완료까지 대기
+    requests: custom_id → messages.create 인자
+    truncated: 지정 시 max_tokens에서 잘린 응답의 custom_id를 추가
+    Returns: (custom_id → 응답 텍스트, custom_id → 실패 사유)
+    Raises: 제출/폴링 중 API 오류, 시간 초과(TimeoutError, 미완료 배치는 취소 요청)
+    """
+    ids = list(requests)
+    batch_ids = []
+    for start in range(0, len(ids), MAX_BATCH_REQUESTS):
+        part = ids[start:start + MAX_BATCH_REQUESTS]
+        batch = client.messages.batches.create(
+            requests=[{"custom_id": cid, "params": requests[cid]} for cid in part]
+        )
+        batch_ids.append(batch.id)
+        print(f"  [llm_batch] 배치 제출: {batch.id} ({len(part)}건)")
+
+    started = time.monotonic()
+    pending = set(batch_ids)
+    interval = poll_interval
+    while True:
+        for batch_id in sorted(pending):
+            batch = client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                pending.discard(batch_id)
+        if not pending:
+            break
+        if time.monotonic() - started > timeout:
+            for batch_id in pending:
+                client.messages.batches.cancel(batch_id)
+            raise TimeoutError(f"배치 {len(pending)}개가 {timeout:.0f}초 안에 끝나지 않음")
+        sleep(interval)
+        interval = min(interval * 1.5, BATCH_POLL_MAX_INTERVAL)
+
+    texts, failures = {}, {}
+    for batch_id in batch_ids:
+        for entry in client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                texts[entry.custom_id] = response_text(entry.result.message)
+                if truncated is not None and is_truncated(entry.result.message):
+                    truncated.add(entry.custom_id)
+                if usage:
+                    usage.add(entry.result.message)
+            else:
+                failures[entry.custom_id] = entry.result.type
+    for cid in ids:
+        if cid not in texts and cid not in failures:
+            failures[cid] = "missing"
+    print(
+        f"  [llm_batch] 배치 완료: 성공 {len(texts)}건 / 실패 {len(failures)}건 "
+        f"({time.monotonic() - started:.0f}초)"
+    )
+    return texts, failures
+
+
+def run_sync(
+    client,
+    requests: dict[str, dict],
+    interval: float = 0.0,
+    usage: Optional[UsageMeter] = None,
+    truncated: Optional[set] = None,
+    limiter: Optional[HostRateLimiter] = None,
+) -> dict[str, Optional[str]]:
+    """
+    요청을 하나씩 messages.create로 처리 (실패한 요청은 None)
+    limiter: 호출마다 새로 만들지 않고 공유할 간격 제한기 (요청 하나씩 여러 번 부르는 스트리밍 모드용)
+    """
+    limiter = limiter or HostRateLimiter(min_interval=interval)
+    texts: dict[str, Optional[str]] = {}
+    for cid, params in requests.items():
+        if limiter.min_interval and fixture_mode() != "replay":
+            limiter.wait("anthropic")
+        try:
+            message = client.messages.create(**params)
+            texts[cid] = response_text(message)
+            if truncated is not None and is_truncated(message):
+                truncated.add(cid)
+            if usage:
+                usage.add(message)
+        except Exception as e:
+            print(f"    [ERROR] API 호출 실패 ({cid}): {e}")
+            texts[cid] = None
+    return texts
+
+
+def run_messages(
+    client,
+    requests: dict[str, dict],
+    batch: bool = True,
+    sync_interval: float = 0.0,
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    sleep: Callable[[float], None] = time.sleep,
+    usage: Optional[UsageMeter] = None,
+    truncated: Optional[set] = None,
+    limiter: Optional[HostRateLimiter] = None,
+) -> dict[str, Optional[str]]:
+    """
+    요청 전체 처리: 가능하면 배치, 아니면/실패하면 동기 폴백
+    truncated: 지정 시 max_tokens에서 잘린 응답의 custom_id를 추가
+    limiter: 동기 호출 간격 제한기 (지정 시 sync_interval 대신 사용, 호출 사이에도 간격 유지)
+    Returns: custom_id → 응답 텍스트 (끝내 실패한 요청은 None)
+    """
+    if not requests:
+        return {}
+    limiter = limiter or HostRateLimiter(min_interval=sync_interval)
+    if not batch or not supports_batches(client):
+        return run_sync(client, requests, usage=usage, truncated=truncated, limiter=limiter)
+
+    try:
+        texts, failures = submit_batch(
+            client, requests, poll_interval=poll_interval, sleep=sleep, usage=usage, truncated=truncated
+        )
+    except Exception as e:
+        print(f"  [llm_batch] 배치 모드 실패 → 동기 호출로 전환: {e}")
+        return run_sync(client, requests, usage=usage, truncated=truncated, limiter=limiter)
+
+    results: dict[str, Optional[str]] = dict(texts)
+    if failures:
+        print(f"  [llm_batch] 배치 실패 {len(failures)}건 동기 재시도")
+        retry = {cid: requests[cid] for cid in failures}
+        results.update(run_sync(client, retry, usage=usage, truncated=truncated, limiter=limiter))
+    return results
+
+
+# ── 로컬 대역 (네트워크 없이 배치 흐름 확인) ─────────────────
+class _StubBatches:
+    def __init__(self, owner: "LocalBatchStub"):
+        self._owner = owner
+        self._batches: dict[str, dict] = {}
+        self._ids = itertools.count(1)
+
+    def create(self, requests):
+        owner = self._owner
+        owner.calls["batches.create"] += 1
+        if owner.fail_submit:
+            raise RuntimeError("stub: 배치 제출 실패")
+        batch_id = f"msgbatch_stub{next(self._ids):04d}"
+        self._batches[batch_id] = {"requests": list(requests), "polls": 0}
+        return SimpleNamespace(id=batch_id, processing_status="in_progress")
+
+    def retrieve(self, batch_id: str):
+        self._owner.calls["batches.retrieve"] += 1
+        state = self._batches[batch_id]
+        state["polls"] += 1
+        done = state["polls"] > self._owner.polls_until_done
+        return SimpleNamespace(id=batch_id, processing_status="ended" if done else "in_progress")
+
+    def cancel(self, batch_id: str):
+        self._owner.calls["batches.cancel"] += 1
+        return SimpleNamespace(id=batch_id, processing_status="canceling")
+
+    def results(self, batch_id: str):
+        owner = self._owner
+        owner.calls["batches.results"] += 1
+        for req in self._batches[batch_id]["requests"]:
+            cid = req["custom_id"]
+            if cid in owner.errored_ids:
+                result = SimpleNamespace(type="errored", message=None)
+            else:
+                result = SimpleNamespace(type="succeeded", message=owner._message(req["params"]))
+            yield SimpleNamespace(custom_id=cid, result=result)
+
+
+class _StubMessages:
+    def __init__(self, owner: "LocalBatchStub"):
+        self._owner = owner
+        self.batches = _StubBatches(owner)
+
+    def create(self, **params):
+        self._owner.calls["messages.create"] += 1
+        return self._owner._message(params)
+
+
+class LocalBatchStub:
+    """
+    Anthropic 클라이언트 대역: messages.create + messages.batches.create/retrieve/cancel/results
+    responder(params) → 응답 텍스트 / errored_ids: 배치 안에서 실패시킬 custom_id
+    usage는 글자 수/4로 흉내 내고, cache_control 블록까지의 system 접두부는 두 번째 요청부터 캐시 읽기로 계산
+    """
+
+    def __init__(
+        self,
+        responder: Callable[[dict], str],
+        polls_until_done: int = 2,
+        errored_ids: tuple = (),
+        fail_submit: bool = False,
+    ):
+        self.responder = responder
+        self.polls_until_done = polls_until_done
+        self.errored_ids = set(errored_ids)
+        self.fail_submit = fail_submit
+        self.calls = {k: 0 for k in (
+            "messages.create", "batches.create", "batches.retrieve", "batches.cancel", "batches.results"
+        )}
+        self.messages = _StubMessages(self)
+        self._cached_prefixes: set[str] = set()
+
+    def _usage(self, params: dict, text: str) -> SimpleNamespace:
+        system = params.get("system") or ""
+        blocks = [{"text": system}] if isinstance(system, str) else system
+        prefix, rest, cached = "", "", False
+        for block in blocks:
+            if cached:
+                rest += block["text"]
+            else:
+                prefix += block["text"]
+                cached = "cache_control" in block
+        if not cached:
+            prefix, rest = "", prefix
+        rest += "".join(str(m["content"]) for m in params.get("messages", []))
+        write = read = 0
+        if prefix in self._cached_prefixes:
+            read = len(prefix) // 4
+        elif prefix:
+            self._cached_prefixes.add(prefix)
+            write = len(prefix) // 4
+        return SimpleNamespace(
+            input_tokens=len(rest) // 4,
+            cache_creation_input_tokens=write,
+            cache_read_input_tokens=read,
+            output_tokens=len(text) // 4,
+        )
+
+    def _message(self, params: dict):
+        text = self.responder(params)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], usage=self._usage(params, text))
+
+
+def _demo() -> None:
+    """대역으로 배치 성공 / 개별 실패 재시도 / 제출 실패 폴백 확인"""
+    requests = {
+        f"chunk-{i}": {"model": "stub", "max_tokens": 16, "messages": [{"role": "user", "content": f"text {i}"}]}
+        for i in range(5)
+    }
+
+    def echo(params: dict) -> str:
+        return params["messages"][0]["content"].upper()
+
+    for label, stub in (
+        ("배치", LocalBatchStub(echo)),
+        ("개별 실패 2건", LocalBatchStub(echo, errored_ids=("chunk-1", "chunk-3"))),
+        ("제출 실패", LocalBatchStub(echo, fail_submit=True)),
+    ):
+        texts = run_messages(stub, requests, poll_interval=0, sleep=lambda _: None)
+        ok = all(texts[cid] == echo(params) for cid, params in requests.items())
+        print(f"  {label}: 결과 일치 {ok}, 호출 {stub.calls}")
+
+
+if __name__ == "__main__":
+    _demo()
@@ -1,13 +1,40 @@
 """
 Fandom Query Dictionary 자동 구축 파이프라인
-실행: python main.py [--skip-seed] [--skip-reddit] [--skip-weverse] [--skip-classify] [--skip-upload]
+실행: python main.py [--skip-seed] [--skip-reddit] [--skip-weverse] [--skip-classify] [--skip-upload] [--fuzzy-merge]
+      [--record FILE | --replay FILE [--replay-dir DIR]]
+                                        # HTTP/Claude 응답 기록 → 오프라인 재생 (재생은 데이터 디렉터리 사본에서)
+      [--max-parallel N]                # 단계 동시 실행 수 (1이면 직렬)
+      [--stream]                        # 크롤링과 분류를 동시에 (data/raw/stream/*.jsonl)
+      [--llm-token-budget N]            # Reddit LLM 추출 토큰 예산 (관련도 상위 게시물부터)
+      [--llm-batch]                     # 시드/Reddit LLM 요청을 Message Batches로 일괄 제출
+
+단계 DAG (pipeline.Pipeline, 선행 단계가 끝나는 즉시 시작):
+  seed, crawl:weverse, crawl:reddit, crawl:ebay    ← 서로 독립, 동시 실행
+  crawl:weverse          → extract:weverse        (API 불필요)
+  seed + crawl:reddit    → extract:reddit
+  seed + crawl:ebay      → extract:ebay
+  seed + extract:*       → merge → STEP 5 시트 업로드
+  merge                  → compile:query          (검색어 정규화 트라이, query_normalizer)
+  merge                  → index:typo             (오타 교정 인덱스 증분 갱신, typo_index)
+  --stream이면 extract:*가 crawl:*을 기다리지 않고 스트림 파일을 따라 읽으며 동시 실행
 """
 
 import argparse
-import json
+import atexit
 import os
+import shutil
 import sys
+import tempfile
 from datetime import datetime, timezone
+from typing import Optional
+
+import dataset
+from pipeline import DEFAULT_MAX_PARALLEL, Pipeline
+from relevance import DEFAULT_TOKEN_BUDGET
+
+# 요청 내용을 바꾸는 크롤러 상태 파일 (--record 때 아카이브에 넣고 --replay 때 복원)
+#   reddit_crawler.CURSORS_FILENAME, weverse_crawler.HTTP_CACHE_FILENAME
+FIXTURE_STATE_FILES = ("reddit_cursors.json", "weverse_http_cache.json")
 
 
 def print_banner():
@@ -56,12 +83,15 @@ def print_summary(seed_data, reddit_data, weverse_data, classified_data):
     print("=" * 60)
 
 
-def check_env(skip_seed: bool, skip_reddit: bool):
+def check_env(skip_seed: bool, skip_reddit: bool, replay: bool = False):
     """
     필수 환경변수 확인.
     - Claude: STEP 1(씨드 생성)에서만 필요. --skip-seed 시 정적 시드 사용.
     - Reddit: API 불필요 (JSON 피드). 분류는 Claude 있으면 LLM, 없으면 규칙 기반.
+    - --replay: 기록된 응답을 사용하므로 API 키 불필요.
     """
+    if replay:
+        return True
     if not skip_seed and not os.environ.get("ANTHROPIC_API_KEY"):
         print("[ERROR] 시드 생성에 Claude API 필요: ANTHROPIC_API_KEY")
         print("  .env에 추가하거나 --skip-seed 로 정적 시드 사용.")
@@ -78,108 +108,248 @@ def main():
     parser.add_argument("--skip-reddit", action="store_true", help="STEP 3 (Reddit) 건너뛰기")
     parser.add_argument("--ebay", action="store_true", help="eBay 수집 추가 (API 불필요)")
     parser.add_argument("--skip-classify", action="store_true", help="STEP 4 (분류) 건너뛰기")
+    parser.add_argument("--fuzzy-merge", action="store_true", help="STEP 4 병합 시 편집거리 기반 퍼지 매칭 사용")
     parser.add_argument("--skip-upload", action="store_true", help="STEP 5 (시트 업로드) 건너뛰기")
+    parser.add_argument(
+        "--llm-token-budget",
+        type=int,
+        default=DEFAULT_TOKEN_BUDGET,
+        help=f"Reddit LLM 추출 실행당 토큰 예산 (기본: {DEFAULT_TOKEN_BUDGET:,}, 관련도 상위 게시물부터 사용)",
+    )
+    parser.add_argument(
+        "--llm-batch",
+        action="store_true",
+        help="시드 생성/Reddit 추출을 Message Batches로 일괄 제출 (야간 실행용, --stream 추출과 기록/재생 모드는 동기 호출)",
+    )
     parser.add_argument(
         "--data-dir",
         default="data/raw",
         help="데이터 저장 디렉토리 (기본: data/raw)",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="크롤러 → 분류기 스트리밍 (수집 즉시 분류, 중단 시 마지막 오프셋부터 재개)",
+    )
+    parser.add_argument(
+        "--max-parallel",
+        type=int,
+        default=DEFAULT_MAX_PARALLEL,
+        help=f"동시에 실행할 단계 수 (기본: {DEFAULT_MAX_PARALLEL}, 1이면 직렬 실행)",
+    )
+    fixture = parser.add_mutually_exclusive_group()
+    fixture.add_argument("--record", metavar="FILE", help="모든 HTTP/Claude 응답을 FILE(.jsonl.gz)에 기록")
+    fixture.add_argument("--replay", metavar="FILE", help="FILE에 기록된 응답으로 네트워크 없이 재실행")
+    parser.add_argument(
+        "--replay-dir",
+        metavar="DIR",
+        help="--replay 결과를 남길 디렉터리 (데이터 디렉터리를 여기로 복사해 실행, 기본: 임시 디렉터리, 끝나면 삭제)",
+    )
     args = parser.parse_args()
+    if args.replay_dir and not args.replay:
+        parser.error("--replay-dir은 --replay와 함께 사용")
+    if args.replay_dir and os.path.realpath(args.replay_dir) == os.path.realpath(args.data_dir):
+        parser.error("--replay-dir은 --data-dir과 다른 디렉터리여야 함 (재생이 실제 데이터를 덮어씀)")
 
     # .env 로드
     from dotenv import load_dotenv
     load_dotenv()
 
-    if not check_env(args.skip_seed, args.skip_reddit):
+    # 기록/재생 모드는 크롤러/분류기 import 전에 설정
+    from crawlers.http_client import set_fixture_mode
+    archive = None
+    if args.record:
+        archive = set_fixture_mode("record", args.record)
+        print(f"[fixture] 응답 기록 → {args.record}\n")
+    elif args.replay:
+        if not os.path.exists(args.replay):
+            print(f"[ERROR] 재생 파일 없음: {args.replay}")
+            sys.exit(1)
+        archive = set_fixture_mode("replay", args.replay)
+        print(f"[fixture] 응답 재생 ← {args.replay} ({len(archive):,}건)\n")
+
+    if not check_env(args.skip_seed, args.skip_reddit, replay=bool(args.replay)):
         sys.exit(1)
 
     os.makedirs(args.data_dir, exist_ok=True)
 
     data_dir = args.data_dir
-    seed_path = os.path.join(data_dir, "claude_seed.json")
+    if args.record:
+        archive.save_state(data_dir, FIXTURE_STATE_FILES)
+    elif args.replay:
+        # 재생은 데이터 디렉터리 사본에서 실행 (실제 데이터/커서/ETag 캐시를 덮어쓰지 않음)
+        # 사본의 상태 파일은 기록 시작 시점 내용으로 복원 → 조건부 요청 키/페이지 범위가 기록과 같음
+        # --replay-dir이 없으면 임시 디렉터리에서 실행하고 종료 시 삭제 (/tmp에 사본이 쌓이지 않도록)
+        if args.replay_dir:
+            data_dir = args.replay_dir
+        else:
+            data_dir = tempfile.mkdtemp(prefix="replay-")
+            atexit.register(shutil.rmtree, data_dir, ignore_errors=True)
+        shutil.copytree(args.data_dir, data_dir, dirs_exist_ok=True, ignore=shutil.ignore_patterns("stream"))
+        restored = archive.restore_state(data_dir)
+        kept = "결과 유지" if args.replay_dir else "종료 시 삭제, 결과를 남기려면 --replay-dir"
+        print(f"[fixture] 재생 데이터 디렉터리: {data_dir} (상태 파일 {restored}개 복원, {kept})\n")
+
+    # 데이터셋은 JSON Lines (dataset 모듈) — 기존 *.json 배열 파일은 JSONL로 변환하고 삭제
+    # (남겨 두면 더 이상 갱신되지 않는 옛 사본을 다른 도구가 읽게 됨)
+    seed_path = os.path.join(data_dir, "claude_seed.jsonl")
     static_seed_path = os.path.join(data_dir, "static_seed.json")
-    reddit_path = os.path.join(data_dir, "reddit_raw.json")
-    ebay_path = os.path.join(data_dir, "ebay_raw.json")
-    weverse_path = os.path.join(data_dir, "weverse_raw.json")
-    classified_path = os.path.join(data_dir, "classified.json")
-
-    seed_data = []
-    reddit_data = []
-    weverse_data = []
-    classified_data = []
+    reddit_path = os.path.join(data_dir, "reddit_raw.jsonl")
+    ebay_path = os.path.join(data_dir, "ebay_raw.jsonl")
+    weverse_path = os.path.join(data_dir, "weverse_raw.jsonl")
+    classified_path = os.path.join(data_dir, "classified.jsonl")
+    for path in (seed_path, reddit_path, ebay_path, weverse_path, classified_path):
+        legacy = dataset.migrate_legacy(path)
+        if legacy:
+            print(f"[dataset] 레거시 배열 파일 변환: {legacy} → {os.path.basename(path)}")
+
+    pipe = Pipeline()
+
+    def load_json(path: str, label: str) -> list:
+        if not dataset.exists(path):
+            return []
+        data = dataset.read_records(path)
+        print(f"  [{label}] 기존 파일 로드: {len(data)}개 항목")
+        return data
 
     # ── STEP 1: 시드 사전 (Claude API 또는 정적 시드) ───────
-    if not args.skip_seed:
-        print("\n[STEP 1/5] Claude API 초기 사전 생성")
-        print("-" * 40)
-        from generators.claude_seed import generate_seed_dictionary
-        seed_data = generate_seed_dictionary(output_path=seed_path)
-    else:
-        print("\n[STEP 1/5] 건너뜀 (--skip-seed)")
+    # 결과: (시드 항목, classifier가 사용할 시드 파일 경로)
+    def step_seed(_):
+        if not args.skip_seed:
+            from generators.claude_seed import generate_seed_dictionary
+            return generate_seed_dictionary(output_path=seed_path, batch=args.llm_batch), seed_path
+        seed_data, path = load_json(seed_path, "seed"), seed_path
         # claude_seed 없거나 비어있으면 static_seed 사용 (API 없이 바로 실행 가능)
-        if os.path.exists(seed_path):
-            with open(seed_path, encoding="utf-8") as f:
-                seed_data = json.load(f)
-        if not seed_data and os.path.exists(static_seed_path):
-            print(f"  claude_seed 비어있음 → 정적 시드 사용 (API 불필요)")
-            with open(static_seed_path, encoding="utf-8") as f:
-                seed_data = json.load(f)
-            seed_path = static_seed_path  # classifier가 이 파일 사용
-        print(f"  시드 로드: {len(seed_data)}개 항목")
-
-    # ── STEP 2: 위버스샵 크롤링 ────────────────────────────
-    if not args.skip_weverse:
-        print("\n[STEP 2/5] 위버스샵 상품명 수집")
-        print("-" * 40)
+        if not seed_data and dataset.exists(static_seed_path):
+            print(f"  [seed] claude_seed 비어있음 → 정적 시드 사용 (API 불필요)")
+            seed_data, path = load_json(static_seed_path, "seed"), static_seed_path
+        return seed_data, path
+
+    # --stream: 크롤러가 수집 즉시 JSON Lines 스트림에 기록 → 분류기가 도착하는 대로 소비
+    stream_dir = os.path.join(data_dir, "stream")
+    streams = {}
+    if args.stream and not args.skip_classify:
+        from streaming import ItemStream
+        producing = {"weverse": not args.skip_weverse, "reddit": not args.skip_reddit, "ebay": args.ebay}
+        for source, on in producing.items():
+            if on:
+                streams[source] = ItemStream(os.path.join(stream_dir, f"{source}.jsonl"))
+        # 지난 실행의 .done 마커는 어떤 단계도 시작하기 전에 제거
+        # (크롤러가 open()하기 전에 소비자가 먼저 시작해 지난 마커를 보고 끝나버리는 것 방지)
+        for stream in streams.values():
+            stream.reset()
+
+    def closing_stream(source: str, crawl):
+        """크롤링 단계 래퍼: 크롤러가 open() 전에 실패해도(import 오류 포함) .done을 남겨 소비자가 멈추지 않게"""
+        def run(inputs):
+            try:
+                return crawl(inputs)
+            finally:
+                if source in streams:
+                    streams[source].close()
+        return run
+
+    # ── STEP 2/3/2.5: 크롤링 (서로 독립 → 동시 실행) ─────────
+    def step_weverse(_):
+        if args.skip_weverse:
+            return load_json(weverse_path, "weverse")
         from crawlers.weverse_crawler import crawl_weverse
-        weverse_data = crawl_weverse(output_path=weverse_path)
-    else:
-        print("\n[STEP 2/5] 건너뜀 (--skip-weverse)")
-        if os.path.exists(weverse_path):
-            with open(weverse_path, encoding="utf-8") as f:
-                weverse_data = json.load(f)
-            print(f"  기존 파일 로드: {len(weverse_data)}개 항목")
-
-    # ── STEP 3: Reddit 크롤링 (API 불필요, JSON 피드 사용) ───
-    if not args.skip_reddit:
-        print("\n[STEP 3/5] Reddit 크롤링 (API 키 불필요)")
-        print("-" * 40)
+        return crawl_weverse(output_path=weverse_path, stream=streams.get("weverse"))
+
+    def step_reddit(_):
+        if args.skip_reddit:
+            return load_json(reddit_path, "reddit")
         from crawlers.reddit_crawler import crawl_reddit
-        reddit_data = crawl_reddit(output_path=reddit_path)
-    else:
-        print("\n[STEP 3/5] 건너뜀 (--skip-reddit)")
-        if os.path.exists(reddit_path):
-            with open(reddit_path, encoding="utf-8") as f:
-                reddit_data = json.load(f)
-            print(f"  기존 파일 로드: {len(reddit_data)}개 항목")
+        return crawl_reddit(output_path=reddit_path, stream=streams.get("reddit"))
 
-    # ── STEP 2.5: eBay 수집 (선택, API 불필요) ─────────────────
-    if args.ebay:
-        print("\n[STEP 2.5] eBay 상품 제목 수집 (API 불필요)")
-        print("-" * 40)
+    def step_ebay(_):
         from crawlers.ebay_crawler import crawl_ebay
-        crawl_ebay(output_path=ebay_path)
+        return crawl_ebay(output_path=ebay_path, stream=streams.get("ebay"))
 
-    # ── STEP 4: 분류 ───────────────────────────────────────
+    # 생산자(크롤러)를 먼저 등록 → 스케줄러가 소비자보다 먼저 슬롯을 배정 (대기 교착 방지)
+    pipe.add("seed", step_seed)
+    pipe.add("crawl:weverse", closing_stream("weverse", step_weverse))
+    pipe.add("crawl:reddit", closing_stream("reddit", step_reddit))
+    if args.ebay:
+        pipe.add("crawl:ebay", closing_stream("ebay", step_ebay))
+
+    # ── STEP 4: 분류 (소스별 추출은 해당 크롤링이 끝나는 즉시, --stream이면 크롤링과 동시에) ──
     if not args.skip_classify:
-        print("\n[STEP 4/5] 신조어 추출 및 분류")
-        print("-" * 40)
-        from classifier import classify
-        classified_data = classify(
-            seed_path=seed_path,
-            reddit_path=reddit_path,
-            weverse_path=weverse_path,
-            output_path=classified_path,
+        import classifier
+
+        def add_extract(source: str, batch_extract, crawl_step: Optional[str], needs_seed: bool):
+            stream_path = os.path.join(stream_dir, f"{source}.jsonl")
+            streaming = source in streams or (args.stream and os.path.exists(stream_path))
+
+            def run(inputs):
+                lookup = classifier.build_seed_lookup(inputs["seed"][0]) if needs_seed else None
+                if streaming:
+                    return classifier.stream_extract_terms(
+                        source, stream_path, lookup, follow=source in streams, token_budget=args.llm_token_budget
+                    )
+                return batch_extract(lookup)
+
+            deps = ["seed"] if needs_seed else []
+            if crawl_step and source not in streams:
+                deps.append(crawl_step)
+            pipe.add(f"extract:{source}", run, deps=deps)
+
+        add_extract(
+            "weverse", lambda _: classifier.extract_weverse_terms(weverse_path), "crawl:weverse", needs_seed=False
+        )
+        add_extract(
+            "reddit",
+            lambda lookup: classifier.extract_reddit_terms(reddit_path, lookup, args.llm_token_budget, args.llm_batch),
+            "crawl:reddit",
+            needs_seed=True,
+        )
+        add_extract(
+            "ebay",
+            lambda lookup: classifier.extract_ebay_terms(ebay_path, lookup),
+            "crawl:ebay" if args.ebay else None,
+            needs_seed=True,
         )
+
+        def step_merge(inputs):
+            existing_terms = inputs["seed"][0]
+            new_terms = inputs["extract:weverse"] + inputs["extract:reddit"] + inputs["extract:ebay"]
+            return classifier.finalize_terms(
+                existing_terms, new_terms, classified_path, fuzzy_merge=args.fuzzy_merge
+            )
+
+        pipe.add("merge", step_merge, deps=["seed", "extract:weverse", "extract:reddit", "extract:ebay"])
+
+        def step_compile_query(_):
+            from query_normalizer import compile_dictionary
+            return compile_dictionary(classified_path, os.path.join(data_dir, "query_trie.bin"))
+
+        pipe.add("compile:query", step_compile_query, deps=["merge"])
+
+        def step_index_typo(_):
+            from typo_index import update_index
+            return update_index(classified_path, os.path.join(data_dir, "typo_index.json.gz"))
+
+        pipe.add("index:typo", step_index_typo, deps=["merge"])
     else:
-        print("\n[STEP 4/5] 건너뜀 (--skip-classify)")
-        if os.path.exists(classified_path):
-            with open(classified_path, encoding="utf-8") as f:
-                classified_data = json.load(f)
-            print(f"  기존 파일 로드: {len(classified_data)}개 항목")
+        print("[STEP 4/5] 건너뜀 (--skip-classify)")
+        pipe.add("merge", lambda r: load_json(classified_path, "classify"))
+
+    print(f"[STEP 1~4] 시드/크롤링/분류 단계 실행 (동시 실행 최대 {args.max_parallel}개)")
+    print("-" * 40)
+    pipe.run(max_parallel=args.max_parallel)
+    pipe.print_report()
+
+    seed_data = (pipe.result("seed") or ([], seed_path))[0]
+    weverse_data = pipe.result("crawl:weverse", [])
+    reddit_data = pipe.result("crawl:reddit", [])
+    classified_data = pipe.result("merge", [])
 
     # ── STEP 5: 구글 시트 업로드 ───────────────────────────
-    if not args.skip_upload:
+    if pipe.failed:
+        print(f"\n[STEP 5/5] 건너뜀 (실패한 단계: {', '.join(st.name for st in pipe.failed)})")
+    elif args.replay:
+        print("\n[STEP 5/5] 건너뜀 (--replay: 시트 쓰기는 기록/재생 대상 아님)")
+    elif not args.skip_upload:
         print("\n[STEP 5/5] 구글 시트 업데이트")
         print("-" * 40)
         sheet_env_ok = bool(os.environ.get("GOOGLE_SHEET_ID"))
@@ -205,6 +375,8 @@ def main():
 
     # ── 최종 요약 ──────────────────────────────────────────
     print_summary(seed_data, reddit_data, weverse_data, classified_data)
+    if pipe.failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+"""
+용어 병합 엔진 (classifier.merge_with_existing 내부 구현)
+- 정규화 키 인덱스: NFKC, 대소문자/공백/하이픈 폴딩, 한글 자모 정규화
+  예: "Photo card" / "photocard" / "ＰＨＯＴＯ-ＣＡＲＤ" → 같은 키
+- 선택: 삭제 이웃(deletion neighborhood) 블로킹 + 편집거리 검증으로 퍼지 매칭
+  (후보 생성이 용어 길이에만 비례 → 10만+ 항목에서도 근선형)
+- 병합 결정(정확/정규화/퍼지/신규)을 기록해 리포트로 반환
+"""
+
+import unicodedata
+from collections import defaultdict
+from typing import Optional
+
+# 키 생성 시 제거할 문자: 공백류, 하이픈/대시류, 구두점 일부
+_FOLD_CHARS = " \t\r\n 　_-.·・'’`‐‑‒–—―−－"
+_FOLD_TABLE = str.maketrans("", "", _FOLD_CHARS)
+
+# NFKC 후 홀로 남은 조합형 자모(U+1100~) → 호환 자모(U+3131~)로 통일
+# (예: "포카ㅡ"의 "ㅡ"는 NFKC에서 U+1173이 되므로 입력 방식과 무관하게 같은 키가 되도록)
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JAMO_TABLE = {0x1100 + i: c for i, c in enumerate(_CHOSEONG)}
+_JAMO_TABLE.update({0x1161 + i: c for i, c in enumerate(_JUNGSEONG)})
+
+# 퍼지 매칭 기본값
+FUZZY_MAX_DISTANCE = 1
+FUZZY_MIN_LENGTH = 6       # 짧은 약어(WTS/WTB 등)는 퍼지 매칭 제외
+MAX_POSTING_SIZE = 50      # 너무 흔한 삭제형은 블로킹에서 제외 (근선형 유지)
+
+
+def normalize_term(term: str) -> str:
+    """용어 → 정규화 키 문자열 (NFKC + casefold + 공백/하이픈 폴딩 + 자모 통일)"""
+    text = unicodedata.normalize("NFKC", term or "").casefold()
+    folded = text.translate(_FOLD_TABLE).translate(_JAMO_TABLE)
+    # 구두점만으로 된 용어는 원문(소문자) 유지
+    return folded or text.strip()
+
+
+def term_key(term: str, language: Optional[str]) -> tuple[str, str]:
+    """병합 키: (정규화 용어, 언어)"""
+    return normalize_term(term), language or "ko"
+
+
+def deletion_variants(text: str, max_dist: int) -> set[str]:
+    """max_dist개 이하 문자를 삭제해 만들 수 있는 모든 문자열 (자기 자신 포함)"""
+    variants = {text}
+    frontier = {text}
+    for _ in range(max_dist):
+        nxt = set()
+        for w in frontier:
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1 :])
+        nxt -= variants
+        variants |= nxt
+        frontier = nxt
+    return variants
+
+
+def bounded_edit_distance(a: str, b: str, max_dist: int) -> int:
+    """편집거리 (max_dist 초과 시 max_dist + 1 반환, 대각 밴드만 계산)"""
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if abs(la - lb) > max_dist:
+        return max_dist + 1
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    inf = max_dist + 1
+    prev = list(range(lb + 1))
+    for i in range(1, la + 1):
+        lo = max(1, i - max_dist)
+        hi = min(lb, i + max_dist)
+        cur = [inf] * (lb + 1)
+        if lo == 1:
+            cur[0] = i
+        ca = a[i - 1]
+        row_min = cur[0] if lo == 1 else inf
+        for j in range(lo, hi + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            v = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > max_dist:
+            return inf
+        prev = cur
+    return min(prev[lb], inf)
+
+
+class TermIndex:
+    """
+    정규화 키 → 항목 위치 해시 인덱스 (+ 선택적 삭제 이웃 블로킹 인덱스)
+    entries 리스트는 인덱스가 직접 보유하며, add() 시 뒤에 추가됨
+    """
+
+    def __init__(self, fuzzy: bool = False, max_distance: int = FUZZY_MAX_DISTANCE):
+        self.entries: list[dict] = []
+        self.fuzzy = fuzzy
+        self.max_distance = max_distance
+        self._by_key: dict[tuple[str, str], int] = {}
+        # (언어, 삭제형) → 정규화 용어 목록 (퍼지 블로킹용)
+        self._deletes: dict[tuple[str, str], list[str]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: tuple[str, str]) -> Optional[int]:
+        return self._by_key.get(key)
+
+    def add(self, entry: dict, key: tuple[str, str]) -> int:
+        idx = len(self.entries)
+        self.entries.append(entry)
+        self._by_key[key] = idx
+        if self.fuzzy and len(key[0]) >= FUZZY_MIN_LENGTH:
+            norm, lang = key
+            for v in deletion_variants(norm, self.max_distance):
+                posting = self._deletes[(lang, v)]
+                if len(posting) <= MAX_POSTING_SIZE:
+                    posting.append(norm)
+        return idx
+
+    def find_fuzzy(self, key: tuple[str, str]) -> Optional[tuple[int, int]]:
+        """퍼지 후보 검색 → (항목 위치, 편집거리) 또는 None"""
+        norm, lang = key
+        if not self.fuzzy or len(norm) < FUZZY_MIN_LENGTH:
+            return None
+        # 편집거리 d 이내인 두 문자열은 각각 d개 이하 삭제로 같은 문자열이 됨
+        candidates: set[str] = set()
+        for v in deletion_variants(norm, self.max_distance):
+            posting = self._deletes.get((lang, v))
+            if posting and len(posting) <= MAX_POSTING_SIZE:
+                candidates.update(posting)
+
+        best: Optional[tuple[int, int]] = None
+        for cand in candidates:
+            if abs(len(cand) - len(norm)) > self.max_distance:
+                continue
+            dist = bounded_edit_distance(norm, cand, self.max_distance)
+            if dist <= self.max_distance and (best is None or dist < best[1]):
+                best = (self._by_key[(cand, lang)], dist)
+                if dist == 0:
+                    break
+        return best
+
+
+def _standards_conflict(a: dict, b: dict) -> bool:
+    """두 항목의 표준어가 모두 채워져 있고 서로 다르면 True (퍼지 병합 금지)"""
+    for field in ("standard_en", "standard_ko"):
+        va, vb = a.get(field), b.get(field)
+        if va and vb and normalize_term(va) != normalize_term(vb):
+            return True
+    return False
+
+
+def _absorb(target: dict, term: dict) -> None:
+    """중복 항목 흡수: confidence verified + 비어있는 표준어 보완"""
+    target["confidence"] = "verified"
+    for field in ("standard_en", "standard_ko"):
+        if not target.get(field) and term.get(field):
+            target[field] = term[field]
+
+
+def merge_terms(
+    new_terms: list[dict],
+    existing_terms: list[dict],
+    fuzzy: bool = False,
+    max_distance: int = FUZZY_MAX_DISTANCE,
+) -> tuple[list[dict], dict]:
+    """
+    기존 항목과 신규 항목 병합
+    Returns: (병합된 전체 목록, 리포트)
+      리포트: {"exact", "normalized", "fuzzy", "added", "existing_collapsed", "decisions": [...]}
+      decisions에는 정확 일치/신규 추가를 제외한 병합 결정만 기록
+    """
+    index = TermIndex(fuzzy=fuzzy, max_distance=max_distance)
+    report = {"exact": 0, "normalized": 0, "fuzzy": 0, "added": 0, "existing_collapsed": 0, "decisions": []}
+    decisions = report["decisions"]
+
+    # 기존 항목 인덱싱 (정규화 키가 같은 기존 중복은 첫 항목으로 접음)
+    for entry in existing_terms:
+        term = entry.get("original_term")
+        if not term:
+            index.add(entry, (f"\x00{len(index)}", ""))
+            continue
+        key = term_key(term, entry.get("language"))
+        idx = index.get(key)
+        if idx is None:
+            index.add(entry, key)
+            continue
+        target = index.entries[idx]
+        for field in ("standard_en", "standard_ko"):
+            if not target.get(field) and entry.get(field):
+                target[field] = entry[field]
+        report["existing_collapsed"] += 1
+        decisions.append({
+            "action": "existing_collapsed",
+            "term": term,
+            "matched": target["original_term"],
+            "language": key[1],
+        })
+
+    for term in new_terms:
+        original = term.get("original_term")
+        if not original:
+            continue
+        key = term_key(original, term.get("language", "ko"))
+        idx = index.get(key)
+        if idx is not None:
+            target = index.entries[idx]
+            if target["original_term"].lower() == original.lower():
+                report["exact"] += 1
+            else:
+                report["normalized"] += 1
+                decisions.append({
+                    "action": "normalized",
+                    "term": original,
+                    "matched": target["original_term"],
+                    "language": key[1],
+                })
+            _absorb(target, term)
+            continue
+
+        match = index.find_fuzzy(key)
+        if match is not None and not _standards_conflict(index.entries[match[0]], term):
+            target = index.entries[match[0]]
+            report["fuzzy"] += 1
+            decisions.append({
+                "action": "fuzzy",
+                "term": original,
+                "matched": target["original_term"],
+                "language": key[1],
+                "distance": match[1],
+            })
+            _absorb(target, term)
+            continue
+
+        term.setdefault("confidence", "medium")
+        index.add(term, key)
+        report["added"] += 1
+
+    return index.entries, report
@@ -0,0 +1,163 @@
+"""
+LLM 추출 전 유사 중복 텍스트 억제 (classifier.extract_posts_packed 내부 사용)
+- Reddit 거래글은 템플릿 문구("WTS US only, PayPal G&S, see pics...")가 대부분
+  → 같은/거의 같은 청크를 매번 Claude에 보내지 않도록 대표 청크 하나만 추출하고
+    결과 용어를 같은 클러스터의 나머지 청크에 복사(fan-out)
+- 청크 지문: 64비트 SimHash (단어 + 단어 바이그램, 숫자는 0으로 접어 가격/수량 차이 무시)
+  + 16비트씩 4개 밴드 LSH → 해밍거리 3 이하 후보만 비교, 자카드 유사도로 한 번 더 검증
+- 줄 단위 상용구: 다른 게시물에서 이미 본 줄은 본문에서 떼어 따로 청킹
+  → 고유한 본문은 템플릿에 묻히지 않고, 템플릿 묶음끼리는 거의 같아 캐시 결과를 재사용
+
+    dedup = ChunkDeduper()
+    rep_id, is_new = dedup.cluster(chunk)     # 새 대표면 추출 후 dedup.set_terms(rep_id, terms)
+    terms = dedup.terms_for(rep_id)           # 같은 클러스터 청크는 대표 결과 복사본
+    dedup.print_stats()
+"""
+
+import copy
+import hashlib
+import re
+from collections import Counter
+from typing import Optional
+
+SIMHASH_BITS = 64
+LSH_BANDS = 4                    # 해밍거리 ≤ LSH_BANDS-1이면 최소 한 밴드가 반드시 일치
+MAX_HAMMING = 3
+MIN_JACCARD = 0.8                # SimHash 후보 검증 (단어 집합 기준)
+BOILERPLATE_MIN_POSTS = 2        # 이 수 이상의 게시물에 나온 줄은 상용구로 분리
+BOILERPLATE_MIN_LENGTH = 12      # 짧은 줄("WTS", "thanks!")은 상용구로 보지 않음
+
+_TOKEN_RE = re.compile(r"(?:[^\W_]|&)+")     # 유니코드 단어 (일본어/중국어/악센트 라틴 포함)
+_DIGIT_RE = re.compile(r"\d+")
+_BAND_BITS = SIMHASH_BITS // LSH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def tokenize(text: str) -> list[str]:
+    """소문자 단어 토큰 (숫자 → 0, 이모지/기호는 제외)"""
+    return _TOKEN_RE.findall(_DIGIT_RE.sub("0", text.lower()))
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(tokens: list[str]) -> int:
+    """단어 + 바이그램 특징의 64비트 SimHash"""
+    features = Counter(tokens)
+    features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    weights = [0] * SIMHASH_BITS
+    for feature, weight in features.items():
+        h = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += weight if (h >> bit) & 1 else -weight
+    return sum(1 << bit for bit, w in enumerate(weights) if w > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ChunkDeduper:
+    """
+    청크 단위 유사 중복 클러스터 + 대표 청크의 추출 결과 캐시
+    (배치 모드는 실행 전체, 스트리밍 모드는 스트림 소비 한 번 동안 하나를 공유)
+    """
+
+    def __init__(
+        self,
+        max_hamming: int = MAX_HAMMING,
+        min_jaccard: float = MIN_JACCARD,
+        boilerplate_min_posts: int = BOILERPLATE_MIN_POSTS,
+    ):
+        if max_hamming >= LSH_BANDS:
+            raise ValueError(f"max_hamming은 {LSH_BANDS - 1} 이하여야 함 (밴드 수 기준)")
+        self.max_hamming = max_hamming
+        self.min_jaccard = min_jaccard
+        self.boilerplate_min_posts = boilerplate_min_posts
+        self._bands: list[dict[int, list[int]]] = [{} for _ in range(LSH_BANDS)]
+        self._reps: list[tuple[int, frozenset, list[dict]]] = []  # (지문, 단어 집합, 추출 결과)
+        self._line_posts: Counter = Counter()
+        self.stats = Counter()
+
+    # ── 줄 단위 상용구 ──
+    def split_boilerplate(self, text: str) -> tuple[str, str]:
+        """
+        게시물 텍스트 → (고유 본문, 상용구 줄 묶음) (게시물 하나당 한 번 호출)
+        지금까지 boilerplate_min_posts개 이상의 게시물에 나온 긴 줄을 상용구로 분리
+        """
+        kept, boilerplate, seen = [], [], set()
+        for line in text.split("\n"):
+            key = " ".join(tokenize(line))
+            if len(key) >= BOILERPLATE_MIN_LENGTH and key not in seen:
+                seen.add(key)
+                self._line_posts[key] += 1
+                if self._line_posts[key] >= self.boilerplate_min_posts:
+                    boilerplate.append(line)
+                    continue
+            kept.append(line)
+        self.stats["boilerplate_lines"] += len(boilerplate)
+        return "\n".join(kept), "\n".join(boilerplate)
+
+    # ── 청크 클러스터 ──
+    def find(self, tokens: list[str], fingerprint: int) -> Optional[int]:
+        """같은 클러스터로 볼 대표 청크 번호 (없으면 None)"""
+        words = frozenset(tokens)
+        checked = set()
+        for band, buckets in enumerate(self._bands):
+            for rep_id in buckets.get((fingerprint >> (band * _BAND_BITS)) & _BAND_MASK, ()):
+                if rep_id in checked:
+                    continue
+                checked.add(rep_id)
+                rep_print, rep_words, _ = self._reps[rep_id]
+                if hamming(fingerprint, rep_print) <= self.max_hamming and jaccard(words, rep_words) >= self.min_jaccard:
+                    return rep_id
+        return None
+
+    def _add(self, tokens: list[str], fingerprint: int) -> int:
+        rep_id = len(self._reps)
+        self._reps.append((fingerprint, frozenset(tokens), []))
+        if not tokens:
+            return rep_id   # 토큰 없는 청크는 색인하지 않음 (빈 집합끼리 자카드 1.0으로 묶이지 않도록)
+        for band, buckets in enumerate(self._bands):
+            buckets.setdefault((fingerprint >> (band * _BAND_BITS)) & _BAND_MASK, []).append(rep_id)
+        return rep_id
+
+    def cluster(self, chunk: str) -> tuple[int, bool]:
+        """
+        청크 → (대표 청크 번호, 새 대표 여부)
+        새 대표면 호출자가 추출 후 set_terms로 결과를 채움 (배치 모드는 제출 전에 전부 배정)
+        """
+        self.stats["chunks"] += 1
+        tokens = tokenize(chunk)
+        fingerprint = simhash(tokens)
+        rep_id = self.find(tokens, fingerprint) if tokens else None
+        if rep_id is not None:
+            self.stats["reused"] += 1
+            return rep_id, False
+        self.stats["calls"] += 1
+        return self._add(tokens, fingerprint), True
+
+    def set_terms(self, rep_id: int, terms: list[dict]) -> None:
+        fingerprint, words, _ = self._reps[rep_id]
+        self._reps[rep_id] = (fingerprint, words, copy.deepcopy(terms))
+
+    def terms_for(self, rep_id: int) -> list[dict]:
+        """대표 청크의 추출 결과 복사본 (호출자가 수정해도 캐시에 영향 없음)"""
+        return copy.deepcopy(self._reps[rep_id][2])
+
+    def print_stats(self, prefix: str = "    ") -> None:
+        chunks, reused = self.stats["chunks"], self.stats["reused"]
+        if not chunks:
+            return
+        print(
+            f"{prefix}유사 중복 억제: 청크 {chunks}개 → LLM 추출 대상 {self.stats['calls']}개 "
+            f"(절약 {reused}개, {reused / chunks:.0%}), 클러스터 {len(self._reps)}개, "
+            f"상용구 줄 분리 {self.stats['boilerplate_lines']}개"
+        )
@@ -0,0 +1,176 @@
+"""
+파이프라인 단계 스케줄러 (main.py에서 사용)
+- 단계 = 이름 + 함수 + 선행 단계 목록 → DAG
+- 선행 단계가 모두 끝난 단계부터 스레드 풀에서 동시 실행
+  (크롤러끼리는 서로 독립, 소스별 분류는 해당 크롤러가 끝나는 즉시 시작)
+- 단계 함수는 선행 단계 결과 dict(이름 → 반환값)를 인자로 받음
+- 실패한 단계의 후속 단계는 건너뜀 (나머지 단계는 계속 진행)
+- 단계별 시작/소요 시간 + 임계 경로(critical path) 리포트
+"""
+
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+DEFAULT_MAX_PARALLEL = 4
+
+
+class Step:
+    """파이프라인 단계 하나"""
+
+    def __init__(self, name: str, func: Callable[[dict], object], deps: Optional[list[str]] = None):
+        self.name = name
+        self.func = func
+        self.deps = list(deps or [])
+        self.status = "pending"      # pending | running | done | failed | skipped
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class Pipeline:
+    """
+    단계 DAG 실행기
+        pipe = Pipeline()
+        pipe.add("crawl:weverse", lambda r: crawl_weverse(...))
+        pipe.add("extract:weverse", lambda r: extract_weverse_terms(...), deps=["crawl:weverse"])
+        pipe.run(max_parallel=4)
+        pipe.print_report()
+    """
+
+    def __init__(self):
+        self.steps: dict[str, Step] = {}
+        self._t0: Optional[float] = None
+        self._t1: Optional[float] = None
+
+    def add(self, name: str, func: Callable[[dict], object], deps: Optional[list[str]] = None) -> Step:
+        if name in self.steps:
+            raise ValueError(f"중복 단계: {name}")
+        step = Step(name, func, deps)
+        self.steps[name] = step
+        return step
+
+    def result(self, name: str, default=None):
+        step = self.steps.get(name)
+        return step.result if step and step.status == "done" else default
+
+    @property
+    def failed(self) -> list[Step]:
+        return [s for s in self.steps.values() if s.status == "failed"]
+
+    def _validate(self) -> None:
+        """미등록 선행 단계 / 순환 검사"""
+        for step in self.steps.values():
+            for dep in step.deps:
+                if dep not in self.steps:
+                    raise ValueError(f"{step.name}: 알 수 없는 선행 단계 {dep}")
+        visiting, visited = set(), set()
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"순환 의존: {name}")
+            visiting.add(name)
+            for dep in self.steps[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+    def _run_step(self, step: Step) -> None:
+        inputs = {dep: self.steps[dep].result for dep in step.deps}
+        step.started = time.monotonic()
+        status = "failed"
+        try:
+            step.result = step.func(inputs)
+            status = "done"
+        except Exception as e:
+            step.error = e
+            print(f"[pipeline] ✗ {step.name} 실패: {e}")
+            traceback.print_exc()
+        finally:
+            step.finished = time.monotonic()
+            # 상태는 마지막에 갱신 (스케줄러가 보는 시점에 결과/시간이 모두 채워져 있도록)
+            step.status = status
+
+    def _schedule(self, pool: ThreadPoolExecutor, running: dict, limit: int) -> None:
+        """실행 가능한 단계 제출 + 선행 실패 단계 건너뜀 표시 (연쇄 건너뜀까지 반복)"""
+        changed = True
+        while changed:
+            changed = False
+            for step in self.steps.values():
+                if step.status != "pending":
+                    continue
+                dep_status = [self.steps[d].status for d in step.deps]
+                if any(st in ("failed", "skipped") for st in dep_status):
+                    step.status = "skipped"
+                    changed = True
+                    print(f"[pipeline] - {step.name} 건너뜀 (선행 단계 실패)")
+                elif all(st == "done" for st in dep_status) and len(running) < limit:
+                    step.status = "running"
+                    print(f"[pipeline] ▶ {step.name} 시작")
+                    running[pool.submit(self._run_step, step)] = step
+
+    def run(self, max_parallel: int = DEFAULT_MAX_PARALLEL) -> None:
+        """준비된 단계부터 동시 실행 (max_parallel=1이면 등록 순서대로 직렬 실행)"""
+        self._validate()
+        self._t0 = time.monotonic()
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="step") as pool:
+            while True:
+                self._schedule(pool, running, max(1, max_parallel))
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    step = running.pop(fut)
+                    if step.status == "done":
+                        print(f"[pipeline] ✔ {step.name} 완료 ({step.duration:.1f}초)")
+        self._t1 = time.monotonic()
+
+    def critical_path(self) -> list[Step]:
+        """
+        임계 경로: 가장 늦게 끝난 단계에서 시작해
+        매번 가장 늦게 끝난 선행 단계를 따라 역추적
+        """
+        finished = [s for s in self.steps.values() if s.finished is not None]
+        if not finished:
+            return []
+        step = max(finished, key=lambda s: s.finished)
+        path = [step]
+        while True:
+            deps = [self.steps[d] for d in step.deps if self.steps[d].finished is not None]
+            if not deps:
+                break
+            step = max(deps, key=lambda s: s.finished)
+            path.append(step)
+        return list(reversed(path))
+
+    def print_report(self) -> None:
+        if self._t0 is None:
+            return
+        wall = (self._t1 or time.monotonic()) - self._t0
+        total = sum(s.duration for s in self.steps.values())
+        print("\n  단계별 소요 시간:")
+        for step in sorted(self.steps.values(), key=lambda s: (s.started is None, s.started or 0)):
+            if step.started is None:
+                print(f"    - {step.name:<18} {step.status}")
+                continue
+            offset = step.started - self._t0
+            print(f"    - {step.name:<18} +{offset:6.1f}초 시작, {step.duration:6.1f}초 ({step.status})")
+        path = self.critical_path()
+        if path:
+            path_time = path[-1].finished - path[0].started
+            print(f"  임계 경로: {' → '.join(s.name for s in path)} ({path_time:.1f}초)")
+        print(f"  전체 {wall:.1f}초 (단계 합계 {total:.1f}초, 병렬 이득 {max(0.0, total - wall):.1f}초)")
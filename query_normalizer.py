@@ -0,0 +1,531 @@
+"""
+팬덤 사전 기반 검색어 정규화 (classified.jsonl → 컴파일된 트라이 → 표준어 재작성)
+- 컴파일: 각 항목의 원본 용어/표준어(KO)/표준어(EN)를 정규화 키(merge_engine.normalize_term)로
+  접어 문자 트라이에 넣고, 불변 바이너리 파일로 저장 (기본: data/raw/query_trie.bin)
+- 조회: 파일을 mmap으로 열어 그대로 탐색 (로드 시 파싱/복사 없음, 여러 프로세스가 페이지 공유)
+- 재작성: 최장 일치 분할
+  · 공백으로 나뉜 토큰 경계에서만 매칭 시작/종료 (pob ≠ po + b)
+  · 한글 음절 사이는 토큰 안에서도 분할 허용 ("정국포카" → 정국 + 포카)
+  · 사전에 없는 부분은 정규화된 형태 그대로 유지
+
+    python query_normalizer.py compile [data/raw/classified.jsonl] [-o data/raw/query_trie.bin]
+    python query_normalizer.py rewrite "정국 럭드 pob"
+    python query_normalizer.py batch queries.txt -o rewritten.tsv [--workers 4]   # "-" = stdin/stdout
+    python query_normalizer.py bench [queries.txt] [-n 100000]                     # p50/p99 지연
+
+파일 형식 (리틀 엔디언 u32 배열, 모든 구역 4바이트 정렬):
+  헤더     magic "FDQN", 버전, 노드 수, 간선 수, 값 수, 문자열 바이트 수
+  노드     first_edge[노드], edge_count[노드], value[노드] (0 = 없음, 그 외 값 번호 + 1)
+  간선     char[간선] (노드별 오름차순), child[간선]
+  값       (ko_off, ko_len, en_off, en_len)[값]
+  문자열   UTF-8 바이트열
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import dataset
+from merge_engine import normalize_term
+
+DEFAULT_TRIE_PATH = "data/raw/query_trie.bin"
+MAGIC = b"FDQN"
+VERSION = 1
+_HEADER = struct.Struct("<4sIIIII")
+REWRITE_CACHE_SIZE = 1 << 18      # 같은 검색어 반복 (로그에서 흔함) 재작성 결과 LRU 캐시
+TOKEN_CACHE_SIZE = 1 << 16        # 토큰 정규화 결과 캐시
+BATCH_CHUNK = 5_000               # 배치 모드 작업 단위 (줄 수)
+
+# 같은 키에 여러 표준어가 걸릴 때 우선순위
+_CONF_RANK = {"verified": 4, "high": 3, "medium": 2, "low": 1}
+
+
+def _is_hangul(ch: str) -> bool:
+    return "가" <= ch <= "힣"
+
+
+# ── 컴파일 ──────────────────────────────────────────────
+def collect_surface_forms(entries: Iterable[dict]) -> dict[str, tuple[str, str]]:
+    """
+    정규화 키 → (표준어KO, 표준어EN)
+    키 하나에 표준어가 여러 개면: 확신도 최고 → 등장 횟수 → 먼저 나온 순
+    """
+    votes: dict[str, dict[tuple[str, str], list]] = defaultdict(dict)
+    for order, e in enumerate(entries):
+        std_ko = (e.get("standard_ko") or "").strip()
+        std_en = (e.get("standard_en") or "").strip()
+        if not std_ko and not std_en:
+            continue
+        value = (std_ko or std_en, std_en or std_ko)
+        rank = _CONF_RANK.get(e.get("confidence") or "", 0)
+        for surface in (e.get("original_term"), std_ko, std_en):
+            key = normalize_term(surface or "")
+            if not key:
+                continue
+            vote = votes[key].get(value)
+            if vote is None:
+                votes[key][value] = [rank, 1, -order]
+            else:
+                vote[0] = max(vote[0], rank)
+                vote[1] += 1
+    return {key: max(cands.items(), key=lambda kv: kv[1])[0] for key, cands in votes.items()}
+
+
+def compile_trie(forms: dict[str, tuple[str, str]], output_path: str = DEFAULT_TRIE_PATH) -> dict:
+    """키 → 값 사전을 트라이 파일로 저장 (임시 파일 → 원자적 교체). Returns: 크기 통계"""
+    root: dict = {}
+    for key, value in forms.items():
+        node = root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[""] = value          # "" = 값 표시 (문자 간선과 겹치지 않음)
+
+    # 너비 우선으로 번호 매김 → 각 노드의 간선이 연속 구간
+    node_first, node_count, node_value = array("I"), array("I"), array("I")
+    edge_char, edge_child = array("I"), array("I")
+    value_ids: dict[tuple[str, str], int] = {}
+    values = array("I")
+    strings = bytearray()
+    string_offsets: dict[str, tuple[int, int]] = {}
+
+    def intern(text: str) -> tuple[int, int]:
+        if text not in string_offsets:
+            raw = text.encode("utf-8")
+            string_offsets[text] = (len(strings), len(raw))
+            strings.extend(raw)
+        return string_offsets[text]
+
+    queue = [root]
+    next_id = 1
+    for node in queue:          # queue가 늘어나는 동안 계속 순회
+        value = node.get("")
+        if value is not None:
+            if value not in value_ids:
+                value_ids[value] = len(value_ids)
+                values.extend((*intern(value[0]), *intern(value[1])))
+            node_value.append(value_ids[value] + 1)
+        else:
+            node_value.append(0)
+        chars = sorted(ch for ch in node if ch)
+        node_first.append(len(edge_char))
+        node_count.append(len(chars))
+        for ch in chars:
+            edge_char.append(ord(ch))
+            edge_child.append(next_id)
+            next_id += 1
+            queue.append(node[ch])
+
+    while len(strings) % 4:
+        strings.append(0)
+    sections = (node_first, node_count, node_value, edge_char, edge_child, values)
+    if sys.byteorder != "little":
+        for arr in sections:
+            arr.byteswap()
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp = f"{output_path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(node_first), len(edge_char), len(value_ids), len(strings)))
+        for arr in sections:
+            f.write(arr.tobytes())
+        f.write(strings)
+    os.replace(tmp, output_path)
+    return {
+        "keys": len(forms),
+        "nodes": len(node_first),
+        "values": len(value_ids),
+        "bytes": os.path.getsize(output_path),
+    }
+
+
+def compile_dictionary(
+    classified_path: str = "data/raw/classified.jsonl",
+    output_path: str = DEFAULT_TRIE_PATH,
+) -> dict:
+    """분류 결과 → 검색어 정규화 트라이 파일"""
+    forms = collect_surface_forms(dataset.iter_records(classified_path))
+    stats = compile_trie(forms, output_path)
+    print(f"[query_normalizer] 컴파일: 키 {stats['keys']}개, 노드 {stats['nodes']}개, "
+          f"표준어 {stats['values']}개 → {output_path} ({stats['bytes'] / 1024:.1f}KB)")
+    return stats
+
+
+# ── 조회 ────────────────────────────────────────────────
+class QueryNormalizer:
+    """
+    컴파일된 트라이 파일(mmap) 기반 검색어 재작성기
+        qn = QueryNormalizer.open("data/raw/query_trie.bin")
+        qn.rewrite("정국 럭드 pob")  # {"ko": "...", "en": "...", "segments": [...]}
+    """
+
+    def __init__(self, path: str, cache_size: int = REWRITE_CACHE_SIZE, typos=None):
+        self.path = path
+        self.typos = typos  # typo_index.TypoIndex (있으면 사전에 없는 구간을 오타 교정)
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_nodes, n_edges, n_values, n_strings = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"검색어 트라이 파일 형식이 아님 (다시 컴파일 필요): {path}")
+
+        offset = _HEADER.size
+        views = []
+        for count in (n_nodes, n_nodes, n_nodes, n_edges, n_edges, n_values * 4):
+            views.append(self._section(offset, count))
+            offset += count * 4
+        (self._node_first, self._node_count, self._node_value,
+         self._edge_char, self._edge_child, self._values) = views
+        self._strings = memoryview(self._mm)[offset:offset + n_strings]
+        self.n_nodes, self.n_values = n_nodes, n_values
+        self._decoded: dict[int, tuple[str, str]] = {}
+        self._normalize = lru_cache(maxsize=TOKEN_CACHE_SIZE)(normalize_term)
+        if cache_size:
+            self.rewrite = lru_cache(maxsize=cache_size)(self.rewrite)
+
+    @classmethod
+    def open(
+        cls,
+        path: str = DEFAULT_TRIE_PATH,
+        classified_path: Optional[str] = None,
+        typo_index_path: Optional[str] = None,
+    ) -> "QueryNormalizer":
+        """트라이 파일 열기 (없거나 분류 결과보다 오래됐으면 먼저 컴파일, 오타 인덱스는 선택)"""
+        source = dataset.resolve_path(classified_path) if classified_path else None
+        if source and (not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source)):
+            compile_dictionary(classified_path, path)
+        return cls(path, typos=_load_typos(typo_index_path))
+
+    def _section(self, offset: int, count: int):
+        raw = memoryview(self._mm)[offset:offset + count * 4]
+        if sys.byteorder == "little":
+            return raw.cast("I")
+        arr = array("I", raw.tobytes())     # 빅 엔디언 플랫폼: 복사 후 바이트 순서 변환
+        arr.byteswap()
+        return arr
+
+    def close(self) -> None:
+        for name in ("_node_first", "_node_count", "_node_value", "_edge_char", "_edge_child", "_values", "_strings"):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        if getattr(self, "_file", None) is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def value(self, value_id: int) -> tuple[str, str]:
+        """값 번호 → (표준어KO, 표준어EN)"""
+        cached = self._decoded.get(value_id)
+        if cached is None:
+            v = self._values
+            i = value_id * 4
+            ko = bytes(self._strings[v[i]:v[i] + v[i + 1]]).decode("utf-8")
+            en = bytes(self._strings[v[i + 2]:v[i + 2] + v[i + 3]]).decode("utf-8")
+            cached = self._decoded[value_id] = (ko, en)
+        return cached
+
+    def lookup(self, term: str) -> Optional[tuple[str, str]]:
+        """용어 하나 정확 조회 (정규화 키 기준)"""
+        node = self._walk(normalize_term(term))
+        if node is None or not self._node_value[node]:
+            return None
+        return self.value(self._node_value[node] - 1)
+
+    def _walk(self, key: str) -> Optional[int]:
+        node = 0
+        for ch in key:
+            lo = self._node_first[node]
+            hi = lo + self._node_count[node]
+            k = bisect_left(self._edge_char, ord(ch), lo, hi)
+            if k == hi or self._edge_char[k] != ord(ch):
+                return None
+            node = self._edge_child[k]
+        return node
+
+    def _longest(self, text: str, start: int, splittable) -> Optional[tuple[int, int]]:
+        """start부터 분할 가능한 위치에서 끝나는 최장 일치 → (끝 위치, 값 번호)"""
+        first, count, value = self._node_first, self._node_count, self._node_value
+        chars, child = self._edge_char, self._edge_child
+        node, best = 0, None
+        for i in range(start, len(text)):
+            lo = first[node]
+            hi = lo + count[node]
+            c = ord(text[i])
+            k = bisect_left(chars, c, lo, hi)
+            if k == hi or chars[k] != c:
+                break
+            node = child[k]
+            if value[node] and splittable(i + 1):
+                best = (i + 1, value[node] - 1)
+        return best
+
+    def segment(self, query: str) -> list[dict]:
+        """
+        검색어 → 구간 목록 [{"text": 정규화 원문, "ko", "en", "space": 앞 공백 여부}]
+        사전에 없는 구간은 ko/en = None
+        """
+        normalize = self._normalize
+        tokens = [t for t in map(normalize, query.split()) if t]
+        text = "".join(tokens)
+        bounds, pos = set(), 0
+        for tok in tokens:
+            bounds.add(pos)
+            pos += len(tok)
+        bounds.add(pos)
+
+        def splittable(i: int) -> bool:
+            return i in bounds or (_is_hangul(text[i - 1]) and _is_hangul(text[i]))
+
+        segments: list[dict] = []
+        pending_start = None
+
+        def flush(end: int) -> None:
+            nonlocal pending_start
+            if pending_start is not None:
+                seg = {"text": text[pending_start:end], "ko": None, "en": None,
+                       "space": pending_start in bounds and pending_start > 0}
+                fix = self.typos.correct(seg["text"]) if self.typos else None
+                if fix:
+                    seg.update(ko=fix["standard_ko"], en=fix["standard_en"], typo=fix["term"])
+                segments.append(seg)
+                pending_start = None
+
+        i = 0
+        while i < len(text):
+            hit = self._longest(text, i, splittable)
+            if hit:
+                flush(i)
+                end, value_id = hit
+                ko, en = self.value(value_id)
+                segments.append({"text": text[i:end], "ko": ko, "en": en, "space": i in bounds and i > 0})
+                i = end
+                continue
+            if pending_start is None:
+                pending_start = i
+            # 다음 분할 가능 위치까지 건너뜀 (라틴 토큰은 통째로, 한글은 음절 단위)
+            i += 1
+            while i < len(text) and not splittable(i):
+                i += 1
+            if i in bounds:
+                flush(i)
+        flush(len(text))
+        return segments
+
+    def rewrite(self, query: str) -> dict:
+        """
+        검색어 → {"query", "ko", "en", "matched": 사전 일치 구간 수, "segments"}
+        (cache_size > 0이면 LRU 캐시 → 반환값을 수정하지 말 것)
+        """
+        segments = self.segment(query)
+        return {
+            "query": query,
+            "ko": _join(segments, "ko"),
+            "en": _join(segments, "en"),
+            "matched": sum(1 for s in segments if s["ko"] is not None),
+            "segments": segments,
+        }
+
+
+def _join(segments: list[dict], lang: str) -> str:
+    """구간 연결: 원래 공백 자리 + 사전 일치 구간 앞뒤에 공백 ("정국포카" → "정국 포토카드")"""
+    parts, prev_matched = [], False
+    for seg in segments:
+        matched = seg[lang] is not None
+        if parts and (seg["space"] or matched or prev_matched):
+            parts.append(" ")
+        parts.append(seg[lang] if matched else seg["text"])
+        prev_matched = matched
+    return "".join(parts)
+
+
+# ── 배치 / 벤치마크 ──────────────────────────────────────
+_worker: Optional[QueryNormalizer] = None
+
+
+def _load_typos(path: Optional[str]):
+    if not path:
+        return None
+    from typo_index import TypoIndex
+    typos = TypoIndex.load(path)
+    if typos is None:
+        print(f"[query_normalizer] 오타 인덱스 없음 → 교정 없이 진행: {path}")
+    return typos
+
+
+def _init_worker(path: str, typo_index_path: Optional[str] = None) -> None:
+    global _worker
+    _worker = QueryNormalizer(path, typos=_load_typos(typo_index_path))
+
+
+def _rewrite_chunk(lines: list[str]) -> list[str]:
+    out = []
+    for line in lines:
+        query = line.rstrip("\n")
+        r = _worker.rewrite(query)
+        out.append(f"{query}\t{r['ko']}\t{r['en']}\n")
+    return out
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterable[list[str]]:
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def rewrite_batch(
+    input_path: str,
+    output_path: str,
+    trie_path: str = DEFAULT_TRIE_PATH,
+    workers: int = 1,
+    typo_index_path: Optional[str] = None,
+) -> int:
+    """
+    검색어 파일(한 줄 = 검색어) → TSV (검색어, 표준어KO 재작성, 표준어EN 재작성)
+    workers > 1이면 프로세스 풀 (각 프로세스가 같은 트라이 파일을 mmap → 메모리 공유)
+    Returns: 처리한 줄 수
+    """
+    src = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8")
+    dst = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    started = time.perf_counter()
+    count = 0
+    try:
+        if workers > 1:
+            from multiprocessing import Pool
+            with Pool(workers, initializer=_init_worker, initargs=(trie_path, typo_index_path)) as pool:
+                for out in pool.imap(_rewrite_chunk, _chunks(src, BATCH_CHUNK)):
+                    dst.writelines(out)
+                    count += len(out)
+        else:
+            _init_worker(trie_path, typo_index_path)
+            for chunk in _chunks(src, BATCH_CHUNK):
+                out = _rewrite_chunk(chunk)
+                dst.writelines(out)
+                count += len(out)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    elapsed = time.perf_counter() - started
+    print(f"[query_normalizer] 배치: {count:,}줄, {elapsed:.1f}초 ({count / max(elapsed, 1e-9) * 60:,.0f}줄/분)",
+          file=sys.stderr)
+    return count
+
+
+def sample_queries(qn: QueryNormalizer, n: int, seed: int = 7) -> list[str]:
+    """벤치마크용 합성 검색어: 사전 용어 1~4개 + 사전에 없는 토큰 섞기"""
+    rng = random.Random(seed)
+    terms = sorted({qn.value(i)[j] for i in range(qn.n_values) for j in (0, 1)})
+    noise = ["wts", "2024", "정국", "bts", "새상품", "급처", "ot7", "jk", "럭드", "pob"]
+    queries = []
+    for _ in range(n):
+        words = [rng.choice(terms) for _ in range(rng.randint(1, 3))]
+        words += rng.sample(noise, rng.randint(0, 2))
+        rng.shuffle(words)
+        queries.append(" ".join(words))
+    return queries
+
+
+def bench(trie_path: str = DEFAULT_TRIE_PATH, queries_path: Optional[str] = None, n: int = 100_000) -> dict:
+    """검색어당 재작성 지연 (캐시 없이) p50/p90/p99 + 처리량"""
+    started = time.perf_counter()
+    qn = QueryNormalizer(trie_path, cache_size=0)
+    open_ms = (time.perf_counter() - started) * 1000
+    if queries_path:
+        with open(queries_path, encoding="utf-8") as f:
+            queries = [line.rstrip("\n") for line in f][:n]
+    else:
+        queries = sample_queries(qn, n)
+
+    timings = []
+    clock = time.perf_counter_ns
+    for q in queries:
+        t0 = clock()
+        qn.rewrite(q)
+        timings.append(clock() - t0)
+    qn.close()
+    if not timings:
+        print("[query_normalizer] 벤치마크: 검색어 없음")
+        return {"queries": 0}
+    timings.sort()
+
+    def pct(p: float) -> float:
+        return timings[min(len(timings) - 1, int(len(timings) * p))] / 1000
+
+    total = sum(timings) / 1e9
+    stats = {
+        "queries": len(timings),
+        "open_ms": open_ms,
+        "p50_us": pct(0.50),
+        "p90_us": pct(0.90),
+        "p99_us": pct(0.99),
+        "per_min": len(timings) / total * 60 if total else 0.0,
+    }
+    print(f"[query_normalizer] 벤치마크: {stats['queries']:,}개 검색어, 열기 {open_ms:.2f}ms")
+    print(f"  p50 {stats['p50_us']:.1f}µs, p90 {stats['p90_us']:.1f}µs, p99 {stats['p99_us']:.1f}µs, "
+          f"단일 프로세스 {stats['per_min']:,.0f}건/분")
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="팬덤 사전 검색어 정규화")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("compile", help="classified.jsonl → 트라이 파일")
+    p.add_argument("classified", nargs="?", default="data/raw/classified.jsonl")
+    p.add_argument("-o", "--output", default=DEFAULT_TRIE_PATH)
+
+    p = sub.add_parser("rewrite", help="검색어 재작성")
+    p.add_argument("query", nargs="+")
+    p.add_argument("--trie", default=DEFAULT_TRIE_PATH)
+    p.add_argument("--typo-index", help="오타 교정 인덱스 (typo_index.py build 결과)")
+
+    p = sub.add_parser("batch", help="검색어 파일 일괄 재작성 (TSV 출력)")
+    p.add_argument("input")
+    p.add_argument("-o", "--output", default="-")
+    p.add_argument("--trie", default=DEFAULT_TRIE_PATH)
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--typo-index", help="오타 교정 인덱스 (typo_index.py build 결과)")
+
+    p = sub.add_parser("bench", help="재작성 지연 벤치마크")
+    p.add_argument("queries", nargs="?")
+    p.add_argument("-n", type=int, default=100_000)
+    p.add_argument("--trie", default=DEFAULT_TRIE_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == "compile":
+        compile_dictionary(args.classified, args.output)
+    elif args.command == "rewrite":
+        with QueryNormalizer(args.trie, typos=_load_typos(args.typo_index)) as qn:
+            r = qn.rewrite(" ".join(args.query))
+        print(f"  KO: {r['ko']}\n  EN: {r['en']}\n  일치 구간: {r['matched']}개")
+    elif args.command == "batch":
+        rewrite_batch(args.input, args.output, args.trie, args.workers, args.typo_index)
+    else:
+        bench(args.trie, args.queries, args.n)
+
+
+if __name__ == "__main__":
+    main()
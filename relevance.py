@@ -0,0 +1,172 @@
+"""
+LLM 추출 전 게시물 관련도 사전 점수 (classifier.process_reddit_posts / 스트리밍 추출 내부 사용)
+- 로컬 규칙만으로 "새 용어가 나올 만한" 게시물을 점수화 → 상위 게시물만 Claude로,
+  나머지는 시드 사전 규칙 기반 추출로 처리
+- 점수 = 예상 신규 용어 수 × 관련도
+  · 예상 신규 용어: 시드 사전에 없는 대문자 약어(가중 3) / 한글 토큰(2) / 짧은 소문자 토큰(1)
+  · 관련도: K-pop 그룹·멤버 언급 + 시드 용어 적중 수 (상한 있음), 거래글 가산
+- 실행당 토큰 예산: 게시물별 예상 토큰(프롬프트 + 본문 + 응답)을 점수 순으로 채움
+  (배치는 전체 순위, 스트리밍은 도착 순서대로 MIN_LLM_SCORE 이상만 예산 안에서 허용)
+
+    router = LLMRouter(RelevanceScorer(seed_lookup), token_budget=300_000)
+    use_llm = router.plan([(text, is_trade), ...])   # 게시물별 True/False
+"""
+
+import re
+from collections import Counter
+from typing import Optional
+
+from text_features import estimate_tokens
+
+DEFAULT_TOKEN_BUDGET = 300_000   # 실행당 Reddit 추출 LLM 토큰 예산 (입력 + 응답 추정치)
+MIN_LLM_SCORE = 2.0              # 이 점수 미만은 예산이 남아도 규칙 기반
+EXPECTED_OUTPUT_TOKENS = 400     # 청크당 응답 토큰 추정치
+
+W_ABBREV = 3.0
+W_HANGUL = 2.0
+W_SHORT = 1.0
+RELEVANCE_WEIGHT = 0.25          # 엔티티/시드 적중 하나당 관련도 가산
+RELEVANCE_CAP = 8
+TRADE_BOOST = 1.5
+
+# 엔티티 사전 (시드의 group/member 값에 더해 항상 인식)
+KPOP_ENTITIES = {
+    "bts", "방탄", "방탄소년단", "bangtan", "army", "rm", "jin", "suga", "jhope", "j-hope", "jimin",
+    "taehyung", "jungkook", "jk", "진", "슈가", "제이홉", "지민", "뷔", "정국", "남준", "윤기", "호석", "태형",
+    "blackpink", "newjeans", "aespa", "lesserafim", "seventeen", "svt", "straykids", "skz",
+    "enhypen", "txt", "nct", "ateez", "twice", "itzy", "exo", "got7", "monstax", "taeyeon",
+    "weverse", "위버스", "ktown4u", "aladin", "soundwave",
+}
+
+# 짧은 소문자 토큰 중 신규 용어 후보에서 뺄 일반 영어 단어
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "for", "from", "had", "has",
+    "have", "he", "her", "his", "how", "i", "if", "in", "is", "it", "its", "just", "me", "my", "no",
+    "not", "of", "on", "or", "our", "out", "so", "she", "that", "the", "them", "then", "they", "this",
+    "to", "up", "us", "was", "we", "what", "when", "who", "why", "will", "with", "you", "your", "all",
+    "any", "also", "been", "did", "does", "dont", "get", "got", "one", "only", "some", "than", "there",
+    "very", "want", "were", "would", "know", "like", "need", "new", "now", "see", "still", "buy", "sell",
+    "each", "more", "much", "ship", "pics", "free", "both", "else", "here", "into", "look",
+    "made", "make", "many", "most", "over", "said", "same", "thank", "thanks", "well", "back", "good",
+    "hi", "hey", "am", "im", "ive", "oh", "ok", "okay", "yes", "pls", "please", "lol", "dm", "etc",
+    "which", "where", "about", "after", "again", "could", "should", "other", "their", "these", "those",
+    "off", "too", "own", "way", "time", "day", "year", "let", "find", "help", "anyone", "someone",
+}
+
+_TOKEN_RE = re.compile(r"[A-Za-z가-힣0-9&\-]+")
+_ABBREV_RE = re.compile(r"^[A-Z]{2,6}$")
+_HANGUL_RE = re.compile(r"[가-힣]")
+
+
+class RelevanceScorer:
+    """시드 사전 기준 게시물 점수 계산기"""
+
+    def __init__(self, seed_lookup: Optional[dict] = None):
+        self.known = set(seed_lookup or {})
+        self.entities = set(KPOP_ENTITIES)
+        for entry in (seed_lookup or {}).values():
+            for field in ("group", "member"):
+                if entry.get(field):
+                    self.entities.add(entry[field].lower())
+
+    def score(self, text: str, is_trade: bool = False) -> dict:
+        """
+        텍스트 → {"score", "novel_abbrev", "novel_hangul", "novel_short", "entity_hits", "known_hits",
+                  "abbrev_density"}
+        """
+        tokens = _TOKEN_RE.findall(text)
+        novel = Counter()
+        seen = set()
+        entity_hits = known_hits = abbrevs = 0
+        for token in tokens:
+            key = token.lower()
+            if _ABBREV_RE.match(token):
+                abbrevs += 1
+            if key in seen:
+                continue
+            seen.add(key)
+            if key in self.entities:
+                entity_hits += 1
+            elif key in self.known:
+                known_hits += 1
+            elif _ABBREV_RE.match(token) and key not in STOPWORDS:
+                novel["abbrev"] += 1
+            elif _HANGUL_RE.search(token):
+                novel["hangul"] += 1
+            elif 2 <= len(token) <= 5 and token.islower() and key not in STOPWORDS:
+                novel["short"] += 1
+
+        expected = W_ABBREV * novel["abbrev"] + W_HANGUL * novel["hangul"] + W_SHORT * novel["short"]
+        relevance = 1 + RELEVANCE_WEIGHT * min(entity_hits + known_hits, RELEVANCE_CAP)
+        score = expected * relevance * (TRADE_BOOST if is_trade else 1.0)
+        return {
+            "score": round(score, 2),
+            "novel_abbrev": novel["abbrev"],
+            "novel_hangul": novel["hangul"],
+            "novel_short": novel["short"],
+            "entity_hits": entity_hits,
+            "known_hits": known_hits,
+            "abbrev_density": abbrevs / len(tokens) if tokens else 0.0,
+        }
+
+
+class LLMRouter:
+    """
+    토큰 예산 안에서 LLM으로 보낼 게시물 선택
+    cost_fn(text) → 예상 토큰 (classifier가 청크 수 × 프롬프트 크기를 반영해 전달)
+    """
+
+    def __init__(
+        self,
+        scorer: RelevanceScorer,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        cost_fn=estimate_tokens,
+        min_score: float = MIN_LLM_SCORE,
+    ):
+        self.scorer = scorer
+        self.token_budget = token_budget
+        self.cost_fn = cost_fn
+        self.min_score = min_score
+        self.spent = 0
+        self.stats = Counter()
+
+    def _charge(self, cost: int) -> bool:
+        if self.spent + cost > self.token_budget:
+            return False
+        self.spent += cost
+        return True
+
+    def plan(self, items: list[tuple[str, bool]]) -> list[bool]:
+        """배치: (텍스트, 거래글 여부) 목록 → 게시물별 LLM 사용 여부 (점수 높은 순으로 예산 채움)"""
+        scored = [(self.scorer.score(text, trade)["score"], i, text) for i, (text, trade) in enumerate(items)]
+        selected = [False] * len(items)
+        for score, i, text in sorted(scored, key=lambda s: (-s[0], s[1])):
+            if score < self.min_score:
+                self.stats["low_score"] += 1
+            elif self._charge(self.cost_fn(text)):
+                selected[i] = True
+                self.stats["llm"] += 1
+            else:
+                self.stats["over_budget"] += 1
+        return selected
+
+    def admit(self, text: str, is_trade: bool = False) -> bool:
+        """스트리밍: 도착한 게시물 하나를 LLM으로 보낼지 (점수 기준 + 남은 예산)"""
+        if self.scorer.score(text, is_trade)["score"] < self.min_score:
+            self.stats["low_score"] += 1
+            return False
+        if not self._charge(self.cost_fn(text)):
+            self.stats["over_budget"] += 1
+            return False
+        self.stats["llm"] += 1
+        return True
+
+    def print_stats(self, prefix: str = "    ") -> None:
+        total = self.stats["llm"] + self.stats["low_score"] + self.stats["over_budget"]
+        if not total:
+            return
+        print(
+            f"{prefix}관련도 필터: {total}개 중 LLM {self.stats['llm']}개 / 규칙 기반 "
+            f"{self.stats['low_score'] + self.stats['over_budget']}개 (저점수 {self.stats['low_score']}, "
+            f"예산 초과 {self.stats['over_budget']}), 예상 토큰 {self.spent:,}/{self.token_budget:,}"
+        )
@@ -0,0 +1,439 @@
+"""
+구글 시트 차분 동기화 (sheets_uploader.upload_grouped_to_sheet 내부 구현)
+- 로컬 미러: 시트 각 행의 값 + 내용 해시를 JSON으로 보관 (기본: data/raw/sheet_mirror.json)
+  → 매 실행마다 get_all_values()로 시트 전체를 읽지 않음 (미러가 없거나 resync=True일 때만 1회 읽기)
+- 차분: 표준어 그룹 vs 미러
+  · 기존 행: 갱신 대상 컬럼(원본 용어/동의어/확신도) 중 값이 바뀐 셀만, 행 해시가 같으면 건너뜀
+  · 신규 행: 미러의 다음 빈 행부터 연속 범위로 기록
+    기록 전에 시트의 식별 컬럼 마지막 행을 한 번 읽어(last_key_row) 미러와 다르면
+    (사람이 행을 추가/삭제한 경우) 시트를 다시 읽어 차분을 새로 계산 → 직접 추가한 행을 덮어쓰지 않음
+- 헤더 변경 + 셀 갱신 + 신규 행을 values.batchUpdate로 전송 (sheets_writer: 한도/재시도/저널)
+  변경이 배치 상한(기본 10,000셀)보다 작으면 요청 한 번
+- 미러에는 전송이 확인된 작업만 반영 (저널에 남은/격리된 작업은 제외)
+  → 저널이 남아 있으면 다음 실행에서 차분보다 먼저 보내고, 보낸 뒤에는 시트를 다시 읽어 미러 구성
+- 메모리 백엔드: FakeSpreadsheet / FakeWorksheet (gspread에서 사용하는 메서드만 구현)
+    python sheets_sync.py [classified.jsonl]   # 가짜 시트 동기화 (429/503 주입, 저널 재전송 포함)
+"""
+
+import hashlib
+import json
+import os
+import sys
+from datetime import date
+from typing import Optional
+
+from sheets_writer import SheetWriteScheduler, a1_range, col_index, col_letter, parse_a1
+
+# 행 식별 컬럼 (0-based): 표준어(KO), 표준어(EN)
+KEY_COLS = (0, 1)
+
+MIRROR_VERSION = 1
+
+
+def row_hash(values: list) -> str:
+    """행 내용 해시 (셀 구분자 U+001F)"""
+    joined = "\x1f".join("" if v is None else str(v) for v in values)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def row_key(values: list) -> str:
+    """미러 키: 식별 컬럼 값 (앞뒤 공백 제거)"""
+    return "\x1f".join(str(values[c]).strip() if c < len(values) else "" for c in KEY_COLS)
+
+
+class SheetMirror:
+    """시트 내용 로컬 사본: {키: {"row", "values", "hash"}} + 다음 빈 행 번호"""
+
+    def __init__(self, sheet_key: str, header: Optional[list] = None):
+        self.sheet_key = sheet_key
+        self.header = header or []
+        self.rows: dict[str, dict] = {}
+        self.next_row = 2
+
+    @classmethod
+    def from_values(cls, sheet_key: str, all_values: list[list]) -> "SheetMirror":
+        """get_all_values() 결과로 미러 구성 (헤더 = 1행)"""
+        mirror = cls(sheet_key, list(all_values[0]) if all_values else [])
+        for i, row in enumerate(all_values[1:], start=2):
+            if row and len(row) > max(KEY_COLS) and any(row[c].strip() for c in KEY_COLS):
+                mirror.rows.setdefault(row_key(row), {"row": i, "values": list(row), "hash": row_hash(row)})
+        mirror.next_row = max(2, len(all_values) + 1)
+        return mirror
+
+    @classmethod
+    def load(cls, path: str, sheet_key: str) -> Optional["SheetMirror"]:
+        """미러 파일 로드 (없거나, 다른 시트의 미러거나, 형식이 다르면 None)"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("version") != MIRROR_VERSION or data.get("sheet_key") != sheet_key:
+            return None
+        mirror = cls(sheet_key, data.get("header"))
+        mirror.rows = data.get("rows", {})
+        mirror.next_row = data.get("next_row", 2)
+        return mirror
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MIRROR_VERSION,
+                    "sheet_key": self.sheet_key,
+                    "header": self.header,
+                    "next_row": self.next_row,
+                    "rows": self.rows,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp, path)
+
+
+def compute_diff(mirror: SheetMirror, rows: list[list], header: list, update_cols: tuple) -> dict:
+    """
+    희망 행 목록(시트 행 형식) vs 미러 → 변경 내역
+    - 기존 행은 update_cols 컬럼만 비교/갱신 (나머지 컬럼은 시트 값 유지)
+    Returns: {"header": bool, "updates": [(행, 시작 컬럼, [값...], 키, 갱신 후 행)], "appends": [[...]],
+              "added", "updated", "unchanged", "cells"}
+    """
+    seen_new = set()
+    diff = {"header": mirror.header != header, "updates": [], "appends": [],
+            "added": 0, "updated": 0, "unchanged": 0, "cells": 0}
+    if diff["header"]:
+        diff["cells"] += len(header)
+
+    for desired in rows:
+        key = row_key(desired)
+        current = mirror.rows.get(key)
+        if current is None:
+            # 같은 실행 안에서 키가 반복되면 첫 행만 추가
+            if key not in seen_new:
+                seen_new.add(key)
+                diff["appends"].append(desired)
+                diff["added"] += 1
+                diff["cells"] += len(desired)
+            continue
+
+        old = list(current["values"]) + [""] * max(0, len(desired) - len(current["values"]))
+        merged = list(old)
+        for col in update_cols:
+            merged[col] = desired[col]
+        if row_hash(merged) == current["hash"]:
+            diff["unchanged"] += 1
+            continue
+        changed = [c for c in update_cols if merged[c] != old[c]]
+        if not changed:
+            # 행 길이만 다른 경우 (빈 꼬리 셀) → 미러만 맞춤
+            current["values"], current["hash"] = merged, row_hash(merged)
+            diff["unchanged"] += 1
+            continue
+        # 바뀐 셀을 포함하는 최소 연속 구간 하나로 기록 (중간의 변경 없는 셀은 같은 값으로 덮어씀)
+        start, end = min(changed), max(changed)
+        diff["updates"].append((current["row"], start, merged[start:end + 1], key, merged))
+        diff["updated"] += 1
+        diff["cells"] += end - start + 1
+    return diff
+
+
+def build_write_ops(title: str, diff: dict, header: list, first_new_row: int) -> list[dict]:
+    """변경 내역 → values.batchUpdate 범위 목록 ({"range", "values"})"""
+    data = []
+    if diff["header"]:
+        data.append({"range": a1_range(title, 1, 0, len(header) - 1), "values": [header]})
+    for row, start, values, _key, _merged in diff["updates"]:
+        data.append({"range": a1_range(title, row, start, start + len(values) - 1), "values": [values]})
+    if diff["appends"]:
+        width = max(len(r) for r in diff["appends"])
+        last = first_new_row + len(diff["appends"]) - 1
+        data.append({
+            "range": a1_range(title, first_new_row, 0, width - 1, last),
+            "values": diff["appends"],
+        })
+    return data
+
+
+def apply_diff_to_mirror(
+    mirror: SheetMirror, diff: dict, header: list, title: str, first_new_row: int, acked: list[dict]
+) -> None:
+    """전송이 확인된 작업(acked, SheetWriteScheduler.acked)만 미러에 반영"""
+    acked_ranges = {item["range"] for item in acked}
+    acked_rows = set()
+    for item in acked:
+        _title, row, _col = parse_a1(item["range"])
+        acked_rows.update(range(row, row + len(item["values"])))
+
+    if not diff["header"] or a1_range(title, 1, 0, len(header) - 1) in acked_ranges:
+        mirror.header = list(header)
+    for row, start, values, key, merged in diff["updates"]:
+        if a1_range(title, row, start, start + len(values) - 1) in acked_ranges:
+            mirror.rows[key]["values"] = merged
+            mirror.rows[key]["hash"] = row_hash(merged)
+    for i, values in enumerate(diff["appends"]):
+        row = first_new_row + i
+        if row not in acked_rows:
+            break   # 신규 행은 앞에서부터 순서대로 전송됨 → 첫 미전송 행 이후는 모두 미전송
+        mirror.rows[row_key(values)] = {"row": row, "values": values, "hash": row_hash(values)}
+        mirror.next_row = row + 1
+
+
+def last_key_row(worksheet) -> int:
+    """식별 컬럼(KEY_COLS)에 값이 있는 마지막 행 번호 (헤더만 있으면 1, 빈 시트면 0) — 읽기 요청 1회"""
+    values = worksheet.get(f"{col_letter(min(KEY_COLS))}:{col_letter(max(KEY_COLS))}")
+    return len(values)
+
+
+def sheet_key_of(worksheet) -> str:
+    """미러가 어느 시트의 사본인지 식별 (스프레드시트 ID + 워크시트 ID)"""
+    return f"{worksheet.spreadsheet.id}:{worksheet.id}"
+
+
+def sync_rows(
+    worksheet,
+    rows: list[list],
+    header: list,
+    update_cols: tuple,
+    mirror_path: Optional[str] = None,
+    journal_path: Optional[str] = None,
+    resync: bool = False,
+    writer: Optional[SheetWriteScheduler] = None,
+) -> dict:
+    """
+    시트 행 목록을 워크시트에 차분 동기화
+    - 행 식별: KEY_COLS, 기존 행은 update_cols 컬럼만 갱신
+    - mirror_path가 없으면 매번 시트를 읽어 미러 구성 (저장 안 함)
+    - journal_path: 못 보낸 쓰기 작업 보존 파일 → 다음 실행에서 차분보다 먼저 재전송
+      미러는 전송이 확인된 작업만 반영한 상태 (재전송에 성공하면 시트를 다시 읽음,
+      재전송이 또 재시도 소진으로 끝나면 차분 없이 반환)
+    - resync=True면 미러와 저널을 버리고 시트에서 다시 읽음 (시트를 사람이 직접 고친 경우)
+    Returns: {"added", "updated", "unchanged", "cells", "api_calls", "read", "pending", "writer"}
+    """
+    sheet_key = sheet_key_of(worksheet)
+    writer = writer or SheetWriteScheduler(worksheet.spreadsheet, sheet_key, journal_path=journal_path)
+    if resync:
+        writer.discard_journal()
+    else:
+        writer.load_journal()
+
+    mirror = None if resync else SheetMirror.load(mirror_path, sheet_key)
+    api_calls = 0
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "cells": 0}
+
+    def result(read: bool) -> dict:
+        if writer.metrics["calls"] or writer.metrics["replayed"]:
+            writer.print_metrics("sheets_writer")
+        return {
+            **stats,
+            "api_calls": api_calls + writer.metrics["calls"],
+            "read": read,
+            "pending": len(writer.pending),
+            "writer": dict(writer.metrics),
+        }
+
+    if writer.pending:
+        # 이전 실행의 미전송 작업을 먼저 전송 — 미러에 없는 쓰기이므로 하나라도 보냈으면 미러를 버리고 시트를 다시 읽음
+        try:
+            done = writer.flush()
+        finally:
+            if writer.acked:
+                mirror = None
+                if mirror_path and os.path.exists(mirror_path):
+                    os.remove(mirror_path)
+        if not done:
+            return result(read=False)
+
+    read = mirror is None
+    if mirror is None:
+        mirror = SheetMirror.from_values(sheet_key, worksheet.get_all_values())
+        api_calls += 1
+
+    diff = compute_diff(mirror, rows, header, update_cols)
+    if diff["appends"] and not read:
+        # 미러의 다음 빈 행이 실제 시트와 맞는지 확인 (사람이 직접 추가/삭제한 행이 있으면 다시 읽음)
+        last_row = last_key_row(worksheet)
+        api_calls += 1
+        if last_row != mirror.next_row - 1:
+            print(f"  [sheets_sync] 시트 마지막 행 {last_row} ≠ 미러 {mirror.next_row - 1} → 시트 다시 읽기")
+            mirror = SheetMirror.from_values(sheet_key, worksheet.get_all_values())
+            api_calls += 1
+            read = True
+            diff = compute_diff(mirror, rows, header, update_cols)
+    first_new_row = mirror.next_row
+    ops = build_write_ops(worksheet.title, diff, header, first_new_row)
+    needed = first_new_row + len(diff["appends"]) - 1
+    if diff["appends"] and needed > worksheet.row_count:
+        worksheet.add_rows(needed - worksheet.row_count)
+        api_calls += 1
+
+    acked_before = len(writer.acked)
+    writer.enqueue(ops)
+    try:
+        writer.flush()
+    finally:
+        # 전송이 확인된 작업만 미러에 반영 (저널에 남은 작업은 다음 실행에서 먼저 보낸 뒤 시트를 다시 읽음)
+        apply_diff_to_mirror(mirror, diff, header, worksheet.title, first_new_row, writer.acked[acked_before:])
+        if mirror_path:
+            mirror.save(mirror_path)
+
+    stats.update({k: diff[k] for k in stats})
+    return result(read)
+
+
+# ── 메모리 백엔드 (gspread 대체, 테스트/데모용) ─────────────────
+class FakeWorksheet:
+    """gspread.Worksheet 대역: 2차원 리스트 + 호출 횟수 기록"""
+
+    def __init__(self, spreadsheet: "FakeSpreadsheet", title: str, ws_id: int, rows: int = 1000, cols: int = 26):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = ws_id
+        self.row_count = rows
+        self.col_count = cols
+        self.grid: list[list[str]] = []
+
+    def _set(self, row: int, col: int, value) -> None:
+        while len(self.grid) < row:
+            self.grid.append([])
+        line = self.grid[row - 1]
+        while len(line) <= col:
+            line.append("")
+        line[col] = "" if value is None else str(value)
+
+    def get_all_values(self) -> list[list[str]]:
+        self.spreadsheet.calls["get_all_values"] += 1
+        width = max((len(r) for r in self.grid), default=0)
+        return [list(r) + [""] * (width - len(r)) for r in self.grid]
+
+    def get(self, range_a1: str) -> list[list[str]]:
+        """컬럼 범위("A:B")만 지원: 해당 컬럼에 값이 있는 마지막 행까지 (gspread처럼 뒤쪽 빈 행은 잘림)"""
+        self.spreadsheet.calls["get"] += 1
+        start, end = (col_index(c) for c in range_a1.split(":"))
+        rows = [list(r[start:end + 1]) for r in self.grid]
+        while rows and not any(v.strip() for v in rows[-1]):
+            rows.pop()
+        return rows
+
+    def row_values(self, row: int) -> list[str]:
+        self.spreadsheet.calls["row_values"] += 1
+        return list(self.grid[row - 1]) if row <= len(self.grid) else []
+
+    def add_rows(self, n: int) -> None:
+        self.spreadsheet.calls["add_rows"] += 1
+        self.row_count += n
+
+    def append_row(self, values: list, **_kwargs) -> None:
+        self.spreadsheet.calls["append_row"] += 1
+        row = len(self.grid) + 1
+        for c, v in enumerate(values):
+            self._set(row, c, v)
+
+    def format(self, *_args, **_kwargs) -> None:
+        self.spreadsheet.calls["format"] += 1
+
+
+class FakeSpreadsheet:
+    """gspread.Spreadsheet 대역: worksheet/add_worksheet/values_batch_update"""
+
+    def __init__(self, title: str = "fake", sheet_id: str = "fake-sheet"):
+        self.title = title
+        self.id = sheet_id
+        self.calls: dict[str, int] = {k: 0 for k in (
+            "get_all_values", "get", "row_values", "add_rows", "append_row", "format", "values_batch_update"
+        )}
+        self._sheets: dict[str, FakeWorksheet] = {}
+        self._failures: list[int] = []
+
+    def fail_next(self, *statuses: int) -> None:
+        """다음 values_batch_update 호출들을 주어진 HTTP 상태로 실패시킴 (429/503 재시도 확인용)"""
+        self._failures.extend(statuses)
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        if title not in self._sheets:
+            import gspread
+            raise gspread.WorksheetNotFound(title)
+        return self._sheets[title]
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26) -> FakeWorksheet:
+        ws = FakeWorksheet(self, title, len(self._sheets), rows, cols)
+        self._sheets[title] = ws
+        return ws
+
+    def values_batch_update(self, body: dict) -> dict:
+        self.calls["values_batch_update"] += 1
+        if self._failures:
+            raise _api_error(self._failures.pop(0))
+        updated = 0
+        for item in body.get("data", []):
+            title, row0, col0 = parse_a1(item["range"])
+            ws = self._sheets[title]
+            for r, values in enumerate(item["values"]):
+                if row0 + r > ws.row_count:
+                    raise ValueError(f"범위가 시트 행 수({ws.row_count})를 넘음: {item['range']}")
+                for c, v in enumerate(values):
+                    ws._set(row0 + r, col0 + c, v)
+                    updated += 1
+        return {"totalUpdatedCells": updated}
+
+
+def _api_error(status: int):
+    """gspread.APIError 생성 (실제 응답과 같은 형식의 본문)"""
+    import requests
+    from gspread.exceptions import APIError
+
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = json.dumps({"error": {"code": status, "message": "fake", "status": "FAKE"}}).encode()
+    return APIError(resp)
+
+
+def _demo(classified_path: str) -> None:
+    """classified 데이터를 가짜 시트에 두 번 동기화해 두 번째 실행의 변경량 확인"""
+    import tempfile
+
+    import dataset
+    from sheets_uploader import (
+        COL_SYN_EN, HEADERS, SHEET_MAIN, UPDATABLE_COLS,
+        get_or_create_sheet, group_by_standard_term, grouped_entry_to_row,
+    )
+
+    entries = dataset.read_records(classified_path)
+    grouped = group_by_standard_term(entries)
+    today = date.today().isoformat()
+    rows = [grouped_entry_to_row(g, today) for g in grouped]
+
+    book = FakeSpreadsheet()
+    ws = get_or_create_sheet(book, SHEET_MAIN)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {
+            "mirror_path": os.path.join(tmp, "sheet_mirror.json"),
+            "journal_path": os.path.join(tmp, "sheet_journal.jsonl"),
+        }
+
+        def run(label: str, **kwargs) -> None:
+            writer = SheetWriteScheduler(book, sheet_key_of(ws), paths["journal_path"], backoff=0.01, **kwargs)
+            stats = sync_rows(ws, rows, HEADERS, UPDATABLE_COLS, writer=writer, **paths)
+            stats.pop("writer")
+            print(f"  {label}: {stats}")
+
+        # 429 두 번 → 배치를 줄여 재시도
+        book.fail_next(429, 429)
+        run("실행 1 (429 x2)", max_batch_cells=1000)
+        run("실행 2")
+        # 항목 하나의 동의어가 바뀐 경우 → 셀 몇 개만 갱신, 503이 재시도 횟수를 넘기면 저널 보존
+        rows[0][COL_SYN_EN] = (rows[0][COL_SYN_EN] + ", demo").lstrip(", ")
+        book.fail_next(503, 503)
+        run("변경 후 (503 x2, 재시도 2회)", retries=2)
+        run("다음 실행 (저널 재전송)")
+        fresh = SheetMirror.from_values(sheet_key_of(ws), ws.get_all_values())
+        saved = SheetMirror.load(paths["mirror_path"], sheet_key_of(ws))
+        same = {k: v["hash"] for k, v in fresh.rows.items()} == {k: v["hash"] for k, v in saved.rows.items()}
+        print(f"  미러 == 시트: {same}, API 호출: {book.calls}")
+
+
+if __name__ == "__main__":
+    _demo(sys.argv[1] if len(sys.argv) > 1 else "data/raw/classified.jsonl")
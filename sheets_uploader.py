@@ -2,6 +2,12 @@
 STEP 5: 구글 시트 자동 업로드
 - gspread 라이브러리 사용
 - 단일 시트 "팬덤사전": 표준어 기준 1:M 구조 (1개 표준어 → 여러 동의어/약어/신조어)
+- 차분 동기화 (sheets_sync): 로컬 미러(data/raw/sheet_mirror.json)와 비교해
+  바뀐 셀 + 신규 행만 values.batchUpdate 한 번으로 전송
+  시트를 직접 편집했다면 resync=True (python sheets_uploader.py --resync)로 미러를 다시 읽음
+- 그룹화 벤치마크: python sheets_uploader.py --bench [항목 수]
+- 쓰기 스케줄러 (sheets_writer): 분당 요청/셀 한도 대기, 429/5xx 백오프 재시도,
+  끝내 못 보낸 작업은 data/raw/sheet_journal.jsonl에 남겨 다음 실행에서 먼저 전송
 
 구글 서비스 계정 설정 방법:
   1. https://console.cloud.google.com 접속
@@ -17,13 +23,21 @@ STEP 5: 구글 시트 자동 업로드
 
 import json
 import os
+import sys
+import time
+from array import array
 from datetime import date, datetime, timezone
+from typing import Optional
 
 import gspread
 from gspread.exceptions import APIError, SpreadsheetNotFound
 from dotenv import load_dotenv
 from google.oauth2.service_account import Credentials
 
+import dataset
+from sheets_sync import sync_rows
+from text_features import SCRIPT_EN, SCRIPT_KO, script_flags
+
 load_dotenv()
 
 # ── 구글 API 스코프 ────────────────────────────────────────
@@ -60,6 +74,11 @@ COL_CONF = 7
 COL_SOURCE = 8
 COL_DATE = 9
 
+# 기존 표준어 행에서 갱신하는 컬럼 (나머지: 최초 등록 값 유지)
+UPDATABLE_COLS = (COL_ORIGINAL, COL_SYN_KO, COL_SYN_EN, COL_CONF)
+MIRROR_FILENAME = "sheet_mirror.json"
+JOURNAL_FILENAME = "sheet_journal.jsonl"    # 한도 초과 등으로 못 보낸 쓰기 작업 (다음 실행 때 재전송)
+
 
 def get_credentials(creds_path: str = "credentials.json") -> Credentials:
     """서비스 계정 자격 증명 로드"""
@@ -71,81 +90,153 @@ def get_credentials(creds_path: str = "credentials.json") -> Credentials:
     return Credentials.from_service_account_file(creds_path, scopes=SCOPES)
 
 
-def _has_korean(text: str) -> bool:
-    return any("\uAC00" <= c <= "\uD7A3" for c in text)
+# 확신도 순위: verified > high > medium > low (그 외 값은 0)
+CONF_ORDER = {"verified": 4, "high": 3, "medium": 2, "low": 1}
 
 
-def _has_english(text: str) -> bool:
-    return any("a" <= c.lower() <= "z" for c in text)
+def _join_mask(mask: int, vocab: list[str], sep: str = ", ") -> str:
+    """비트마스크 → 정렬된 어휘 목록의 해당 값들을 연결"""
+    return sep.join(vocab[i] for i in range(mask.bit_length()) if mask >> i & 1)
 
 
 def group_by_standard_term(entries: list[dict]) -> list[dict]:
     """
     표준어 기준으로 1:M 그룹화.
     동일한 (표준어KO, 표준어EN)에 매핑되는 원본 용어들을 동의어로 집계.
-    Returns: [{"standard_ko", "standard_en", "synonyms_ko", "synonyms_en", "originals", ...}]
+    Returns: [{"standard_ko", "standard_en", "synonyms_ko", "synonyms_en", "originals", ...}] (그룹 첫 등장 순)
+
+    대량 입력(수십만 항목)용 구성:
+    - 문자열은 번호로 치환(intern), 그룹별 원본 용어는 (그룹 번호 × 어휘 수 + 용어 순위) 정수 배열
+      → 전체를 정수 정렬 한 번으로 그룹·가나다순 정리 (그룹마다 문자열 집합을 정렬하지 않음)
+    - 용어유형/출처는 작은 어휘의 비트마스크, 확신도는 최고 순위만 보관
+    - 한글/영문 판별은 text_features (용어당 1회, 캐시)
     """
-    groups: dict[tuple[str, str], dict] = {}
+    group_ids: dict[tuple[str, str], int] = {}
+    group_info: list[list] = []          # [표준어KO, 표준어EN, 굿즈유형, 확신도 순위, 확신도]
+    term_ids: dict[str, int] = {}
+    pairs = array("q")                   # 원본 용어: 그룹 번호, 용어 번호 교대로
+    type_ids: dict[str, int] = {}
+    type_masks: list[int] = []
+    source_ids: dict[str, int] = {}
+    source_masks: list[int] = []
+    # 원시 필드값 → 정규화 결과 캐시 (같은 값이 반복되는 대량 입력에서 strip/조회 생략)
+    raw_groups: dict[tuple, int] = {}
+    raw_terms: dict = {}
+    raw_attrs: dict[tuple, tuple[int, int, int, str]] = {}
 
     for e in entries:
-        std_ko = (e.get("standard_ko") or "").strip()
-        std_en = (e.get("standard_en") or "").strip()
-        orig = (e.get("original_term") or "").strip()
-        if not std_ko and not std_en:
-            continue
-        if not std_ko:
-            std_ko = std_en
-        if not std_en:
-            std_en = std_ko
-
-        key = (std_ko, std_en)
-        if key not in groups:
-            groups[key] = {
-                "standard_ko": std_ko,
-                "standard_en": std_en,
-                "originals": set(),
-                "synonyms_ko": set(),
-                "synonyms_en": set(),
-                "goods_type": e.get("goods_type"),
-                "term_types": set(),
-                "confidences": set(),
-                "sources": set(),
-            }
-
-        g = groups[key]
-        if orig:
-            g["originals"].add(orig)
+        raw = (e.get("standard_ko"), e.get("standard_en"))
+        gid = raw_groups.get(raw)
+        if gid is None:
+            std_ko = (raw[0] or "").strip()
+            std_en = (raw[1] or "").strip()
+            if not std_ko and not std_en:
+                continue
+            if not std_ko:
+                std_ko = std_en
+            if not std_en:
+                std_en = std_ko
+            key = (std_ko, std_en)
+            gid = group_ids.get(key)
+            if gid is None:
+                gid = group_ids[key] = len(group_info)
+                group_info.append([std_ko, std_en, e.get("goods_type"), -1, ""])
+                type_masks.append(0)
+                source_masks.append(0)
+            raw_groups[raw] = gid
+
+        raw_orig = e.get("original_term")
+        tid = raw_terms.get(raw_orig)
+        if tid is None:
+            orig = (raw_orig or "").strip()
+            tid = -1
+            if orig:
+                tid = term_ids.get(orig)
+                if tid is None:
+                    tid = term_ids[orig] = len(term_ids)
+            raw_terms[raw_orig] = tid
+        if tid >= 0:
+            pairs.append(gid)
+            pairs.append(tid)
+
+        attrs = (e.get("term_type"), e.get("source"), e.get("confidence"))
+        bits = raw_attrs.get(attrs)
+        if bits is None:
+            term_type, source, conf = attrs
+            type_bit = 1 << type_ids.setdefault(term_type, len(type_ids)) if term_type else 0
+            source_bit = 1 << source_ids.setdefault(source, len(source_ids)) if source else 0
+            bits = raw_attrs[attrs] = (type_bit, source_bit, CONF_ORDER.get(conf, 0) if conf else -1, conf or "")
+        type_bit, source_bit, rank, conf = bits
+        if type_bit:
+            type_masks[gid] |= type_bit
+        if source_bit:
+            source_masks[gid] |= source_bit
+        if rank >= 0:
+            info = group_info[gid]
+            if rank > info[3]:
+                info[3], info[4] = rank, conf
+
+    # 어휘를 한 번 정렬해 순위 부여 → 비트/정수 순서가 곧 가나다순
+    def ranked(ids: dict[str, int]) -> tuple[list[str], list[int]]:
+        vocab = sorted(ids)
+        order = [0] * len(ids)
+        for rank, word in enumerate(vocab):
+            order[ids[word]] = rank
+        return vocab, order
+
+    terms, term_rank = ranked(term_ids)
+    types, type_rank = ranked(type_ids)
+    sources, source_rank = ranked(source_ids)
+
+    def remap(mask: int, rank: list[int]) -> int:
+        out = 0
+        while mask:
+            low = mask & -mask
+            out |= 1 << rank[low.bit_length() - 1]
+            mask ^= low
+        return out
+
+    n_terms = max(1, len(terms))
+    keys = sorted({g * n_terms + term_rank[t] for g, t in zip(pairs[::2], pairs[1::2])})
+
+    # 그룹별 원본 용어/동의어 문자열 (정렬된 키를 한 번 훑으며 그룹 경계마다 연결)
+    originals: list[str] = [""] * len(group_info)
+    synonyms_ko: list[str] = [""] * len(group_info)
+    synonyms_en: list[str] = [""] * len(group_info)
+    i = 0
+    while i < len(keys):
+        gid = keys[i] // n_terms
+        std_ko, std_en = group_info[gid][0], group_info[gid][1]
+        origs, syn_ko, syn_en = [], [], []
+        while i < len(keys) and keys[i] // n_terms == gid:
+            term = terms[keys[i] % n_terms]
+            origs.append(term)
             # 표준어와 동일하면 동의어 목록에는 제외, 다르면 해당 언어 동의어에 포함
-            if orig != std_ko and orig != std_en:
-                if _has_korean(orig):
-                    g["synonyms_ko"].add(orig)
-                if _has_english(orig):
-                    g["synonyms_en"].add(orig)
-
-        if e.get("term_type"):
-            g["term_types"].add(e["term_type"])
-        if e.get("confidence"):
-            g["confidences"].add(e["confidence"])
-        if e.get("source"):
-            g["sources"].add(e["source"])
+            if term != std_ko and term != std_en:
+                flags = script_flags(term)
+                if flags & SCRIPT_KO:
+                    syn_ko.append(term)
+                if flags & SCRIPT_EN:
+                    syn_en.append(term)
+            i += 1
+        originals[gid] = ", ".join(origs)
+        synonyms_ko[gid] = ", ".join(syn_ko)
+        synonyms_en[gid] = ", ".join(syn_en)
 
     result = []
-    for (std_ko, std_en), g in groups.items():
+    for gid, (std_ko, std_en, goods_type, _rank, conf) in enumerate(group_info):
         # 용어유형: 여러 개면 쉼표로
-        term_type = ",".join(sorted(g["term_types"])) if g["term_types"] else "standard"
-        # 확신도: verified > high > medium > low
-        conf_order = {"verified": 4, "high": 3, "medium": 2, "low": 1}
-        conf = max(g["confidences"], key=lambda c: conf_order.get(c, 0)) if g["confidences"] else ""
+        term_type = _join_mask(remap(type_masks[gid], type_rank), types, ",") if type_masks[gid] else "standard"
         result.append({
             "standard_ko": std_ko,
             "standard_en": std_en,
-            "originals": ", ".join(sorted(g["originals"])),
-            "synonyms_ko": ", ".join(sorted(g["synonyms_ko"])),
-            "synonyms_en": ", ".join(sorted(g["synonyms_en"])),
-            "goods_type": g["goods_type"] or "",
+            "originals": originals[gid],
+            "synonyms_ko": synonyms_ko[gid],
+            "synonyms_en": synonyms_en[gid],
+            "goods_type": goods_type or "",
             "term_type": term_type,
             "confidence": conf,
-            "source": ", ".join(sorted(g["sources"])) if g["sources"] else "",
+            "source": _join_mask(remap(source_masks[gid], source_rank), sources),
         })
     return result
 
@@ -177,92 +268,35 @@ def get_or_create_sheet(spreadsheet: gspread.Spreadsheet, sheet_name: str) -> gs
         return ws
 
 
-def load_existing_standard_terms(worksheet: gspread.Worksheet) -> dict[tuple, int]:
-    """
-    시트에서 기존 항목 로드 (표준어 기준)
-    Returns: {(표준어KO, 표준어EN): row_number}
-    """
-    try:
-        all_values = worksheet.get_all_values()
-    except Exception:
-        return {}
-
-    key_to_row: dict = {}
-    for i, row in enumerate(all_values[1:], start=2):
-        if row and len(row) > COL_STD_EN:
-            std_ko = row[COL_STD_KO].strip()
-            std_en = row[COL_STD_EN].strip()
-            if std_ko or std_en:
-                key_to_row[(std_ko, std_en)] = i
-    return key_to_row
-
-
 def upload_grouped_to_sheet(
     worksheet: gspread.Worksheet,
     grouped_entries: list[dict],
     today: str,
-    batch_size: int = 50,
+    mirror_path: Optional[str] = None,
+    journal_path: Optional[str] = None,
+    resync: bool = False,
 ) -> dict[str, int]:
     """
-    그룹화된 항목을 시트에 업로드 (표준어 기준)
-    - 기존 표준어 행이 있으면 동의어 컬럼만 업데이트 (확장)
-    - 신규 표준어만 append
+    그룹화된 항목을 시트에 차분 업로드 (표준어 기준)
+    - 기존 표준어 행: 원본 용어/동의어/확신도 중 바뀐 셀만 업데이트 (확장)
+    - 신규 표준어: 마지막 행 뒤에 추가
+    - 헤더가 다르면 같은 요청에서 1행 교체
     """
-    existing = load_existing_standard_terms(worksheet)
-    stats = {"added": 0, "updated": 0, "skipped": 0}
-
-    new_rows = []
-    update_cells = []  # (row_num, col_num, value)
-
-    for g in grouped_entries:
-        key = (g["standard_ko"], g["standard_en"])
-        row_data = grouped_entry_to_row(g, today)
-
-        if key in existing:
-            row_num = existing[key]
-            # 원본 용어, 동의어(KR), 동의어(EN), 확신도 업데이트 (gspread 1-based)
-            update_cells.append((row_num, COL_ORIGINAL + 1, row_data[COL_ORIGINAL]))
-            update_cells.append((row_num, COL_SYN_KO + 1, row_data[COL_SYN_KO]))
-            update_cells.append((row_num, COL_SYN_EN + 1, row_data[COL_SYN_EN]))
-            update_cells.append((row_num, COL_CONF + 1, row_data[COL_CONF]))
-            stats["updated"] += 1
-        else:
-            new_rows.append(row_data)
-            existing[key] = -1
-            stats["added"] += 1
-
-    if update_cells:
-        # 중복 제거 (같은 셀 여러 번 업데이트 방지)
-        seen = set()
-        unique_cells = []
-        for r, c, v in update_cells:
-            k = (r, c)
-            if k not in seen:
-                seen.add(k)
-                unique_cells.append((r, c, v))
-        try:
-            cells = [gspread.Cell(row=r, col=c, value=v) for r, c, v in unique_cells]
-            worksheet.update_cells(cells)
-        except Exception as e:
-            print(f"    [WARN] 업데이트 실패: {e}")
-
-    if new_rows:
-        for i in range(0, len(new_rows), batch_size):
-            batch = new_rows[i : i + batch_size]
-            try:
-                worksheet.append_rows(batch, value_input_option="RAW")
-            except Exception as e:
-                print(f"    [WARN] append 실패: {e}")
-
-    return stats
+    rows = [grouped_entry_to_row(g, today) for g in grouped_entries]
+    return sync_rows(
+        worksheet, rows, HEADERS, UPDATABLE_COLS,
+        mirror_path=mirror_path, journal_path=journal_path, resync=resync,
+    )
 
 
 def upload_all(
-    classified_path: str = "data/raw/classified.json",
+    classified_path: str = "data/raw/classified.jsonl",
     creds_path: str = "credentials.json",
+    resync: bool = False,
 ) -> dict:
     """
     전체 업로드 파이프라인
+    - resync: 로컬 미러를 버리고 시트 내용을 다시 읽어 비교
     Returns: 시트별 통계
     """
     sheet_id = (os.environ.get("GOOGLE_SHEET_ID") or "").strip()
@@ -277,7 +311,7 @@ def upload_all(
             f"credentials.json을 찾을 수 없습니다: {creds_path}\n"
             "현재 작업 디렉토리: " + os.getcwd()
         )
-    if not os.path.exists(classified_path):
+    if not dataset.exists(classified_path):
         raise FileNotFoundError(f"분류 결과 파일이 없습니다: {classified_path}")
 
     print("[sheets_uploader] 구글 시트 업로드 시작")
@@ -291,8 +325,7 @@ def upload_all(
     print(f"  → 위 이메일에 구글 시트 '편집자' 권한이 있는지 확인하세요.")
 
     # 데이터 로드
-    with open(classified_path, encoding="utf-8") as f:
-        entries = json.load(f)
+    entries = dataset.read_records(classified_path)
     print(f"  로드된 항목: {len(entries)}개")
 
     # 자격 증명 및 클라이언트 초기화
@@ -335,24 +368,66 @@ def upload_all(
     today = date.today().isoformat()
     ws = get_or_create_sheet(spreadsheet, SHEET_MAIN)
 
-    # 기존 시트 헤더 확인 후 형식이 다르면 업데이트
-    try:
-        existing = ws.row_values(1)
-        if not existing or existing[0] != HEADERS[0]:
-            ws.update(f"A1:{chr(ord('A') + len(HEADERS) - 1)}1", [HEADERS])
-            print(f"  [INFO] 헤더 행 업데이트 완료")
-    except Exception:
-        pass
-
-    stats = upload_grouped_to_sheet(ws, grouped, today)
-    print(f"\n  [팬덤사전] 추가: {stats['added']}개, 업데이트: {stats['updated']}개")
+    data_dir = os.path.dirname(classified_path) or "."
+    stats = upload_grouped_to_sheet(
+        ws, grouped, today,
+        mirror_path=os.path.join(data_dir, MIRROR_FILENAME),
+        journal_path=os.path.join(data_dir, JOURNAL_FILENAME),
+        resync=resync,
+    )
+    source = "시트 읽기" if stats["read"] else "로컬 미러"
+    print(f"\n  [팬덤사전] 추가: {stats['added']}개, 업데이트: {stats['updated']}개, 변경 없음: {stats['unchanged']}개")
+    print(f"  비교 기준: {source}, 기록 셀: {stats['cells']}개, API 호출: {stats['api_calls']}회")
+    if stats["pending"]:
+        print(f"  [WARN] 미전송 작업 {stats['pending']}개 → {JOURNAL_FILENAME}에 보존, 다음 실행 때 재전송")
 
     print(f"\n[sheets_uploader] 완료")
     return {SHEET_MAIN: stats}
 
 
+def bench_grouping(n_entries: int = 200_000, seed: int = 42) -> None:
+    """
+    group_by_standard_term 벤치마크 (합성 데이터, 시트 접근 없음)
+        python sheets_uploader.py --bench [항목 수]
+    """
+    import random
+
+    from text_features import cache_info
+
+    rng = random.Random(seed)
+    syllables = "포카앨범굿즈슬로건키링럭드미공방특전"
+    ko = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 5))) for _ in range(n_entries // 40 + 1)]
+    en = ["".join(rng.choice("abcdefgiklmnoprst") for _ in range(rng.randint(3, 9))) for _ in range(n_entries // 40 + 1)]
+    standards = [(rng.choice(ko + [""]), rng.choice(en)) for _ in range(n_entries // 15 + 1)]
+    entries = []
+    for _ in range(n_entries):
+        std_ko, std_en = rng.choice(standards)
+        entries.append({
+            "original_term": rng.choice((rng.choice(ko), rng.choice(en), f"{std_ko} {std_en[:3]}")),
+            "standard_ko": std_ko,
+            "standard_en": std_en,
+            "term_type": rng.choice(("slang", "abbreviation", "standard", "")),
+            "confidence": rng.choice(("verified", "high", "medium", "low", None)),
+            "source": rng.choice(("reddit", "ebay", "weverse", "claude_seed")),
+            "goods_type": rng.choice((None, "포토카드", "앨범")),
+        })
+
+    for run in (1, 2):
+        started = time.perf_counter()
+        grouped = group_by_standard_term(entries)
+        elapsed = time.perf_counter() - started
+        print(f"  [bench] 실행 {run}: {n_entries:,}개 항목 → {len(grouped):,}개 표준어, "
+              f"{elapsed:.2f}초 ({n_entries / elapsed:,.0f}항목/초)")
+    info = cache_info()
+    print(f"  [bench] 문자 체계 캐시: {info['size']:,}개 용어, 적중률 {info['hit_rate']:.1%}")
+
+
 if __name__ == "__main__":
-    stats = upload_all()
+    if "--bench" in sys.argv:
+        args = sys.argv[sys.argv.index("--bench") + 1:]
+        bench_grouping(int(args[0]) if args and args[0].isdigit() else 200_000)
+        sys.exit(0)
+    stats = upload_all(resync="--resync" in sys.argv)
     print("\n=== 업로드 요약 ===")
     for sheet_name, s in stats.items():
         print(f"  {sheet_name}: +{s['added']}개 추가, {s['updated']}개 업데이트")
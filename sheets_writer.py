@@ -0,0 +1,330 @@
+"""
+구글 시트 쓰기 스케줄러 (sheets_sync에서 사용)
+- 분당 요청 수 / 분당 셀 수 한도 추적 (최근 60초 슬라이딩 윈도) → 한도에 닿으면 대기
+- 적응형 배치: values.batchUpdate 한 번에 보내는 셀 수를 429 시 절반, 성공 시 1.5배 (상한까지)
+  큰 범위(신규 행 묶음)는 행 단위로 잘라 배치에 담음
+- 429/5xx·네트워크 오류: 지수 백오프 재시도 (Retry-After 우선)
+- 저널: 보낼 쓰기 작업을 먼저 로컬 JSON Lines 파일에 기록하고 전송 성공분만 제거
+  → 재시도 끝에 실패하면 남은 작업이 파일에 남고, 다음 실행 시작 시 먼저 재전송 (행 유실 없음)
+  재시도 불가 오류(권한, 잘못된 범위 등)를 낸 배치는 격리 파일(<저널>.failed.jsonl)로 옮김
+  → 같은 작업이 매 실행 저널 재전송을 막지 않음 (격리 파일은 사람이 확인 후 삭제)
+- acked: 전송이 확인된 작업 목록 (sheets_sync가 미러에 반영할 작업을 고를 때 사용)
+- 통계: API 호출 수, 기록 셀 수, 재시도, 한도 대기/백오프 시간
+
+    writer = SheetWriteScheduler(spreadsheet, sheet_key, journal_path="data/raw/sheet_journal.jsonl")
+    writer.load_journal()
+    writer.enqueue([{"range": "'팬덤사전'!C5:E5", "values": [["a", "b", "c"]]}])
+    writer.flush()
+    writer.print_metrics()
+"""
+
+import json
+import os
+import re
+import time
+from typing import Optional
+
+import requests
+from gspread.exceptions import APIError
+
+from crawlers.http_client import DEFAULT_BACKOFF, MAX_BACKOFF, RETRY_STATUSES, parse_retry_after
+
+REQUESTS_PER_MIN = 60          # Sheets API 사용자당 분당 요청 한도
+CELLS_PER_MIN = 100_000        # 분당 기록 셀 상한 (요청 본문 크기 여유를 둔 보수적 값)
+QUOTA_WINDOW = 60.0            # 한도 윈도 (초)
+MAX_BATCH_CELLS = 10_000       # 요청 하나의 셀 수 상한 (적응형 배치 시작값)
+MIN_BATCH_CELLS = 200          # 429가 반복돼도 이 아래로는 줄이지 않음
+BATCH_GROWTH = 1.5
+DEFAULT_RETRIES = 5
+
+_A1_RE = re.compile(r"^(?:'((?:[^']|'')*)'|([^!]+))!([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?$")
+
+
+# ── A1 표기 ─────────────────────────────────────────────
+def col_letter(col: int) -> str:
+    """0-based 컬럼 번호 → A1 표기 문자 (0 → A, 26 → AA)"""
+    letters = ""
+    col += 1
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def col_index(letters: str) -> int:
+    """A1 표기 문자 → 0-based 컬럼 번호"""
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - ord("A") + 1)
+    return n - 1
+
+
+def a1_range(title: str, row: int, col_start: int, col_end: int, row_end: Optional[int] = None) -> str:
+    """'시트'!C5:E5 형식 범위 (row는 1-based, col은 0-based 포함 구간)"""
+    quoted = "'" + title.replace("'", "''") + "'"
+    return f"{quoted}!{col_letter(col_start)}{row}:{col_letter(col_end)}{row_end or row}"
+
+
+def parse_a1(range_a1: str) -> tuple[str, int, int]:
+    """'시트'!C5:E7 → (시트 이름, 시작 행, 시작 컬럼 0-based)"""
+    m = _A1_RE.match(range_a1)
+    if not m:
+        raise ValueError(f"지원하지 않는 범위: {range_a1}")
+    title = m.group(1).replace("''", "'") if m.group(1) is not None else m.group(2)
+    return title, int(m.group(4)), col_index(m.group(3))
+
+
+def item_cells(item: dict) -> int:
+    return sum(len(row) for row in item["values"]) or 1
+
+
+def split_item(item: dict, max_cells: int) -> tuple[dict, Optional[dict]]:
+    """범위 하나를 행 단위로 앞부분(max_cells 이하, 최소 1행) / 나머지로 분리"""
+    rows = item["values"]
+    taken, cells = 0, 0
+    while taken < len(rows) and (taken == 0 or cells + len(rows[taken]) <= max_cells):
+        cells += len(rows[taken])
+        taken += 1
+    if taken >= len(rows):
+        return item, None
+    title, row, col = parse_a1(item["range"])
+    width = max(len(r) for r in rows)
+
+    def part(start: int, values: list) -> dict:
+        return {"range": a1_range(title, start, col, col + width - 1, start + len(values) - 1), "values": values}
+
+    return part(row, rows[:taken]), part(row + taken, rows[taken:])
+
+
+# ── 한도 ────────────────────────────────────────────────
+class QuotaWindow:
+    """최근 QUOTA_WINDOW초 동안의 요청/셀 수 추적 + 한도 도달 시 대기"""
+
+    def __init__(self, requests_per_min: int = REQUESTS_PER_MIN, cells_per_min: int = CELLS_PER_MIN):
+        self.requests_per_min = requests_per_min
+        self.cells_per_min = cells_per_min
+        self._events: list[tuple[float, int]] = []    # (시각, 셀 수)
+
+    def _expire(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= QUOTA_WINDOW:
+            self._events.pop(0)
+
+    def reserve(self, cells: int) -> float:
+        """요청 하나(cells 셀)를 보낼 수 있을 때까지 대기 후 기록. Returns: 대기한 시간 (초)"""
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            self._expire(now)
+            used = sum(c for _, c in self._events)
+            # 한도보다 큰 요청은 윈도가 빌 때 단독으로 보냄
+            if not self._events or (
+                len(self._events) < self.requests_per_min and used + cells <= self.cells_per_min
+            ):
+                self._events.append((now, cells))
+                return waited
+            delay = QUOTA_WINDOW - (now - self._events[0][0])
+            time.sleep(delay)
+            waited += delay
+
+
+# ── 스케줄러 ────────────────────────────────────────────
+def _error_status(e: Exception) -> Optional[int]:
+    """재시도 판단용 상태 코드 (네트워크 오류는 0, 재시도 불가 오류는 None)"""
+    if isinstance(e, APIError):
+        code = getattr(e.response, "status_code", None) or e.code
+        return code if code in RETRY_STATUSES else None
+    if isinstance(e, requests.RequestException):
+        return 0
+    return None
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    return parse_retry_after(headers.get("Retry-After"))
+
+
+class SheetWriteScheduler:
+    """values.batchUpdate 쓰기 작업 큐 (한도 대기 + 적응형 배치 + 재시도 + 저널)"""
+
+    def __init__(
+        self,
+        spreadsheet,
+        sheet_key: str,
+        journal_path: Optional[str] = None,
+        quota: Optional[QuotaWindow] = None,
+        max_batch_cells: int = MAX_BATCH_CELLS,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+    ):
+        self.spreadsheet = spreadsheet
+        self.sheet_key = sheet_key
+        self.journal_path = journal_path
+        self.quota = quota or QuotaWindow()
+        self.max_batch_cells = max_batch_cells
+        self.batch_cells = max_batch_cells
+        self.retries = retries
+        self.backoff = backoff
+        self.pending: list[dict] = []
+        self.acked: list[dict] = []       # 전송 성공한 작업 (분할된 경우 보낸 조각)
+        self.quarantined: list[dict] = []
+        self._foreign: list[dict] = []    # 저널 속 다른 시트의 작업 (건드리지 않고 보존)
+        self.metrics = {
+            "calls": 0,
+            "cells": 0,
+            "retries": 0,
+            "throttled": 0,
+            "throttle_wait": 0.0,
+            "backoff_wait": 0.0,
+            "replayed": 0,
+            "quarantined": 0,
+        }
+
+    # ── 저널 ──
+    def _read_journal(self) -> list[dict]:
+        """저널에서 이 시트의 작업만 꺼냄 (다른 시트 작업은 _foreign에 보존)"""
+        self._foreign = []
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return []
+        mine = []
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                op = json.loads(line)
+                if op.get("sheet_key") == self.sheet_key:
+                    mine.append({"range": op["range"], "values": op["values"]})
+                else:
+                    self._foreign.append(op)
+        return mine
+
+    def load_journal(self) -> int:
+        """이전 실행에서 못 보낸 작업을 큐 앞에 적재. Returns: 적재한 작업 수"""
+        mine = self._read_journal()
+        self.pending = mine + self.pending
+        self.metrics["replayed"] += len(mine)
+        if mine:
+            print(f"  [sheets_writer] 저널에서 미전송 작업 {len(mine)}개 재전송 예정")
+        return len(mine)
+
+    def discard_journal(self) -> int:
+        """이 시트의 미전송 작업 폐기 (시트를 다시 읽어 차분을 새로 계산할 때)"""
+        dropped = len(self._read_journal())
+        self._save_journal()
+        if dropped:
+            print(f"  [sheets_writer] 저널 작업 {dropped}개 폐기 (시트 재동기화)")
+        return dropped
+
+    def _save_journal(self) -> None:
+        if not self.journal_path:
+            return
+        ops = self._foreign + [{"sheet_key": self.sheet_key, **item} for item in self.pending]
+        if not ops:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            return
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        tmp = f"{self.journal_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for op in ops:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.journal_path)
+
+    def _quarantine(self, batch: list[dict], error: Exception) -> None:
+        """재시도 불가 오류를 낸 배치를 격리 파일에 추가 (저널에서는 빠짐)"""
+        self.quarantined.extend(batch)
+        self.metrics["quarantined"] += len(batch)
+        if not self.journal_path:
+            return
+        root, ext = os.path.splitext(self.journal_path)
+        path = f"{root}.failed{ext}"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for item in batch:
+                op = {"sheet_key": self.sheet_key, **item, "error": str(error)}
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+        print(f"  [sheets_writer] [ERROR] 재시도 불가 오류 → 작업 {len(batch)}개 격리 ({path}): {error}")
+
+    # ── 전송 ──
+    def enqueue(self, items: list[dict]) -> None:
+        self.pending.extend(items)
+
+    def _next_batch(self) -> tuple[list[dict], list[dict]]:
+        """
+        현재 배치 크기에 맞게 큐 앞에서 범위를 꺼냄
+        Returns: (이번 배치, 전송 성공 시 남는 큐) — 큐 자체는 바꾸지 않음
+        """
+        batch, cells = [], 0
+        for i, item in enumerate(self.pending):
+            n = item_cells(item)
+            if cells + n <= self.batch_cells:
+                batch.append(item)
+                cells += n
+                continue
+            if batch:
+                return batch, self.pending[i:]
+            # 배치 크기보다 큰 범위는 행 단위로 잘라 앞부분만 보냄
+            head, rest = split_item(item, self.batch_cells)
+            return [head], ([rest] if rest else []) + self.pending[i + 1:]
+        return batch, []
+
+    def flush(self) -> bool:
+        """
+        큐 전체 전송
+        Returns: True = 모두 전송, False = 재시도 소진 (남은 작업은 저널에 보존)
+        재시도 불가 오류(권한, 잘못된 범위 등)는 그 배치를 격리하고 나머지를 저널에 남긴 뒤 예외 전파
+        """
+        self._save_journal()
+        attempt = 0
+        while self.pending:
+            batch, remaining = self._next_batch()
+            cells = sum(item_cells(item) for item in batch)
+            self.metrics["throttle_wait"] += self.quota.reserve(cells)
+            try:
+                self.spreadsheet.values_batch_update({"valueInputOption": "RAW", "data": batch})
+            except Exception as e:
+                self.metrics["calls"] += 1
+                status = _error_status(e)
+                if status is None:
+                    self._quarantine(batch, e)
+                    self.pending = remaining
+                    self._save_journal()
+                    raise
+                if status == 429:
+                    self.metrics["throttled"] += 1
+                    self.batch_cells = max(MIN_BATCH_CELLS, self.batch_cells // 2)
+                attempt += 1
+                if attempt >= self.retries:
+                    self._save_journal()
+                    print(f"  [sheets_writer] [WARN] 재시도 {self.retries}회 소진 → "
+                          f"미전송 {len(self.pending)}개 작업 저널 보존 ({self.journal_path})")
+                    return False
+                wait = _retry_after(e)
+                if wait is None:
+                    wait = self.backoff * (2 ** (attempt - 1))
+                wait = min(wait, MAX_BACKOFF)
+                print(f"  [sheets_writer] [RATE LIMIT] {status or '네트워크 오류'} → {wait:.0f}초 대기 후 재시도 "
+                      f"(배치 {self.batch_cells}셀)")
+                self.metrics["retries"] += 1
+                self.metrics["backoff_wait"] += wait
+                time.sleep(wait)
+                continue
+
+            attempt = 0
+            self.acked.extend(batch)
+            self.pending = remaining
+            self.metrics["calls"] += 1
+            self.metrics["cells"] += cells
+            self.batch_cells = min(self.max_batch_cells, int(self.batch_cells * BATCH_GROWTH))
+            self._save_journal()
+        return True
+
+    def print_metrics(self, label: str = "sheets") -> None:
+        m = self.metrics
+        print(
+            f"  [{label}] API 호출 {m['calls']}회, 기록 {m['cells']}셀, 재시도 {m['retries']}회 "
+            f"(429: {m['throttled']}회), 한도 대기 {m['throttle_wait']:.1f}초, 백오프 {m['backoff_wait']:.1f}초"
+            + (f", 저널 재전송 {m['replayed']}개" if m["replayed"] else "")
+            + (f", 미전송 {len(self.pending)}개" if self.pending else "")
+            + (f", 격리 {m['quarantined']}개" if m["quarantined"] else "")
+        )
@@ -0,0 +1,161 @@
+"""
+크롤러 → 분류기 스트리밍 (main.py --stream)
+- 생산자(크롤러): 수집 즉시 항목을 JSON Lines 파일에 한 줄씩 추가 (flush)
+  종료 시 "<파일>.done" 마커 생성 → 소비자가 끝을 알 수 있음
+- 소비자(분류기): 파일을 따라 읽으며(tail) 완성된 줄만 처리
+  처리한 바이트 오프셋을 "<파일>.offset"에 주기적으로 저장 → 중단 후 재실행 시 이어서 처리
+- 메모리: 소비자는 한 줄씩 처리하므로 전체 데이터를 올리지 않음
+
+    stream = ItemStream("data/raw/stream/reddit.jsonl")
+    stream.open(backfill=stored)      # 스트림 파일이 처음 생길 때만 기존 데이터로 채움
+    stream.put(item) ...
+    stream.close()                    # .done 마커
+
+    consume_stream(stream.path, handler)   # 다른 스레드/프로세스에서
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+POLL_INTERVAL = 0.5        # 새 줄이 없을 때 대기 (초)
+CHECKPOINT_EVERY = 20      # 오프셋 저장 주기 (처리 항목 수)
+
+
+def done_marker(path: str) -> str:
+    return f"{path}.done"
+
+
+def offset_path(path: str) -> str:
+    return f"{path}.offset"
+
+
+class ItemStream:
+    """JSON Lines 스트림 파일 생산자 (스레드 안전)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.written = 0
+        self._fh = None
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """
+        이전 실행의 .done 마커 제거 (생산자/소비자를 띄우기 전에 호출)
+        → 생산자가 open()하기 전에 시작한 소비자가 지난 마커를 보고 바로 끝나지 않도록
+        """
+        if os.path.exists(done_marker(self.path)):
+            os.remove(done_marker(self.path))
+
+    def open(self, backfill: Optional[Iterable[dict]] = None) -> "ItemStream":
+        """
+        추가 모드로 열기 + 이전 실행의 .done 마커 제거
+        backfill: 스트림 파일이 아직 없을 때만 먼저 기록할 기존 항목 (배치 모드에서 전환 시)
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.reset()
+        is_new = not os.path.exists(self.path)
+        self._fh = open(self.path, "a", encoding="utf-8")
+        if is_new and backfill:
+            self.put_many(backfill)
+        return self
+
+    def put(self, item: dict) -> None:
+        self.put_many([item])
+
+    def put_many(self, items: Iterable[dict]) -> None:
+        lines = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+        if not lines:
+            return
+        with self._lock:
+            self._fh.write(lines)
+            self._fh.flush()
+            self.written += lines.count("\n")
+
+    def close(self) -> None:
+        """
+        파일 닫기 + .done 마커 (예외로 끝나도 호출해야 소비자가 멈추지 않음)
+        open() 전에 호출해도 되고 여러 번 호출해도 됨
+        """
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(done_marker(self.path), "w", encoding="utf-8") as f:
+            f.write(str(self.written))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _load_offset(path: str) -> int:
+    try:
+        with open(offset_path(path), encoding="utf-8") as f:
+            return int(json.load(f).get("offset", 0))
+    except (OSError, ValueError, json.JSONDecodeError):
+        return 0
+
+
+def _save_offset(path: str, offset: int) -> None:
+    tmp = f"{offset_path(path)}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"offset": offset}, f)
+    os.replace(tmp, offset_path(path))
+
+
+def consume_stream(
+    path: str,
+    handler: Callable[[dict], None],
+    follow: bool = True,
+    poll: float = POLL_INTERVAL,
+    checkpoint: Optional[Callable[[], None]] = None,
+) -> int:
+    """
+    스트림 파일을 마지막 처리 오프셋부터 읽어 handler(item) 호출
+    - follow=True: .done 마커가 생길 때까지 새 줄을 기다림 (생산자와 동시 실행)
+    - follow=False: 현재 파일 끝까지만 처리
+    - checkpoint: 오프셋 저장 직전에 호출 (handler 결과를 먼저 디스크에 반영하도록)
+    Returns: 이번에 처리한 항목 수
+    """
+    offset = _load_offset(path)
+    consumed = 0
+
+    def save() -> None:
+        if checkpoint:
+            checkpoint()
+        _save_offset(path, offset)
+
+    while not os.path.exists(path):
+        if not follow or os.path.exists(done_marker(path)):
+            return 0
+        time.sleep(poll)
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            # 마커를 먼저 확인하고 읽어야 마커 직전에 쓰인 줄을 놓치지 않음
+            finished = not follow or os.path.exists(done_marker(path))
+            line = f.readline()
+            if line.endswith(b"\n"):
+                offset = f.tell()
+                if line.strip():
+                    handler(json.loads(line))
+                    consumed += 1
+                    if consumed % CHECKPOINT_EVERY == 0:
+                        save()
+                continue
+            # 아직 쓰는 중인 마지막 줄은 다음 차례에 다시 읽음
+            f.seek(offset)
+            if finished:
+                break
+            time.sleep(poll)
+
+    save()
+    return consumed
+
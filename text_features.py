@@ -0,0 +1,77 @@
+"""
+용어 텍스트 특성 (문자 체계 / 언어 판별) 공용 모듈
+- 한글 음절(가-힣) / 라틴 알파벳 포함 여부를 컴파일된 정규식으로 한 번에 판별
+- 용어별 결과는 LRU 캐시 → 같은 원본 용어가 여러 소스/항목에 반복돼도 한 번만 검사
+- 사용처: sheets_uploader.group_by_standard_term, classifier.process_weverse_products, 위버스 크롤러
+- 문자 체계별 LLM 토큰 수 추정 (청크 분할/묶음, 관련도 필터 예산)
+
+    script_flags("포카 photocard")  # SCRIPT_KO | SCRIPT_EN
+    detect_language("BTS 포토카드")  # "mixed"
+    estimate_tokens("WTS 정국 포카")  # 라틴 단어는 5자당 1토큰(단어당 최소 1), 한글은 음절당 TOKENS_PER_HANGUL
+"""
+
+import re
+from functools import lru_cache
+
+SCRIPT_KO = 1      # 한글 음절 포함
+SCRIPT_EN = 2      # 라틴 알파벳 포함
+TERM_CACHE_SIZE = 1 << 18
+CHARS_PER_LATIN_TOKEN = 5      # 라틴 알파벳/숫자 단어 (짧은 영단어는 대부분 1토큰)
+TOKENS_PER_HANGUL = 1.2        # 한글 음절 (BPE에서 음절 하나가 1~2토큰으로 쪼개짐)
+
+_HANGUL_RE = re.compile(r"[가-힣]")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+_HANGUL_RUN_RE = re.compile(r"[가-힣]+")
+_WORD_RUN_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def script_flags(text: str) -> int:
+    """문자 체계 비트 플래그 (SCRIPT_KO | SCRIPT_EN)"""
+    flags = 0
+    if _HANGUL_RE.search(text):
+        flags |= SCRIPT_KO
+    if _LATIN_RE.search(text):
+        flags |= SCRIPT_EN
+    return flags
+
+
+def has_korean(text: str) -> bool:
+    return bool(script_flags(text) & SCRIPT_KO)
+
+
+def has_english(text: str) -> bool:
+    return bool(script_flags(text) & SCRIPT_EN)
+
+
+def detect_language(text: str) -> str:
+    """ko / en / mixed (한글이 없으면 en)"""
+    flags = script_flags(text)
+    if flags == SCRIPT_KO | SCRIPT_EN:
+        return "mixed"
+    return "ko" if flags & SCRIPT_KO else "en"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    LLM 토큰 수 추정 (문자 체계별)
+    라틴/숫자 단어는 ceil(길이/5), 한글 음절은 TOKENS_PER_HANGUL, 공백 제외 나머지 문자(구두점/이모지 등)는 1
+    """
+    hangul = sum(len(run) for run in _HANGUL_RUN_RE.findall(text))
+    words = _WORD_RUN_RE.findall(text)
+    latin = sum(len(w) for w in words)
+    other = len(text) - hangul - latin - sum(text.count(c) for c in " \n\t")
+    word_tokens = sum(-(-len(w) // CHARS_PER_LATIN_TOKEN) for w in words)
+    return int(word_tokens + hangul * TOKENS_PER_HANGUL + max(other, 0)) + 1
+
+
+def cache_info() -> dict:
+    """캐시 적중 통계 (벤치마크/로그용)"""
+    info = script_flags.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "hit_rate": info.hits / total if total else 0.0,
+    }
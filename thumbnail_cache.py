@@ -0,0 +1,240 @@
+"""
+시세 페이지용 썸네일 프록시 캐시 (bts_photocard_analyzer --thumbnails)
+- 페이지가 카드마다 media.bunjang.co.kr의 _w640.jpg를 직접 불러왔음 (표시 크기는 약 320px)
+  → 대표 상품 이미지를 받아 원본은 내용 해시(sha256)로 data/thumb_cache/에 보관하고,
+    THUMB_WIDTHS 폭의 WebP(+ Pillow가 지원하면 AVIF) 변형을 공개 디렉터리(thumbs/)에 생성
+  → 페이지는 <picture> + srcset으로 로컬 변형을 쓰고, 원본 URL은 변형이 없을 때만 사용
+- 죽은 이미지(404/410, 이미지가 아닌 응답)는 manifest에 기록 → 분석기가 대표 상품/이미지를
+  고를 때 건너뜀, DEAD_RETRY_DAYS가 지나면 다시 확인
+- 재실행 시 manifest에 있는 URL은 다시 받지 않음 (네트워크 오류/5xx는 기록하지 않고 다음 실행에 재시도)
+  Pillow가 없으면 생존 여부만 기록하고, 나중에 설치되면 보관된 원본으로 변형만 생성
+- 스레드 안전 (분석기의 검증 스레드 여러 개가 동시에 ensure 호출)
+- prune: 이번 페이지가 참조하지 않는 변형 파일 삭제 (thumbs/가 배포본에 계속 쌓이지 않도록)
+  (원본/manifest는 data/thumb_cache에 남겨 다음 실행에서 다시 받지 않고 변형만 재생성)
+- thumbs/는 HTML과 함께 배포해야 함 (누락돼도 페이지가 원본 URL로 대체, thumbFallback)
+
+    thumbs = ThumbnailCache("thumbs", "data/thumb_cache", client=HttpClient())
+    entry = thumbs.ensure(url)         # None이면 죽은/받을 수 없는 이미지
+    thumbs.srcset(entry, "webp", "../thumbs")   # "../thumbs/3fa2c1d0e5b7a9f1-320.webp 320w, ..."
+    thumbs.save()
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+    AVIF_SUPPORTED = ".avif" in Image.registered_extensions()
+except ImportError:
+    HAS_PIL = False
+    AVIF_SUPPORTED = False
+
+DEFAULT_THUMB_DIR = "thumbs"              # 페이지와 함께 배포되는 변형 디렉터리
+DEFAULT_CACHE_DIR = "data/thumb_cache"    # 원본 + manifest (배포하지 않음)
+MANIFEST_FILE = "manifest.json"
+THUMB_WIDTHS = (320, 480, 640)            # 카드 표시 폭 약 320px × 1x/1.5x/2x
+THUMB_SIZES = "(max-width: 768px) 100vw, 360px"
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+DEAD_STATUSES = (404, 410)
+DEAD_RETRY_DAYS = 7
+
+_VARIANT_RE = re.compile(r"^[0-9a-f]{16}-\d+\.(webp|avif)$")
+
+
+class ThumbnailCache:
+    """
+    URL → manifest 항목
+      살아 있음: {"sha": 원본 sha256, "width", "height", "variants": {"webp": [폭, ...], "avif": [...]}}
+      죽음:     {"dead": True, "status": 상태 코드, "checked_at": epoch 초}
+    """
+
+    def __init__(self, thumb_dir: str = DEFAULT_THUMB_DIR, cache_dir: str = DEFAULT_CACHE_DIR, client=None):
+        self.thumb_dir = thumb_dir
+        self.cache_dir = cache_dir
+        self.client = client
+        self._manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._url_locks: dict[str, threading.Lock] = {}
+        self._dirty = False
+        self.stats = {"cached": 0, "fetched": 0, "dead": 0, "errors": 0, "variants": 0}
+        if os.path.exists(self._manifest_path):
+            try:
+                with open(self._manifest_path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._entries = {}
+
+    # ── 조회 ──
+    def is_dead(self, url: Optional[str]) -> bool:
+        """manifest에 죽은 이미지로 기록된 URL인지 (재확인 기한 전까지)"""
+        entry = self._entries.get(url) if url else None
+        return bool(entry and entry.get("dead") and not self._expired(entry))
+
+    @staticmethod
+    def _expired(entry: dict) -> bool:
+        return time.time() - entry.get("checked_at", 0) > DEAD_RETRY_DAYS * 86400
+
+    def _original_path(self, sha: str) -> str:
+        return os.path.join(self.cache_dir, sha[:2], f"{sha}.img")
+
+    def _variant_name(self, sha: str, width: int, fmt: str) -> str:
+        return f"{sha[:16]}-{width}.{fmt}"
+
+    def srcset(self, entry: Optional[dict], fmt: str, prefix: str) -> str:
+        """manifest 항목 → srcset 문자열 (해당 형식 변형이 없으면 빈 문자열)"""
+        if not entry or entry.get("dead"):
+            return ""
+        return ", ".join(
+            f"{prefix}/{self._variant_name(entry['sha'], width, fmt)} {width}w"
+            for width in entry.get("variants", {}).get(fmt, [])
+        )
+
+    # ── 가져오기 ──
+    def ensure(self, url: Optional[str]) -> Optional[dict]:
+        """
+        URL의 썸네일 준비 (manifest에 있으면 재사용, 없으면 받아서 변형 생성)
+        Returns: manifest 항목 (죽은/받을 수 없는 이미지면 None)
+        """
+        if not url:
+            return None
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        with url_lock:
+            entry = self._entries.get(url)
+            if entry and not entry.get("dead"):
+                self._count("cached")
+                return self._ensure_variants(url, entry)
+            if entry and not self._expired(entry):
+                return None
+            return self._fetch(url)
+
+    def _fetch(self, url: str) -> Optional[dict]:
+        if self.client is None:
+            return None
+        resp = self.client.get(url, use_cache=False)
+        if resp is None or (resp.status_code != 200 and resp.status_code not in DEAD_STATUSES):
+            self._count("errors")   # 일시적 실패는 기록하지 않음 → 다음 실행에 재시도
+            return None
+        content_type = resp.headers.get("Content-Type", "")
+        if resp.status_code in DEAD_STATUSES or not resp.content or not content_type.startswith("image/"):
+            self._set(url, {"dead": True, "status": resp.status_code, "checked_at": int(time.time())})
+            self._count("dead")
+            return None
+
+        sha = hashlib.sha256(resp.content).hexdigest()
+        path = self._original_path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(resp.content)
+            os.replace(tmp, path)
+        self._count("fetched")
+        return self._ensure_variants(url, {"sha": sha, "variants": {}})
+
+    def _ensure_variants(self, url: str, entry: dict) -> Optional[dict]:
+        """빠진 변형만 보관된 원본으로 생성 (Pillow 미설치 시 항목 그대로)"""
+        formats = ["webp"] + (["avif"] if AVIF_SUPPORTED else [])
+        variants = entry.get("variants", {})
+        complete = all(
+            fmt in variants and all(
+                os.path.exists(os.path.join(self.thumb_dir, self._variant_name(entry["sha"], w, fmt)))
+                for w in variants[fmt]
+            )
+            for fmt in formats
+        )
+        if complete or not HAS_PIL:
+            if url not in self._entries:
+                self._set(url, entry)
+            return entry
+
+        try:
+            with Image.open(self._original_path(entry["sha"])) as img:
+                img.load()
+                source = img.convert("RGB")
+        except OSError:
+            # 원본이 깨진 이미지 → 죽은 이미지로 기록
+            self._set(url, {"dead": True, "status": 200, "checked_at": int(time.time())})
+            self._count("dead")
+            return None
+
+        os.makedirs(self.thumb_dir, exist_ok=True)
+        widths = [w for w in THUMB_WIDTHS if w < source.width] + [min(max(THUMB_WIDTHS), source.width)]
+        widths = sorted(set(widths))
+        new_variants = {}
+        for fmt in formats:
+            for width in widths:
+                out = os.path.join(self.thumb_dir, self._variant_name(entry["sha"], width, fmt))
+                if not os.path.exists(out):
+                    height = round(source.height * width / source.width)
+                    buf = io.BytesIO()
+                    source.resize((width, height), Image.LANCZOS).save(
+                        buf, fmt.upper(), quality=WEBP_QUALITY if fmt == "webp" else AVIF_QUALITY
+                    )
+                    # 임시 파일 → 교체 (중단돼도 잘린 변형이 완성본으로 남지 않음, 같은 원본을 동시에 써도 안전)
+                    tmp = f"{out}.{threading.get_ident()}.tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(buf.getvalue())
+                    os.replace(tmp, out)
+                    self._count("variants")
+            new_variants[fmt] = widths
+        entry = {"sha": entry["sha"], "width": source.width, "height": source.height, "variants": new_variants}
+        self._set(url, entry)
+        return entry
+
+    def prune(self, entries) -> int:
+        """
+        entries(이번에 페이지에 쓰인 manifest 항목)가 참조하지 않는 변형 파일(+ 남은 임시 파일) 삭제
+        Returns: 삭제한 파일 수
+        """
+        keep = set()
+        for entry in entries:
+            if entry and not entry.get("dead"):
+                for fmt, widths in entry.get("variants", {}).items():
+                    keep.update(self._variant_name(entry["sha"], w, fmt) for w in widths)
+        if not os.path.isdir(self.thumb_dir):
+            return 0
+        removed = 0
+        for name in os.listdir(self.thumb_dir):
+            # 중단된 실행이 남긴 임시 파일도 정리
+            if (_VARIANT_RE.match(name) and name not in keep) or name.endswith(".tmp"):
+                os.remove(os.path.join(self.thumb_dir, name))
+                removed += 1
+        return removed
+
+    def _set(self, url: str, entry: dict) -> None:
+        with self._lock:
+            self._entries[url] = entry
+            self._dirty = True
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{self._manifest_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp, self._manifest_path)
+            self._dirty = False
+
+    def print_stats(self, prefix: str = "  ") -> None:
+        s = self.stats
+        print(
+            f"{prefix}→ 썸네일: 캐시 {s['cached']}개, 새로 받음 {s['fetched']}개, 죽은 이미지 {s['dead']}개, "
+            f"오류 {s['errors']}개, 변형 생성 {s['variants']}개"
+            + ("" if HAS_PIL else " (Pillow 미설치: 변형 없이 원본 URL 사용)")
+        )
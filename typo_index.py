@@ -0,0 +1,350 @@
+"""
+SymSpell 방식 오타 교정 인덱스 (분류 사전의 원본 용어/표준어 기준)
+- 키: merge_engine.normalize_term → 한글 음절은 자모로 분해 ("포카" → ㅍㅗㅋㅏ)
+  → "포카ㅡ", "전국"(정국) 같은 한글 오타도 라틴 문자와 같은 편집거리로 다룸
+- 사전 구축 시 각 키의 앞부분(PREFIX_LENGTH자)에서 최대 MAX_DISTANCE개 문자를 지운
+  삭제형을 모두 색인 → 조회는 입력의 삭제형만 찾아보고 후보를 편집거리로 검증
+  (사전 크기와 무관하게 입력 길이에만 비례, 수십 µs)
+- 허용 편집거리는 키 길이에 따라 줄임 (짧은 약어 WTS/pob 등이 엉뚱한 용어로 바뀌지 않도록)
+- 증분 갱신: 저장된 인덱스(data/raw/typo_index.json.gz)를 읽어 새 용어의 삭제형만 추가,
+  사전에서 빠진 용어는 삭제 표시 후 일정 비율이 넘으면 전체 재구축
+
+    python typo_index.py build [data/raw/classified.jsonl]
+    python typo_index.py lookup jungkok 포카ㅡ
+    python typo_index.py bench [-n 20000]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Iterable, Optional
+
+import dataset
+from merge_engine import bounded_edit_distance, deletion_variants, normalize_term
+
+DEFAULT_INDEX_PATH = "data/raw/typo_index.json.gz"
+INDEX_VERSION = 1
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7                 # 삭제형은 키 앞부분에서만 생성 (SymSpell prefix 최적화)
+REBUILD_TOMBSTONE_RATIO = 0.2     # 삭제 표시된 용어가 이 비율을 넘으면 전체 재구축
+
+# 한글 음절 분해용 호환 자모 (초성 19 / 중성 21 / 종성 27 + 없음)
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONGSEONG = ("", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ",
+              "ㄿ", "ㅀ", "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ")
+
+
+def decompose_hangul(text: str) -> str:
+    """한글 음절 → 초/중/종성 호환 자모 (그 외 문자는 그대로)"""
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(_CHOSEONG[code // 588])
+            out.append(_JUNGSEONG[code % 588 // 28])
+            out.append(_JONGSEONG[code % 28])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def typo_key(term: str) -> str:
+    """오타 비교 키: 정규화 + 자모 분해"""
+    return decompose_hangul(normalize_term(term))
+
+
+def allowed_distance(key: str, max_distance: int = MAX_DISTANCE) -> int:
+    """키 길이별 허용 편집거리: 3자 이하 0, 4~6자 1, 7자 이상 2 (max_distance 상한)"""
+    if len(key) <= 3:
+        return 0
+    if len(key) <= 6:
+        return min(1, max_distance)
+    return max_distance
+
+
+class TypoIndex:
+    """
+    삭제 이웃 인덱스
+        index = TypoIndex()
+        index.add("정국", "정국", "Jungkook")
+        index.correct("jungkok")  # {"term", "key", "distance", "standard_ko", "standard_en", "count"}
+    """
+
+    def __init__(self, max_distance: int = MAX_DISTANCE, prefix_length: int = PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        # 용어 번호 → [키, 표면형, 표준어KO, 표준어EN, 등장 수] (삭제된 용어는 None)
+        self.words: list[Optional[list]] = []
+        self._by_key: dict[str, int] = {}
+        self._deletes: dict[str, list[int]] = defaultdict(list)
+        self.tombstones = 0
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def _variants(self, key: str) -> set[str]:
+        return deletion_variants(key[: self.prefix_length], self.max_distance)
+
+    def add(self, surface: str, standard_ko: str, standard_en: str, count: int = 1) -> bool:
+        """용어 추가 (이미 있으면 등장 수만 더함). Returns: 새 용어 여부"""
+        key = typo_key(surface)
+        if not key:
+            return False
+        word_id = self._by_key.get(key)
+        if word_id is not None:
+            self.words[word_id][4] += count
+            return False
+        word_id = len(self.words)
+        self.words.append([key, surface, standard_ko, standard_en, count])
+        self._by_key[key] = word_id
+        for variant in self._variants(key):
+            self._deletes[variant].append(word_id)
+        return True
+
+    def remove(self, key: str) -> bool:
+        """용어 삭제 표시 (삭제형 목록은 조회 시 건너뜀)"""
+        word_id = self._by_key.pop(key, None)
+        if word_id is None:
+            return False
+        self.words[word_id] = None
+        self.tombstones += 1
+        return True
+
+    def lookup(self, term: str, max_distance: Optional[int] = None, top: int = 3) -> list[dict]:
+        """
+        term과 편집거리 이내인 사전 용어 (거리 → 등장 수 내림차순 → 표면형 순)
+        max_distance 생략 시 입력 키 길이에 따른 허용 거리
+        """
+        key = typo_key(term)
+        if not key:
+            return []
+        limit = allowed_distance(key, self.max_distance) if max_distance is None else min(max_distance, self.max_distance)
+        exact = self._by_key.get(key)
+        if exact is not None and limit == 0:
+            return [self._suggestion(exact, 0)]
+
+        prefix_len = min(len(key), self.prefix_length)
+        seen: set[int] = set()
+        found: list[tuple[int, int]] = []
+        for variant in self._variants(key):
+            # 입력 접두부에서 지운 글자 수가 이미 허용 거리를 넘으면 건너뜀
+            if prefix_len - len(variant) > limit:
+                continue
+            for word_id in self._deletes.get(variant, ()):
+                if word_id in seen:
+                    continue
+                seen.add(word_id)
+                word = self.words[word_id]
+                if word is None or abs(len(word[0]) - len(key)) > limit:
+                    continue
+                dist = bounded_edit_distance(key, word[0], limit)
+                if dist <= limit:
+                    found.append((dist, word_id))
+        found.sort(key=lambda f: (f[0], -self.words[f[1]][4], self.words[f[1]][1]))
+        return [self._suggestion(word_id, dist) for dist, word_id in found[:top]]
+
+    def correct(self, term: str, max_distance: Optional[int] = None) -> Optional[dict]:
+        """가장 가까운 사전 용어 하나 (없으면 None)"""
+        hits = self.lookup(term, max_distance, top=1)
+        return hits[0] if hits else None
+
+    def _suggestion(self, word_id: int, dist: int) -> dict:
+        key, surface, std_ko, std_en, count = self.words[word_id]
+        return {
+            "term": surface,
+            "key": key,
+            "distance": dist,
+            "standard_ko": std_ko,
+            "standard_en": std_en,
+            "count": count,
+        }
+
+    # ── 증분 갱신 / 저장 ──
+    def update(self, forms: dict[str, tuple[str, str, str, int]]) -> dict:
+        """
+        사전 전체 표면형(키 → (표면형, KO, EN, 등장 수))에 맞춰 인덱스 갱신
+        - 새 키만 삭제형 생성, 빠진 키는 삭제 표시, 표준어/등장 수 변경은 제자리 갱신
+        - 삭제 표시가 REBUILD_TOMBSTONE_RATIO를 넘으면 전체 재구축
+        Returns: {"added", "removed", "updated", "rebuilt"}
+        """
+        stats = {"added": 0, "removed": 0, "updated": 0, "rebuilt": False}
+        for key in [k for k in self._by_key if k not in forms]:
+            self.remove(key)
+            stats["removed"] += 1
+        for key, (surface, std_ko, std_en, count) in forms.items():
+            word_id = self._by_key.get(key)
+            if word_id is None:
+                self.add(surface, std_ko, std_en, count)
+                stats["added"] += 1
+                continue
+            word = self.words[word_id]
+            if word[1:] != [surface, std_ko, std_en, count]:
+                word[1:] = [surface, std_ko, std_en, count]
+                stats["updated"] += 1
+        if self.words and self.tombstones / len(self.words) > REBUILD_TOMBSTONE_RATIO:
+            self._rebuild()
+            stats["rebuilt"] = True
+        return stats
+
+    def _rebuild(self) -> None:
+        live = [w for w in self.words if w is not None]
+        self.words, self._by_key, self._deletes, self.tombstones = [], {}, defaultdict(list), 0
+        for key, surface, std_ko, std_en, count in live:
+            self.add(surface, std_ko, std_en, count)
+
+    def save(self, path: str = DEFAULT_INDEX_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "max_distance": self.max_distance,
+                    "prefix_length": self.prefix_length,
+                    "words": self.words,
+                    "deletes": self._deletes,
+                },
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH) -> Optional["TypoIndex"]:
+        """저장된 인덱스 (없거나 설정/형식이 다르면 None → 새로 구축)"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        index = cls(data["max_distance"], data["prefix_length"])
+        index.words = data["words"]
+        index._deletes = defaultdict(list, data["deletes"])
+        for word_id, word in enumerate(index.words):
+            if word is None:
+                index.tombstones += 1
+            else:
+                index._by_key[word[0]] = word_id
+        return index
+
+
+def collect_forms(entries: Iterable[dict]) -> dict[str, tuple[str, str, str, int]]:
+    """분류 항목 → 키별 (표면형, 표준어KO, 표준어EN, 등장 수), 같은 키는 먼저 나온 표준어"""
+    forms: dict[str, list] = {}
+    for e in entries:
+        std_ko = (e.get("standard_ko") or "").strip()
+        std_en = (e.get("standard_en") or "").strip()
+        if not std_ko and not std_en:
+            continue
+        std_ko, std_en = std_ko or std_en, std_en or std_ko
+        for surface in (e.get("original_term"), std_ko, std_en):
+            surface = (surface or "").strip()
+            key = typo_key(surface)
+            if not key:
+                continue
+            if key in forms:
+                forms[key][3] += 1
+            else:
+                forms[key] = [surface, std_ko, std_en, 1]
+    return {k: tuple(v) for k, v in forms.items()}
+
+
+def update_index(
+    classified_path: str = "data/raw/classified.jsonl",
+    index_path: str = DEFAULT_INDEX_PATH,
+) -> TypoIndex:
+    """저장된 인덱스를 분류 결과에 맞춰 증분 갱신 후 저장 (없으면 새로 구축)"""
+    started = time.perf_counter()
+    index = TypoIndex.load(index_path)
+    fresh = index is None
+    index = index or TypoIndex()
+    stats = index.update(collect_forms(dataset.iter_records(classified_path)))
+    if fresh or stats["added"] or stats["removed"] or stats["updated"]:
+        index.save(index_path)
+    mode = "새로 구축" if fresh else ("전체 재구축" if stats["rebuilt"] else "증분 갱신")
+    print(f"[typo_index] {mode}: 용어 {len(index)}개 (추가 {stats['added']}, 삭제 {stats['removed']}, "
+          f"변경 {stats['updated']}), 삭제형 {len(index._deletes):,}개, {time.perf_counter() - started:.2f}초")
+    return index
+
+
+def bench(index: TypoIndex, n: int = 20_000, seed: int = 3) -> dict:
+    """사전 용어에 1~2글자 오타를 넣어 조회 지연 측정"""
+    rng = random.Random(seed)
+    words = [w for w in index.words if w is not None]
+    if not words:
+        print("[typo_index] 벤치마크: 사전 비어있음")
+        return {}
+    alphabet = "abcdefghijklmnopqrstuvwxyzㄱㄴㄷㄹㅁㅂㅅㅇㅈㅊㅋㅌㅍㅎㅏㅓㅗㅜㅡㅣ"
+    queries = []
+    for _ in range(n):
+        chars = list(rng.choice(words)[0])
+        for _ in range(rng.randint(1, 2)):
+            op, pos = rng.randrange(3), rng.randrange(len(chars) + 1)
+            if op == 0 and pos < len(chars):
+                del chars[pos]
+            elif op == 1:
+                chars.insert(pos, rng.choice(alphabet))
+            elif pos < len(chars):
+                chars[pos] = rng.choice(alphabet)
+        queries.append("".join(chars))
+
+    timings, corrected = [], 0
+    clock = time.perf_counter_ns
+    for q in queries:
+        t0 = clock()
+        hit = index.correct(q)
+        timings.append(clock() - t0)
+        corrected += hit is not None
+    timings.sort()
+
+    def pct(p: float) -> float:
+        return timings[min(len(timings) - 1, int(len(timings) * p))] / 1000
+
+    stats = {"queries": n, "corrected": corrected, "p50_us": pct(0.5), "p99_us": pct(0.99)}
+    print(f"[typo_index] 벤치마크: {n:,}개 오타 검색어, 교정 {corrected:,}개 ({corrected / n:.0%})")
+    print(f"  p50 {stats['p50_us']:.1f}µs, p99 {stats['p99_us']:.1f}µs")
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="팬덤 사전 오타 교정 인덱스")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="분류 결과로 인덱스 구축/증분 갱신")
+    p.add_argument("classified", nargs="?", default="data/raw/classified.jsonl")
+    p.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    p = sub.add_parser("lookup", help="오타 교정 후보 조회")
+    p.add_argument("terms", nargs="+")
+    p.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    p = sub.add_parser("bench", help="조회 지연 벤치마크")
+    p.add_argument("-n", type=int, default=20_000)
+    p.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        update_index(args.classified, args.index)
+        return
+    index = TypoIndex.load(args.index)
+    if index is None:
+        raise SystemExit(f"인덱스 없음: {args.index} (python typo_index.py build 먼저 실행)")
+    if args.command == "lookup":
+        for term in args.terms:
+            hits = index.lookup(term)
+            print(f"  {term}: " + (", ".join(
+                f"{h['term']} → {h['standard_ko']}/{h['standard_en']} (거리 {h['distance']})" for h in hits
+            ) or "후보 없음"))
+    else:
+        bench(index, args.n)
+
+
+if __name__ == "__main__":
+    main()
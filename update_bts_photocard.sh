@@ -19,7 +19,8 @@ fi
 
 echo "$(date '+%Y-%m-%d %H:%M') BTS 포토카드 업데이트 시작"
 python3 fetch_redash_data.py || exit 1
-python3 bts_photocard_analyzer.py --all-locales || exit 1
+# --thumbnails: 로컬 WebP 변형을 thumbs/에 생성 → HTML과 함께 thumbs/도 배포 (git add thumbs/ 또는 vercel 디렉터리 배포)
+python3 bts_photocard_analyzer.py --all-locales --thumbnails || exit 1
 
 # index.html 동기화 (한국어 버전 배포용)
 cp bts_photocard_market.html index.html